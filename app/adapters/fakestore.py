@@ -1,16 +1,417 @@
-import requests
-from datetime import datetime
+import codecs
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import httpx
+
+
+class FakeStoreAPIError(Exception):
+    """Falha ao consultar a FakeStore API (status inesperado ou erro de rede)."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Maior item aceito pelo leitor em fluxo, em caracteres
+MAX_ITEM_CHARS = 16 * 1024 * 1024
+# Corpos guardados para as requisições condicionais, somados entre as URLs
+DEFAULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(chunks, max_item_chars: int = MAX_ITEM_CHARS):
+    """
+    Lê um array JSON em pedaços de bytes e devolve seus itens à medida que
+    ficam completos, sem montar o corpo inteiro na memória: só o item atual
+    e o resto do último pedaço ficam no buffer. `ValueError` se o JSON for
+    inválido ou terminar antes de `]`.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer, pos, done = "", 0, False
+    state = "start"  # start → first (após "[") → separator ↔ value → end
+
+    def read_more():
+        nonlocal buffer, pos, done
+        if len(buffer) - pos > max_item_chars:
+            raise ValueError(f"Item JSON maior que {max_item_chars} caracteres")
+        chunk = next(chunks, None)
+        if chunk is None:
+            done = True
+            text = utf8.decode(b"", final=True)
+        else:
+            text = utf8.decode(chunk)
+        buffer = buffer[pos:] + text
+        pos = 0
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if done:
+                if state == "end":
+                    return
+                raise ValueError("JSON incompleto: o array não foi fechado")
+            read_more()
+            continue
+
+        char = buffer[pos]
+        if state == "end":
+            raise ValueError(f"Conteúdo após o fim do array: {buffer[pos:pos + 20]!r}")
+        if state == "start":
+            if char != "[":
+                raise ValueError("A resposta não é um array JSON")
+            pos += 1
+            state = "first"
+        elif state == "separator" or (state == "first" and char == "]"):
+            if char == "]":
+                pos += 1
+                state = "end"
+            elif char == ",":
+                pos += 1
+                state = "value"
+            else:
+                raise ValueError(f"Esperado ',' ou ']' na posição {pos}")
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if done:
+                    raise
+                read_more()
+                continue
+            # Um número cortado ("2." de "2.5") pode continuar no próximo pedaço
+            if not done and (end == len(buffer) or (
+                    isinstance(item, (int, float)) and buffer[end] in ".eE+-")):
+                read_more()
+                continue
+            pos = end
+            state = "separator"
+            yield item
+
+
+class RateLimiter:
+    """Token bucket: no máximo `rate` requisições por segundo, com rajadas de até `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
 
 class FakeStoreAPI:
-    BASE_URL = "https://fakestoreapi.com/products"
-
-    @staticmethod
-    def fetch_products():
-        response = requests.get(FakeStoreAPI.BASE_URL)
-        if response.status_code == 200:
-            products = response.json()
-            # Adiciona timestamp ao extrair
+    BASE_URL = "https://fakestoreapi.com"
+    ENDPOINTS = {
+        "products": "/products",
+        "categories": "/products/categories",
+        "carts": "/carts",
+        "users": "/users",
+    }
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url: str = BASE_URL, transport: httpx.BaseTransport | None = None,
+                 timeout: float = 10.0, max_retries: int = 3, backoff_factor: float = 0.5,
+                 max_backoff: float = 30.0, max_concurrency: int = 8,
+                 rate_limit: float | None = None, page_size: int | None = None,
+                 chunk_size: int = 64 * 1024, cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 sleep=time.sleep):
+        """
+        Cliente da FakeStore API com pool de conexões, timeout, retentativas com
+        backoff exponencial, limite de taxa e requisições condicionais.
+
+        Args:
+            transport: Transporte httpx alternativo (ex.: `httpx.MockTransport` nos testes).
+            max_concurrency: Tamanho do pool de conexões e de requisições simultâneas.
+            rate_limit: Máximo de requisições por segundo (None desativa o limite).
+            page_size: Busca `/products` em páginas (`limit`/`offset`) deste tamanho;
+                None faz uma única requisição, como exige a API pública.
+            chunk_size: Tamanho dos pedaços lidos do corpo em `iter_products`.
+            cache_max_bytes: Limite, somado entre as URLs, dos corpos guardados
+                para responder a um 304. Só `get_json` (e `fetch_products` sem
+                paginação) guarda o corpo, e só se ele couber no limite; um
+                corpo maior é baixado inteiro a cada chamada, sem validadores.
+                As menos usadas saem primeiro; 0 desliga o cache.
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.cache_max_bytes = cache_max_bytes
+        self.rate_limiter = RateLimiter(rate_limit, burst=max_concurrency, sleep=sleep) if rate_limit else None
+        self._sleep = sleep
+        self.client = httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        # Tempo da última extração de cada endpoint, em segundos
+        self.timings: dict[str, float] = {}
+        # Total de retentativas desde a criação do cliente
+        self.retries = 0
+        # ETag / Last-Modified, o último corpo recebido e o tamanho dele, por URL (LRU)
+        self._validators: OrderedDict[str, tuple[str | None, str | None, object, int]] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _backoff(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return min(self.backoff_factor * 2 ** attempt, self.max_backoff)
+
+    def get_json(self, path: str):
+        """GET com retentativas e validação condicional (If-None-Match / If-Modified-Since)."""
+        return self._get(path)[0]
+
+    def _get(self, path: str) -> tuple[object, httpx.Headers]:
+        with self._lock:
+            etag, last_modified, cached, _ = self._validators.get(path, (None, None, None, 0))
+            if cached is not None:
+                self._validators.move_to_end(path)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            response = None
+            try:
+                response = self.client.get(path, headers=headers)
+            except httpx.TransportError as error:
+                # Inclui corpos cortados antes do Content-Length (RemoteProtocolError)
+                if attempt == self.max_retries:
+                    raise FakeStoreAPIError(f"Erro ao buscar {path}: {error}") from error
+            else:
+                if response.status_code == 304 and cached is not None:
+                    return cached, response.headers
+                if response.status_code == 200:
+                    try:
+                        data = response.json()
+                    except ValueError as error:
+                        # ⚠️ JSON incompleto ou corrompido: tenta de novo como uma falha de rede
+                        if attempt == self.max_retries:
+                            raise FakeStoreAPIError(f"Resposta inválida de {path}: {error}") from error
+                    else:
+                        self._remember(path, response, data)
+                        return data, response.headers
+                elif response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    raise FakeStoreAPIError(
+                        f"Erro ao buscar {path}: {response.status_code}", status_code=response.status_code
+                    )
+
+            with self._lock:
+                self.retries += 1
+            self._sleep(self._backoff(attempt, response))
+
+    def _remember(self, path: str, response: httpx.Response, data):
+        """Guarda validadores e corpo de `path` dentro de `cache_max_bytes`, descartando os menos usados."""
+        size = len(response.content)
+        cacheable = size <= self.cache_max_bytes and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        )
+        with self._lock:
+            previous = self._validators.pop(path, None)
+            if previous is not None:
+                self._cached_bytes -= previous[3]
+            if not cacheable:
+                return
+            self._validators[path] = (response.headers.get("ETag"), response.headers.get("Last-Modified"), data, size)
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_max_bytes:
+                _, evicted = self._validators.popitem(last=False)
+                self._cached_bytes -= evicted[3]
+
+    def fetch(self, endpoint: str):
+        """Busca um dos `ENDPOINTS` e registra o tempo gasto em `timings`."""
+        start = time.perf_counter()
+        try:
+            return self.get_json(self.ENDPOINTS[endpoint])
+        finally:
+            self.timings[endpoint] = time.perf_counter() - start
+
+    def fetch_many(self, endpoints=tuple(ENDPOINTS)) -> dict:
+        """Busca vários endpoints em paralelo; retorna {endpoint: dados}."""
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = dict(zip(endpoints, executor.map(self.fetch, endpoints)))
+        return results
+
+    def fetch_product_details(self, product_ids) -> list[dict]:
+        """Busca `/products/{id}` para cada id, com no máximo `max_concurrency` em voo."""
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                return list(executor.map(lambda product_id: self.get_json(f"/products/{product_id}"), product_ids))
+        finally:
+            self.timings["product_details"] = time.perf_counter() - start
+
+    def fetch_products(self) -> list[dict]:
+        if not self.page_size:
+            return self.fetch("products")
+        start = time.perf_counter()
+        try:
+            return [product for page in self.iter_product_pages() for product in page]
+        finally:
+            self.timings["products"] = time.perf_counter() - start
+
+    def iter_products(self, batch_size: int):
+        """
+        Produtos de `/products` em lotes de até `batch_size`, entregues à medida
+        que chegam. Sem paginação, o array é lido em fluxo (`iter_json_array`),
+        então a memória depende do lote e não do tamanho da resposta; o corpo
+        não vai para o cache de requisições condicionais.
+        """
+        start = time.perf_counter()
+        try:
+            if self.page_size:
+                products = (product for page in self.iter_product_pages() for product in page)
+            else:
+                products = self._stream_array(self.ENDPOINTS["products"])
+            batch = []
             for product in products:
-                product["extracted_at"] = datetime.utcnow().isoformat()
-            return products
-        raise Exception(f"Erro ao buscar produtos: {response.status_code}")
+                batch.append(product)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            self.timings["products"] = time.perf_counter() - start
+
+    def _stream_array(self, path: str):
+        """
+        Itens de um array JSON lidos em fluxo, com as mesmas retentativas de
+        `get_json`. Se a conexão cair no meio, a nova tentativa pula os itens
+        já entregues (a resposta deve vir na mesma ordem).
+        """
+        delivered = 0
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            response = None
+            try:
+                with self.client.stream("GET", path) as response:
+                    if response.status_code == 200:
+                        for index, item in enumerate(iter_json_array(response.iter_bytes(self.chunk_size))):
+                            if index >= delivered:
+                                delivered += 1
+                                yield item
+                        return
+            except (httpx.TransportError, ValueError) as error:
+                if attempt == self.max_retries:
+                    raise FakeStoreAPIError(f"Erro ao buscar {path}: {error}") from error
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    raise FakeStoreAPIError(
+                        f"Erro ao buscar {path}: {response.status_code}", status_code=response.status_code
+                    )
+
+            with self._lock:
+                self.retries += 1
+            self._sleep(self._backoff(attempt, response))
+
+    def iter_product_pages(self):
+        """
+        Percorre `/products?limit=&offset=` em páginas de `page_size`, na ordem.
+        Se o servidor informar o total em `X-Total-Count`, as páginas seguintes
+        são buscadas em paralelo, com no máximo `max_concurrency` em voo, e
+        receber menos produtos que o total levanta `FakeStoreAPIError`; sem o
+        header, uma a uma até a primeira página incompleta.
+        """
+        path = self.ENDPOINTS["products"]
+        page_size = self.page_size
+        first, headers = self._get(f"{path}?limit={page_size}&offset=0")
+        yield first
+        total = headers.get("X-Total-Count")
+        if total is None:
+            page, offset = first, 0
+            while len(page) == page_size:
+                offset += page_size
+                page = self.get_json(f"{path}?limit={page_size}&offset={offset}")
+                if page:
+                    yield page
+            return
+
+        total = int(total)
+        received = len(first)
+        offsets = iter(range(page_size, total, page_size))
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            def submit(offset):
+                return executor.submit(self.get_json, f"{path}?limit={page_size}&offset={offset}")
+
+            pending = deque(submit(offset) for offset in islice(offsets, self.max_concurrency))
+            try:
+                while pending:
+                    page = pending.popleft().result()
+                    for offset in islice(offsets, 1):
+                        pending.append(submit(offset))
+                    received += len(page)
+                    yield page
+            finally:
+                for future in pending:
+                    future.cancel()
+        # Páginas mais curtas que o anunciado: a extração veio incompleta
+        if received < total:
+            raise FakeStoreAPIError(f"{path}: {received} de {total} produtos recebidos")
+
+
+_default_api: FakeStoreAPI | None = None
+
+
+def get_fakestore_api() -> FakeStoreAPI:
+    """
+    Instância compartilhada, para reaproveitar o pool de conexões entre execuções.
+    `FAKESTORE_BASE_URL` aponta para outro servidor (ex.: o stub de
+    `benchmarks.fakestore_stub`), `FAKESTORE_PAGE_SIZE` liga a paginação e
+    `FAKESTORE_CACHE_MAX_MB` limita os corpos guardados para respostas 304.
+    """
+    global _default_api
+    if _default_api is None:
+        _default_api = FakeStoreAPI(
+            base_url=os.getenv("FAKESTORE_BASE_URL", FakeStoreAPI.BASE_URL),
+            page_size=int(os.getenv("FAKESTORE_PAGE_SIZE", 0)) or None,
+            cache_max_bytes=int(float(os.getenv("FAKESTORE_CACHE_MAX_MB", DEFAULT_CACHE_MAX_BYTES / 1024 / 1024))
+                                * 1024 * 1024),
+        )
+    return _default_api
@@ -1,31 +1,343 @@
-from fastapi import APIRouter, Depends
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Literal
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database.db import SessionLocal, get_db
-from ..database.crud_products import get_products
-from ..services.etl_pipeline import run_etl
-from ..reports.excel_generator import generate_report
-from fastapi.responses import FileResponse
+from .. import metrics
+from ..database.db import get_async_read_db, get_read_db
+from ..database.crud_products import (
+    PRODUCT_FIELDS,
+    get_data_version,
+    get_product_rows_async,
+    get_product_rows_by_ids,
+    has_products,
+    iter_product_rows_async,
+)
+from ..database.crud_category_summary import get_category_summaries_async
+from ..database.crud_etl_runs import get_etl_run_async, get_last_etl_run, get_last_etl_run_async
+from ..database.crud_price_history import get_price_series_async, get_top_movers_async
+from ..services.catalog import CatalogStore, get_catalog_store
+from ..services.etl_pipeline import get_etl_job_manager
+from ..services.images import ImageStore, get_image_store, thumbnails_available
+from ..services.search import ProductSearchIndex, get_search_index
+from ..services.jobs import JobManager
+from ..reports.cache import ReportCache, get_report_cache
+from ..reports.exports import EXPORT_CHUNK_SIZE, EXPORTERS, MEDIA_TYPES, parquet_available
+from ..schemas.product import ProductResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 
 
 router = APIRouter()
 
-@router.post("/products")
-def start_etl(db: Session = Depends(get_db)):
-    return run_etl(db)
+MAX_PAGE_SIZE = 1000
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 10_000
+STREAM_CHUNK_SIZE = 1000
+
+
+def _parse_fields(fields: str | None) -> list[str]:
+    """Valida o parâmetro `fields` (ex.: "id,price"); sem ele, todos os campos."""
+    if not fields:
+        return list(PRODUCT_FIELDS)
+    selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in PRODUCT_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos inválidos: {', '.join(unknown) or fields}. Disponíveis: {', '.join(PRODUCT_FIELDS)}",
+        )
+    return selected
+
+
+async def _stream_ndjson(db: AsyncSession, fields: list[str], filters: dict):
+    """Escreve os produtos como NDJSON à medida que os lotes chegam do banco."""
+    columns = [PRODUCT_FIELDS[field] for field in fields]
+    try:
+        lines = []
+        async for row in iter_product_rows_async(db, columns=columns, chunk_size=STREAM_CHUNK_SIZE, **filters):
+            lines.append(orjson.dumps(dict(zip(fields, row))))
+            if len(lines) == STREAM_CHUNK_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines.clear()
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        await db.close()
+
+
+@router.post("/products", status_code=202)
+def start_etl(response: Response, wait: bool = False, jobs: JobManager = Depends(get_etl_job_manager)):
+    """
+    Dispara o ETL em segundo plano e retorna o job. Se já houver uma execução
+    em andamento, retorna o mesmo job. Com `wait=true`, aguarda o término.
+    """
+    job, created = jobs.submit()
+    if wait:
+        jobs.wait(job)
+        response.status_code = 200
+    return {**job.as_dict(), "deduplicated": not created}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, jobs: JobManager = Depends(get_etl_job_manager)):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.as_dict()
+
+@router.get("/products", response_model=list[ProductResponse])
+async def list_products(
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(None, ge=0, description="Último id recebido na página anterior"),
+    category: str | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    format: Literal["json", "ndjson"] = "json",
+    fields: str | None = Query(None, description="Campos separados por vírgula, ex.: id,price"),
+    db: AsyncSession = Depends(get_async_read_db),
+    catalog: CatalogStore = Depends(get_catalog_store),
+):
+    """
+    Lista os produtos com paginação por cursor, filtros e sparse fieldsets.
+    O JSON sai do snapshot em memória do catálogo quando disponível; senão as
+    linhas vêm do banco via Core. Em ambos os casos a serialização é com
+    orjson, sem passar pelo ORM nem pela validação do `response_model`
+    (usado só na documentação). Roda no event loop, com sessão assíncrona:
+    não disputa o threadpool com os relatórios e o ETL.
+    """
+    selected = _parse_fields(fields)
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="min_price não pode ser maior que max_price")
+
+    filters = {"after_id": cursor, "category": category, "min_price": min_price, "max_price": max_price}
+
+    if format == "ndjson":
+        return StreamingResponse(_stream_ndjson(db, selected, filters), media_type="application/x-ndjson")
+
+    snapshot = await catalog.current_async(db)
+    if snapshot is not None:
+        positions = snapshot.select(limit=limit, **filters)
+        headers = {"X-Catalog-Version": str(snapshot.version)}
+        if limit is not None and len(positions) == limit:
+            headers["X-Next-Cursor"] = str(snapshot.ids[positions[-1]])
+        return ORJSONResponse(snapshot.rows(positions, selected), headers=headers)
+
+    # O cursor precisa do id mesmo quando o cliente não o pediu; a coluna extra
+    # fica no fim e o zip com `selected` a descarta na resposta
+    paginated = limit is not None and "id" not in selected
+    rows = await get_product_rows_async(db, selected + ["id"] if paginated else selected, limit=limit, **filters)
+    headers = {}
+    if limit is not None and len(rows) == limit:
+        headers["X-Next-Cursor"] = str(rows[-1].id)
+    return ORJSONResponse([dict(zip(selected, row)) for row in rows], headers=headers)
+
+
+@router.get("/products/search")
+def search_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Termos buscados em nome e descrição"),
+    category: str | None = None,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    fields: str | None = Query(None, description="Campos separados por vírgula, ex.: id,name"),
+    db: Session = Depends(get_read_db),
+    index: ProductSearchIndex = Depends(get_search_index),
+):
+    """
+    Busca textual com todos os termos obrigatórios e o último como prefixo,
+    ordenada por relevância (BM25). O total de resultados vai no header
+    `X-Total-Count`; a paginação é por `offset`.
+    """
+    selected = _parse_fields(fields)
+    found = index.search(db, q, category=category, limit=limit, offset=offset)
+    scores = dict(found.hits)
+    rows = get_product_rows_by_ids(db, list(scores), selected)
+    results = [{**dict(zip(selected, row)), "score": scores[row.id]} for row in rows]
+    return ORJSONResponse(results, headers={"X-Total-Count": str(found.total)})
+
+
+@router.get("/products/{product_id}/price-history")
+async def get_product_price_history(product_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Série de preços do produto, com a variação em relação ao ponto anterior."""
+    series = await get_price_series_async(db, product_id)
+    if not series:
+        raise HTTPException(status_code=404, detail="Produto sem histórico de preços")
+    return [
+        {
+            "extracted_at": point.extracted_at.isoformat(),
+            "price": float(point.price),
+            "change": float(point.change) if point.change is not None else None,
+            "etl_run_id": point.etl_run_id,
+        }
+        for point in series
+    ]
+
+
+@router.get("/price-movers")
+async def get_price_movers(
+    from_run: int | None = Query(None, description="Execução base (padrão: a anterior à `to_run`)"),
+    to_run: int | None = Query(None, description="Execução final (padrão: a última bem-sucedida)"),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Produtos com maior variação percentual de preço entre duas execuções do ETL."""
+    end = await get_etl_run_async(db, to_run) if to_run is not None else await get_last_etl_run_async(db)
+    if end is None:
+        raise HTTPException(status_code=404, detail="Execução do ETL não encontrada")
+    if from_run is not None:
+        start = await get_etl_run_async(db, from_run)
+    else:
+        start = await get_last_etl_run_async(db, before_id=end.id)
+    if start is None:
+        raise HTTPException(status_code=404, detail="Execução do ETL não encontrada")
+    if start.started_at > end.started_at:
+        raise HTTPException(status_code=400, detail="from_run deve ser anterior a to_run")
 
-@router.get("/products")
-def list_products(db: Session = Depends(get_db)):
-    return get_products(db)
+    movers = await get_top_movers_async(db, start.started_at, end.started_at, limit=limit)
+    return {
+        "from_run": start.id,
+        "to_run": end.id,
+        "movers": [
+            {
+                "product_id": mover.product_id,
+                "name": mover.name,
+                "old_price": float(mover.old_price),
+                "new_price": float(mover.new_price),
+                "change": float(mover.change),
+                "change_pct": round(float(mover.change_pct), 2) if mover.change_pct is not None else None,
+            }
+            for mover in movers
+        ],
+    }
 
 
+@router.get("/stats")
+async def get_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """Estatísticas de preço por categoria, lidas da tabela de resumos."""
+    return [
+        {
+            "category": summary.category,
+            "count": summary.product_count,
+            "mean": round(float(summary.price_mean), 2),
+            "min": float(summary.price_min),
+            "max": float(summary.price_max),
+            "sum": float(summary.price_sum),
+        }
+        for summary in await get_category_summaries_async(db)
+    ]
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified) -> bool:
+    try:
+        return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def _report_version(db: Session) -> tuple[tuple, datetime | None]:
+    """Versão do catálogo usada na chave de cache e no ETag dos relatórios.
+
+    Com o histórico de execuções do ETL basta uma busca indexada pela última carga bem-sucedida,
+    então um 304 não varre a tabela de produtos. Sem nenhuma execução registrada (catálogo
+    carregado fora do run_etl) cai no agregado de quantidade e maior timestamp.
+    """
+    run = get_last_etl_run(db)
+    if run is not None:
+        return ("etl", run.id), run.finished_at
+    count, last_timestamp = get_data_version(db)
+    if not count:
+        raise HTTPException(status_code=404, detail="Nenhum produto encontrado para gerar o relatório")
+    return ("table", count, last_timestamp.isoformat() if last_timestamp else None), last_timestamp
+
+
+def _stream_export(db: Session, export_format: str):
+    """Envia a exportação lote a lote, medindo tempo e tamanho como nos relatórios Excel."""
+    size = 0
+    try:
+        with metrics.REPORT_RENDER_SECONDS.time(mode=export_format):
+            for chunk in EXPORTERS[export_format](db, chunk_size=EXPORT_CHUNK_SIZE):
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                size += len(data)
+                yield data
+        metrics.REPORT_SIZE_BYTES.observe(size, mode=export_format)
+    finally:
+        db.close()
+
 
 @router.get("/report")
-def generate_excel_report(db: Session = Depends(get_db)):
-    file_name = "products_report.xlsx"
-    generate_report(db, file_name)
+def generate_excel_report(
+    streaming: bool = False,
+    format: Literal["xlsx", "csv", "ndjson", "parquet"] = "xlsx",
+    thumbnails: bool = False,
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
+    db: Session = Depends(get_read_db),
+    cache: ReportCache = Depends(get_report_cache),
+    images: ImageStore = Depends(get_image_store),
+):
+    file_name = f"products_report.{format}"
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Exportação Parquet requer o pacote pyarrow")
+    if thumbnails and format != "xlsx":
+        raise HTTPException(status_code=400, detail="Miniaturas só estão disponíveis no formato xlsx")
+    if thumbnails and not thumbnails_available():
+        raise HTTPException(status_code=501, detail="Miniaturas requerem o pacote Pillow")
+
+    if format != "xlsx":
+        mode = format
+    else:
+        mode = "streaming" if streaming else "standard"
+    version, last_timestamp = _report_version(db)
+    # Com miniaturas o relatório também muda quando o ETL baixa imagens novas
+    key_parts = (mode, *version)
+    if thumbnails:
+        key_parts += ("thumbnails", images.version)
+    key = cache.make_key(*key_parts)
+    last_modified = (last_timestamp or datetime.min).replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": f'"{key}"',
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None and _not_modified_since(if_modified_since, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if version[0] == "etl" and not has_products(db):
+        raise HTTPException(status_code=404, detail="Nenhum produto encontrado para gerar o relatório")
+
+    if format != "xlsx":
+        # Formatos de linhas brutas vão direto do cursor para a resposta, sem cache em disco
+        headers["Content-Disposition"] = f'attachment; filename="{file_name}"'
+        return StreamingResponse(_stream_export(db, format), media_type=MEDIA_TYPES[format], headers=headers)
+
+    # pandas/openpyxl só são carregados no primeiro relatório
+    from ..reports.excel_generator import generate_report, generate_report_streaming
+
+    generator = generate_report_streaming if streaming else generate_report
+
+    def render(tmp_path):
+        with metrics.REPORT_RENDER_SECONDS.time(mode=mode):
+            generator(db, tmp_path, thumbnails=images if thumbnails else None)
+        metrics.REPORT_SIZE_BYTES.observe(os.path.getsize(tmp_path), mode=mode)
+
+    path = cache.get_or_create(key, render)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Nenhum produto encontrado para gerar o relatório")
 
     return FileResponse(
-    file_name,
-    media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    headers={"Content-Disposition": f"attachment; filename={file_name}"}
-)
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=file_name,
+        headers=headers,
+    )
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .model_category_summary import CategorySummary
+from .model_product import Product
+
+
+class CategoryDeltas:
+    """
+    Acumula as mudanças de uma carga por categoria (preços que entraram e que
+    saíram), para atualizar `category_summaries` sem reagregar a tabela toda.
+    """
+
+    def __init__(self):
+        self.count = defaultdict(int)
+        self.total = defaultdict(int)
+        self.added_min = {}
+        self.added_max = {}
+        self.removed_prices = defaultdict(set)
+
+    def __bool__(self):
+        return bool(self.count) or bool(self.removed_prices)
+
+    def add(self, category, price):
+        self.count[category] += 1
+        self.total[category] += price
+        self.added_min[category] = min(price, self.added_min.get(category, price))
+        self.added_max[category] = max(price, self.added_max.get(category, price))
+
+    def remove(self, category, price):
+        self.count[category] -= 1
+        self.total[category] -= price
+        self.removed_prices[category].add(price)
+
+    @property
+    def categories(self):
+        return set(self.count) | set(self.removed_prices)
+
+
+def _recompute(db: Session, categories) -> None:
+    """Recalcula por agregação as categorias indicadas (sem commit)."""
+    categories = list(categories)
+    if not categories:
+        return
+    aggregates = db.execute(
+        select(Product.category, func.count(), func.sum(Product.price), func.min(Product.price), func.max(Product.price))
+        .where(Product.category.in_(categories))
+        .group_by(Product.category)
+    ).all()
+
+    found = set()
+    for category, count, total, price_min, price_max in aggregates:
+        found.add(category)
+        db.merge(CategorySummary(
+            category=category, product_count=count, price_sum=total,
+            price_min=price_min, price_max=price_max, updated_at=datetime.utcnow(),
+        ))
+    empty = set(categories) - found
+    if empty:
+        db.execute(delete(CategorySummary).where(CategorySummary.category.in_(empty)))
+    db.flush()
+
+
+def apply_category_deltas(db: Session, deltas: CategoryDeltas) -> None:
+    """
+    Aplica as mudanças de uma carga já escrita (mesma transação, sem commit).
+
+    Contagem e soma são atualizadas por diferença. Mínimo e máximo também,
+    exceto quando um preço removido era o próprio mínimo/máximo; nesse caso,
+    e para categorias ainda sem resumo, a categoria é recalculada no banco.
+    """
+    if not deltas:
+        return
+    summaries = {
+        summary.category: summary
+        for summary in db.scalars(select(CategorySummary).where(CategorySummary.category.in_(deltas.categories)))
+    }
+
+    recompute = []
+    for category in deltas.categories:
+        summary = summaries.get(category)
+        removed = deltas.removed_prices.get(category, ())
+        if summary is None or summary.price_min in removed or summary.price_max in removed:
+            recompute.append(category)
+            continue
+
+        summary.product_count += deltas.count[category]
+        if summary.product_count <= 0:
+            db.delete(summary)
+            continue
+        summary.price_sum += deltas.total[category]
+        if category in deltas.added_min:
+            summary.price_min = min(summary.price_min, deltas.added_min[category])
+            summary.price_max = max(summary.price_max, deltas.added_max[category])
+        summary.updated_at = datetime.utcnow()
+
+    db.flush()
+    _recompute(db, recompute)
+
+
+def rebuild_category_summaries(db: Session) -> None:
+    """Reconstrói todos os resumos a partir da tabela de produtos."""
+    db.execute(delete(CategorySummary))
+    _recompute(db, db.scalars(select(Product.category).distinct()))
+    db.commit()
+
+
+def get_category_summaries(db: Session) -> list[CategorySummary]:
+    return list(db.scalars(select(CategorySummary).order_by(CategorySummary.category)))
+
+
+async def get_category_summaries_async(db: AsyncSession) -> list[CategorySummary]:
+    return list(await db.scalars(select(CategorySummary).order_by(CategorySummary.category)))
@@ -0,0 +1,70 @@
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .model_etl_run import EtlRun
+
+
+def start_etl_run(db: Session) -> EtlRun:
+    run = EtlRun(started_at=datetime.utcnow(), status="running")
+    db.add(run)
+    db.commit()
+    return run
+
+
+def finish_etl_run(db: Session, run: EtlRun, extracted: int, counts: dict) -> EtlRun:
+    run.finished_at = datetime.utcnow()
+    run.status = "success"
+    run.extracted = extracted
+    for field in ("added", "changed", "unchanged", "removed"):
+        setattr(run, field, counts.get(field, 0))
+    db.commit()
+    return run
+
+
+def fail_etl_run(db: Session, run: EtlRun, error: Exception) -> EtlRun:
+    db.rollback()
+    run.finished_at = datetime.utcnow()
+    run.status = "failed"
+    run.error = str(error)[:255]
+    db.commit()
+    return run
+
+
+def get_last_etl_run(db: Session, status: str | None = "success", before_id: int | None = None) -> EtlRun | None:
+    """Última execução (com `status`, se informado); com `before_id`, a última anterior a ela."""
+    return db.scalars(_last_run_query(status, before_id)).first()
+
+
+async def get_last_etl_run_async(db: AsyncSession, status: str | None = "success",
+                                 before_id: int | None = None) -> EtlRun | None:
+    return (await db.scalars(_last_run_query(status, before_id))).first()
+
+
+def _last_run_query(status: str | None, before_id: int | None):
+    query = select(EtlRun).order_by(EtlRun.id.desc()).limit(1)
+    if status is not None:
+        query = query.where(EtlRun.status == status)
+    if before_id is not None:
+        query = query.where(EtlRun.id < before_id)
+    return query
+
+
+def get_etl_run(db: Session, run_id: int) -> EtlRun | None:
+    return db.get(EtlRun, run_id)
+
+
+async def get_etl_run_async(db: AsyncSession, run_id: int) -> EtlRun | None:
+    return await db.get(EtlRun, run_id)
+
+
+_CATALOG_VERSION = select(func.max(EtlRun.id)).where(EtlRun.status == "success")
+
+
+def get_catalog_version(db: Session) -> int:
+    """Id da última execução bem-sucedida (0 se nenhuma): muda a cada carga que altera o catálogo."""
+    return db.scalar(_CATALOG_VERSION) or 0
+
+
+async def get_catalog_version_async(db: AsyncSession) -> int:
+    return await db.scalar(_CATALOG_VERSION) or 0
@@ -0,0 +1,87 @@
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .model_price_history import ProductPriceHistory
+from .model_product import Product
+
+
+def get_price_series(db: Session, product_id: int):
+    """
+    Série de preços de um produto em ordem cronológica, com a variação em
+    relação ao ponto anterior calculada no banco (LAG).
+    """
+    return db.execute(_price_series_query(product_id)).all()
+
+
+async def get_price_series_async(db: AsyncSession, product_id: int):
+    return (await db.execute(_price_series_query(product_id))).all()
+
+
+def _price_series_query(product_id: int):
+    history = ProductPriceHistory
+    previous = func.lag(history.price).over(
+        partition_by=history.product_id, order_by=(history.extracted_at, history.id)
+    )
+    return (
+        select(
+            history.extracted_at,
+            history.price,
+            (history.price - previous).label("change"),
+            history.etl_run_id,
+        )
+        .where(history.product_id == product_id)
+        .order_by(history.extracted_at, history.id)
+    )
+
+
+def _prices_as_of(cutoff: datetime):
+    """Último preço de cada produto até `cutoff` (ROW_NUMBER por produto, do mais recente)."""
+    history = ProductPriceHistory
+    ranked = (
+        select(
+            history.product_id,
+            history.price,
+            func.row_number().over(
+                partition_by=history.product_id,
+                order_by=(history.extracted_at.desc(), history.id.desc()),
+            ).label("position"),
+        )
+        .where(history.extracted_at <= cutoff)
+        .subquery()
+    )
+    return select(ranked.c.product_id, ranked.c.price).where(ranked.c.position == 1).subquery()
+
+
+def get_top_movers(db: Session, since: datetime, until: datetime, limit: int = 10):
+    """
+    Produtos com maior variação percentual de preço entre dois instantes
+    (tipicamente o início de duas execuções do ETL), calculada inteiramente em SQL.
+    """
+    return db.execute(_top_movers_query(since, until, limit)).all()
+
+
+async def get_top_movers_async(db: AsyncSession, since: datetime, until: datetime, limit: int = 10):
+    return (await db.execute(_top_movers_query(since, until, limit))).all()
+
+
+def _top_movers_query(since: datetime, until: datetime, limit: int):
+    before = _prices_as_of(since)
+    after = _prices_as_of(until)
+    change = after.c.price - before.c.price
+    change_pct = change * 100 / func.nullif(before.c.price, 0)
+    return (
+        select(
+            after.c.product_id,
+            Product.name,
+            before.c.price.label("old_price"),
+            after.c.price.label("new_price"),
+            change.label("change"),
+            change_pct.label("change_pct"),
+        )
+        .join(before, before.c.product_id == after.c.product_id)
+        .outerjoin(Product, Product.id == after.c.product_id)
+        .where(change != 0)
+        .order_by(func.abs(change_pct).desc(), after.c.product_id)
+        .limit(limit)
+    )
@@ -1,20 +1,320 @@
+import hashlib
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import Numeric, TypeDecorator, delete, func, insert, select, type_coerce
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .model_product import Product
+from .model_price_history import ProductPriceHistory
+from .crud_category_summary import CategoryDeltas, apply_category_deltas
 
 
-def insert_products(db: Session, products: list[dict]):
-    for product_data in products:
-        product = Product(
-            id=product_data["id"],
-            name=product_data["title"],
-            category=product_data["category"],
-            price=product_data["price"],
-            description=product_data["description"],
-            image_url=product_data["image"],
-            timestamp=product_data["extracted_at"]
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class TooManyRemovals(Exception):
+    """A remoção apagaria uma fração do catálogo acima do limite (extração provavelmente incompleta)."""
+
+
+class _FloatPrice(TypeDecorator):
+    """Lê o preço como float em qualquer dialeto (o SQLite devolve int para valores inteiros)."""
+
+    impl = Numeric(10, 2, asdecimal=False)
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else float(value)
+
+
+# Colunas expostas pela API de leitura; o preço sai como float, pronto para serializar
+PRODUCT_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "category": Product.category,
+    "price": type_coerce(Product.price, _FloatPrice()).label("price"),
+    "description": Product.description,
+    "image_url": Product.image_url,
+    "timestamp": Product.timestamp,
+}
+
+# Colunas de origem que entram no hash de conteúdo de cada linha
+_HASHED_FIELDS = ("name", "category", "price", "description", "image_url")
+_UPDATED_FIELDS = _HASHED_FIELDS + ("timestamp", "content_hash")
+
+
+@dataclass
+class UpsertResult:
+    """Diferença entre a carga e o banco: linhas novas, alteradas, inalteradas e removidas."""
+
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _to_decimal(value):
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def content_hash(row: dict) -> str:
+    """SHA-256 dos campos de origem do produto; muda somente se o conteúdo mudar."""
+    payload = "\x1f".join("" if row[field] is None else str(row[field]) for field in _HASHED_FIELDS)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _to_row(product_data: dict) -> dict:
+    row = {
+        "id": product_data["id"],
+        "name": product_data["name"],
+        "category": product_data["category"],
+        "price": _to_decimal(product_data["price"]),
+        "description": product_data.get("description"),
+        "image_url": product_data.get("image_url"),
+        "timestamp": _to_datetime(product_data.get("timestamp")) or datetime.utcnow(),
+    }
+    row["content_hash"] = content_hash(row)
+    return row
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _upsert_statement(dialect_name: str):
+    """
+    Monta o INSERT ... ON DUPLICATE KEY UPDATE (MySQL) ou
+    INSERT ... ON CONFLICT DO UPDATE (SQLite). Retorna None para outros dialetos.
+    """
+    if dialect_name in ("mysql", "mariadb"):
+        stmt = mysql.insert(Product)
+        return stmt.on_duplicate_key_update({field: stmt.inserted[field] for field in _UPDATED_FIELDS})
+    if dialect_name == "sqlite":
+        stmt = sqlite.insert(Product)
+        return stmt.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={field: stmt.excluded[field] for field in _UPDATED_FIELDS},
         )
-        db.merge(product)  
+    return None
+
+
+def insert_products(db: Session, products, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    run_id: int | None = None) -> UpsertResult:
+    """
+    Carrega os produtos (dicts com as colunas de `Product`, como os gerados por
+    `transform_products`) em lotes de `chunk_size` com upsert nativo do dialeto.
+
+    Para cada lote é feita uma única consulta pelos hashes de conteúdo já
+    gravados; apenas as linhas novas ou com hash diferente são enviadas ao
+    banco, em um único executemany. Produtos novos e mudanças de preço são
+    anexados a `product_price_history` (com `run_id`, se informado). Os
+    resumos por categoria são atualizados na mesma transação. Se nada mudou,
+    nenhuma escrita é feita e a transação é encerrada sem commit.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size deve ser maior que zero")
+
+    # Em caso de ids repetidos no payload, prevalece a última ocorrência
+    rows = list({row["id"]: row for row in map(_to_row, products)}.values())
+
+    result = UpsertResult()
+    upsert = _upsert_statement(db.get_bind().dialect.name)
+    deltas = CategoryDeltas()
+
+    for chunk in _chunks(rows, chunk_size):
+        existing = {
+            row.id: row
+            for row in db.execute(
+                select(Product.id, Product.content_hash, Product.category, Product.price)
+                .where(Product.id.in_([r["id"] for r in chunk]))
+            )
+        }
+
+        pending, history = [], []
+        for row in chunk:
+            current = existing.get(row["id"])
+            if current is None:
+                result.added += 1
+            elif current.content_hash == row["content_hash"]:
+                result.unchanged += 1
+                continue
+            else:
+                result.changed += 1
+                deltas.remove(current.category, current.price)
+            if current is None or current.price != row["price"]:
+                history.append({
+                    "product_id": row["id"],
+                    "price": row["price"],
+                    "extracted_at": row["timestamp"],
+                    "etl_run_id": run_id,
+                })
+            deltas.add(row["category"], row["price"])
+            pending.append(row)
+
+        if not pending:
+            continue
+        if upsert is not None:
+            db.execute(upsert, pending)
+        else:
+            for row in pending:
+                db.merge(Product(**row))
+        if history:
+            db.execute(insert(ProductPriceHistory), history)
+
+    if deltas:
+        apply_category_deltas(db, deltas)
+        db.commit()
+    else:
+        db.rollback()
+    return result
+
+
+def remove_missing_products(db: Session, keep_ids, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            max_ratio: float | None = None) -> int:
+    """
+    Remove os produtos cujo id não está em `keep_ids` (não vieram na última
+    extração). Com `max_ratio`, levanta `TooManyRemovals` sem apagar nada se
+    a remoção passar dessa fração do catálogo.
+    """
+    keep_ids = set(keep_ids)
+    current = db.scalars(select(Product.id)).all()
+    missing = [product_id for product_id in current if product_id not in keep_ids]
+    if not missing:
+        db.rollback()
+        return 0
+    if max_ratio is not None and len(missing) > max_ratio * len(current):
+        db.rollback()
+        raise TooManyRemovals(
+            f"A extração removeria {len(missing)} de {len(current)} produtos (limite {max_ratio:.0%})"
+        )
+
+    deltas = CategoryDeltas()
+    for chunk in _chunks(missing, chunk_size):
+        for category, price in db.execute(select(Product.category, Product.price).where(Product.id.in_(chunk))):
+            deltas.remove(category, price)
+        db.execute(delete(Product).where(Product.id.in_(chunk)))
+    apply_category_deltas(db, deltas)
     db.commit()
+    return len(missing)
+
+
+def _apply_filters(query, category=None, min_price=None, max_price=None, after_id=None):
+    if category is not None:
+        query = query.where(Product.category == category)
+    if min_price is not None:
+        query = query.where(Product.price >= min_price)
+    if max_price is not None:
+        query = query.where(Product.price <= max_price)
+    if after_id is not None:
+        query = query.where(Product.id > after_id)
+    return query
+
+
+def get_products(db: Session, limit: int | None = None, after_id: int | None = None,
+                 category: str | None = None, min_price: float | None = None,
+                 max_price: float | None = None):
+    """
+    Lista os produtos. Sem parâmetros retorna a tabela inteira; com `limit` e/ou
+    `after_id` faz paginação por keyset (ordenada por id).
+    """
+    query = _apply_filters(db.query(Product), category, min_price, max_price, after_id)
+    if limit is not None or after_id is not None:
+        query = query.order_by(Product.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def get_product_rows(db: Session, fields=None, limit: int | None = None, after_id: int | None = None,
+                     category: str | None = None, min_price: float | None = None,
+                     max_price: float | None = None):
+    """
+    Igual a `get_products`, mas via Core: seleciona só os `fields` pedidos
+    (todos de `PRODUCT_FIELDS` por padrão), em ordem de id, sem identity map.
+    """
+    return db.execute(_product_rows_query(fields, limit, after_id, category, min_price, max_price)).all()
+
+
+async def get_product_rows_async(db: AsyncSession, fields=None, limit: int | None = None,
+                                 after_id: int | None = None, category: str | None = None,
+                                 min_price: float | None = None, max_price: float | None = None):
+    """Versão assíncrona de `get_product_rows`."""
+    return (await db.execute(_product_rows_query(fields, limit, after_id, category, min_price, max_price))).all()
+
+
+def _product_rows_query(fields, limit, after_id, category, min_price, max_price):
+    columns = [PRODUCT_FIELDS[field] for field in fields or PRODUCT_FIELDS]
+    query = _apply_filters(select(*columns), category, min_price, max_price, after_id).order_by(Product.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def get_product_rows_by_ids(db: Session, ids: list[int], fields=None) -> list:
+    """Linhas (via Core) dos produtos de `ids`, na mesma ordem de `ids`; ids inexistentes são ignorados."""
+    if not ids:
+        return []
+    fields = list(fields or PRODUCT_FIELDS)
+    columns = [PRODUCT_FIELDS[field] for field in fields]
+    if "id" not in fields:
+        columns.append(Product.id)
+    rows = {row.id: row for row in db.execute(select(*columns).where(Product.id.in_(ids)))}
+    return [rows[product_id] for product_id in ids if product_id in rows]
+
+
+def iter_products(db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE, after_id: int | None = None,
+                  category: str | None = None, min_price: float | None = None,
+                  max_price: float | None = None):
+    """
+    Percorre os produtos em ordem de id com cursor do lado do servidor,
+    materializando no máximo `chunk_size` objetos por vez.
+    """
+    query = _apply_filters(select(Product), category, min_price, max_price, after_id)
+    query = query.order_by(Product.id).execution_options(yield_per=chunk_size)
+    yield from db.scalars(query)
+
+
+def iter_product_rows(db: Session, columns=None, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters):
+    """
+    Igual a `iter_products`, mas devolve tuplas com as colunas pedidas
+    (todas por padrão) sem passar pelo ORM, em lotes de `chunk_size`.
+    """
+    yield from db.execute(_product_rows_stream_query(columns, chunk_size, filters))
+
+
+async def iter_product_rows_async(db: AsyncSession, columns=None, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters):
+    """Versão assíncrona de `iter_product_rows`: lotes de `chunk_size` lidos de um cursor em fluxo."""
+    result = await db.stream(_product_rows_stream_query(columns, chunk_size, filters))
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
+
+
+def _product_rows_stream_query(columns, chunk_size: int, filters: dict):
+    columns = columns or list(Product.__table__.columns)
+    query = _apply_filters(select(*columns), **filters)
+    return query.order_by(Product.id).execution_options(yield_per=chunk_size)
+
+
+def get_data_version(db: Session) -> tuple[int, datetime | None]:
+    """Retorna (quantidade de produtos, maior timestamp), usado para versionar relatórios."""
+    count, last_timestamp = db.execute(select(func.count(), func.max(Product.timestamp))).one()
+    return count, last_timestamp
+
 
-def get_products(db: Session):
-    return db.query(Product).all()
+def has_products(db: Session) -> bool:
+    """Verifica se há algum produto com uma única busca pela chave primária."""
+    return db.scalar(select(Product.id).limit(1)) is not None
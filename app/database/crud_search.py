@@ -0,0 +1,59 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+from .model_product import Product
+
+
+FULLTEXT_DIALECTS = ("mysql", "mariadb")
+
+
+def uses_fulltext(db: Session) -> bool:
+    """No MySQL a busca usa o índice FULLTEXT; nos demais dialetos, o índice em memória."""
+    return db.get_bind().dialect.name in FULLTEXT_DIALECTS
+
+
+def boolean_query(terms: list[str]) -> str:
+    """Todos os termos obrigatórios e o último como prefixo: `+camiseta +alg*`."""
+    return " ".join(f"+{term}" for term in terms[:-1]) + f" +{terms[-1]}*"
+
+
+def search_products_fulltext(db: Session, terms: list[str], category: str | None = None,
+                             limit: int = 20, offset: int = 0) -> tuple[int, list[tuple[int, float]]]:
+    """
+    Busca com `MATCH ... AGAINST` em modo booleano sobre o índice FULLTEXT de
+    (name, description); a relevância é a do InnoDB. Retorna (total, [(id, score)]).
+    """
+    relevance = mysql.match(Product.name, Product.description, against=boolean_query(terms)).in_boolean_mode()
+    conditions = [relevance]
+    if category is not None:
+        conditions.append(Product.category == category)
+    total = db.scalar(select(func.count()).select_from(Product).where(*conditions))
+    hits = db.execute(
+        select(Product.id, relevance.label("score"))
+        .where(*conditions)
+        .order_by(relevance.desc(), Product.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    return total, [(product_id, float(score)) for product_id, score in hits]
+
+
+def iter_search_documents(db: Session, ids=None, chunk_size: int = 5000):
+    """
+    (id, content_hash, category, name, description) em ordem de id, de todos
+    os produtos ou só dos `ids` informados (consultados em lotes).
+    """
+    columns = (Product.id, Product.content_hash, Product.category, Product.name, Product.description)
+    if ids is None:
+        yield from db.execute(select(*columns).order_by(Product.id).execution_options(yield_per=chunk_size))
+        return
+    ids = sorted(ids)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        yield from db.execute(select(*columns).where(Product.id.in_(chunk)).order_by(Product.id))
+
+
+def iter_content_hashes(db: Session, chunk_size: int = 20000):
+    """(id, content_hash) de todos os produtos em ordem de id: o bastante para saber o que mudou."""
+    query = select(Product.id, Product.content_hash).order_by(Product.id).execution_options(yield_per=chunk_size)
+    yield from db.execute(query)
@@ -1,21 +1,327 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, sessionmaker
+from ..metrics import instrument_engine
 
 
 load_dotenv()
 
 
-engine = create_engine(os.getenv("DATABASE_URL"))
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+# Sem bind: o engine só é criado no lifespan da aplicação (ou no primeiro uso),
+# então importar o app não conecta nem exige DATABASE_URL
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# Sessões assíncronas das rotas de leitura; sem expirar no commit, pois um
+# atributo expirado não pode ser recarregado implicitamente fora de um await
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+# Driver assíncrono usado para cada banco de `DATABASE_URL`
+ASYNC_DRIVERS = {"mysql": "aiomysql", "mariadb": "aiomysql", "sqlite": "aiosqlite"}
+
+# Opções de pool lidas do ambiente, por prefixo: DATABASE_POOL_SIZE (primário),
+# DATABASE_REPLICA_POOL_SIZE (réplicas) etc.; as ausentes ficam no padrão do dialeto
+POOL_OPTIONS = {
+    "POOL_SIZE": ("pool_size", int),
+    "MAX_OVERFLOW": ("max_overflow", int),
+    "POOL_TIMEOUT": ("pool_timeout", float),
+    "POOL_RECYCLE": ("pool_recycle", int),
+}
+
+# Argumento de timeout de conexão de cada driver (pymysql e aiomysql usam o
+# mesmo nome); bancos ausentes aqui conectam sem timeout próprio (ex.: SQLite)
+CONNECT_TIMEOUT_ARGS = {"mysql": "connect_timeout", "mariadb": "connect_timeout"}
+
+# Falhas que tiram uma réplica de rotação: erros do SQLAlchemy e de rede não
+# embrulhados pelo driver (ConnectionRefusedError, TimeoutError...)
+REPLICA_ERRORS = (SQLAlchemyError, OSError)
+
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_replicas: "ReplicaSet | None" = None
+_engine_lock = threading.Lock()
+
+
+def pool_options(prefix: str = "DATABASE") -> dict:
+    """Argumentos de pool para `create_engine` definidos em `<prefix>_POOL_SIZE`, `<prefix>_MAX_OVERFLOW`..."""
+    options = {}
+    for suffix, (name, cast) in POOL_OPTIONS.items():
+        value = os.getenv(f"{prefix}_{suffix}")
+        if value:
+            options[name] = cast(value)
+    return options
+
+
+def connect_args(url: str | URL, timeout: float | None) -> dict:
+    """`connect_args` com o timeout de conexão do driver de `url`, se ele tiver um."""
+    name = CONNECT_TIMEOUT_ARGS.get(make_url(url).get_backend_name())
+    return {name: timeout} if name and timeout else {}
+
+
+def create_db_engine(url: str | None = None) -> Engine:
+    url = url or os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL não definida")
+    return create_engine(url, **pool_options())
+
+
+def get_engine() -> Engine:
+    """Engine compartilhado do processo, criado na primeira chamada."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_db_engine()
+            instrument_engine(_engine, "primary")
+            SessionLocal.configure(bind=_engine)
+        return _engine
+
+
+def dispose_engine():
+    """Fecha as conexões do pool (e das réplicas); a próxima chamada a `get_engine` cria um engine novo."""
+    global _engine, _replicas
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        if _replicas is not None:
+            _replicas.dispose()
+            _replicas = None
+
+
+def to_async_url(url: str | URL) -> URL:
+    """Mesma URL com o driver assíncrono do banco (ex.: mysql+pymysql → mysql+aiomysql)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"Sem driver assíncrono para {backend}; defina ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def async_database_url() -> URL:
+    """`ASYNC_DATABASE_URL`, se definida, ou a `DATABASE_URL` com o driver assíncrono."""
+    url = os.getenv("ASYNC_DATABASE_URL")
+    if url:
+        return make_url(url)
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL não definida")
+    return to_async_url(url)
+
+
+def create_async_db_engine(url: str | URL | None = None) -> AsyncEngine:
+    return create_async_engine(url or async_database_url(), **pool_options())
+
+
+def get_async_engine() -> AsyncEngine:
+    """Engine assíncrono compartilhado do processo, criado na primeira chamada."""
+    global _async_engine
+    with _engine_lock:
+        if _async_engine is None:
+            _async_engine = create_async_db_engine()
+            instrument_engine(_async_engine, "primary_async")
+            AsyncSessionLocal.configure(bind=_async_engine)
+        return _async_engine
+
+
+async def dispose_async_engine():
+    global _async_engine
+    with _engine_lock:
+        engine, _async_engine = _async_engine, None
+        replicas = _replicas
+    if engine is not None:
+        await engine.dispose()
+    if replicas is not None:
+        await replicas.dispose_async()
+
+
+class ReplicaSet:
+    """
+    Réplicas de leitura, escolhidas em round-robin.
+
+    Cada réplica passa por um `SELECT 1` quando é escolhida e a última
+    verificação tem mais de `check_interval` segundos; se falhar, fica fora
+    por `retry_after` segundos. A verificação roda na requisição, então as
+    réplicas conectam com `connect_timeout` segundos de limite: uma réplica
+    inalcançável atrasa uma leitura nesse tanto, não no timeout do sistema. Sem réplica saudável, as leituras vão ao
+    primário, assim como durante a janela de read-your-writes aberta por
+    `mark_write` (após uma carga do ETL).
+    """
+
+    def __init__(self, urls: list[str], check_interval: float = 5.0, retry_after: float = 30.0,
+                 read_your_writes: float = 0.0, connect_timeout: float | None = 2.0, clock=time.monotonic):
+        self.urls = [make_url(url) for url in urls]
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.read_your_writes = read_your_writes
+        self.connect_timeout = connect_timeout
+        self._clock = clock
+        self._engines: list[Engine | None] = [None] * len(urls)
+        self._async_engines: list[AsyncEngine | None] = [None] * len(urls)
+        self._checked_at = [float("-inf")] * len(urls)
+        self._down_until = [float("-inf")] * len(urls)
+        self._primary_until = float("-inf")
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def mark_write(self):
+        """Abre a janela em que as leituras vão ao primário, que já tem a escrita recém-confirmada."""
+        if self.read_your_writes > 0:
+            self._primary_until = self._clock() + self.read_your_writes
+
+    def _candidates(self) -> list[int]:
+        """Réplicas a tentar, a partir da próxima do round-robin, sem as que estão fora."""
+        now = self._clock()
+        if now < self._primary_until:
+            return []
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.urls)
+        order = [(start + offset) % len(self.urls) for offset in range(len(self.urls))]
+        return [index for index in order if now >= self._down_until[index]]
+
+    def _needs_check(self, index: int) -> bool:
+        return self._clock() - self._checked_at[index] >= self.check_interval
+
+    def _report(self, index: int, healthy: bool):
+        now = self._clock()
+        self._checked_at[index] = now
+        if not healthy:
+            self._down_until[index] = now + self.retry_after
+            print(f"⚠️ Réplica {self.urls[index].render_as_string()} fora por {self.retry_after:.0f}s")
+
+    def _engine(self, index: int) -> Engine:
+        with self._lock:
+            if self._engines[index] is None:
+                self._engines[index] = create_engine(
+                    self.urls[index], connect_args=connect_args(self.urls[index], self.connect_timeout),
+                    **pool_options("DATABASE_REPLICA"),
+                )
+                instrument_engine(self._engines[index], f"replica{index}")
+            return self._engines[index]
+
+    def _async_engine(self, index: int) -> AsyncEngine:
+        with self._lock:
+            if self._async_engines[index] is None:
+                url = to_async_url(self.urls[index])
+                self._async_engines[index] = create_async_engine(
+                    url, connect_args=connect_args(url, self.connect_timeout), **pool_options("DATABASE_REPLICA")
+                )
+                instrument_engine(self._async_engines[index], f"replica{index}_async")
+            return self._async_engines[index]
+
+    def engine(self) -> Engine | None:
+        """Engine da próxima réplica saudável, ou `None` para usar o primário."""
+        for index in self._candidates():
+            engine = self._engine(index)
+            if self._needs_check(index):
+                try:
+                    with engine.connect() as connection:
+                        connection.exec_driver_sql("SELECT 1")
+                except REPLICA_ERRORS:
+                    self._report(index, healthy=False)
+                    continue
+                self._report(index, healthy=True)
+            return engine
+        return None
+
+    async def async_engine(self) -> AsyncEngine | None:
+        for index in self._candidates():
+            engine = self._async_engine(index)
+            if self._needs_check(index):
+                try:
+                    async with engine.connect() as connection:
+                        await connection.exec_driver_sql("SELECT 1")
+                except REPLICA_ERRORS:
+                    self._report(index, healthy=False)
+                    continue
+                self._report(index, healthy=True)
+            return engine
+        return None
+
+    def dispose(self):
+        for engine in self._engines:
+            if engine is not None:
+                engine.dispose()
+
+    async def dispose_async(self):
+        for engine in self._async_engines:
+            if engine is not None:
+                await engine.dispose()
+
+
+def get_replicas() -> ReplicaSet | None:
+    """Réplicas de `DATABASE_REPLICA_URLS` (separadas por vírgula), ou `None` se não houver."""
+    global _replicas
+    with _engine_lock:
+        if _replicas is None:
+            urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+            if not urls:
+                return None
+            _replicas = ReplicaSet(
+                urls,
+                check_interval=float(os.getenv("REPLICA_CHECK_SECONDS", 5)),
+                retry_after=float(os.getenv("REPLICA_RETRY_SECONDS", 30)),
+                read_your_writes=float(os.getenv("READ_YOUR_WRITES_SECONDS", 0)),
+                connect_timeout=float(os.getenv("REPLICA_CONNECT_TIMEOUT", 2)),
+            )
+        return _replicas
+
+
+def mark_primary_write():
+    """Chamado após uma escrita confirmada no primário (fim do ETL): abre a janela de read-your-writes."""
+    replicas = get_replicas()
+    if replicas is not None:
+        replicas.mark_write()
+
+
+def new_session() -> Session:
+    return SessionLocal(bind=get_engine())
 
 
 def get_db():
-    db = SessionLocal()
+    db = new_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def new_async_session() -> AsyncSession:
+    return AsyncSessionLocal(bind=get_async_engine())
+
+
+async def get_async_db():
+    async with new_async_session() as db:
+        yield db
+
+
+def new_read_session() -> Session:
+    """Sessão numa réplica de leitura (round-robin), ou no primário se não houver réplica disponível."""
+    replicas = get_replicas()
+    engine = replicas.engine() if replicas is not None else None
+    return SessionLocal(bind=engine or get_engine())
+
+
+def get_read_db():
+    db = new_read_session()
     try:
         yield db
     finally:
         db.close()
+
+
+async def new_async_read_session() -> AsyncSession:
+    replicas = get_replicas()
+    engine = await replicas.async_engine() if replicas is not None else None
+    return AsyncSessionLocal(bind=engine or get_async_engine())
+
+
+async def get_async_read_db():
+    async with await new_async_read_session() as db:
+        yield db
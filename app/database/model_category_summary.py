@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime
+from .db import Base
+from datetime import datetime
+
+class CategorySummary(Base):
+    __tablename__ = "category_summaries"
+
+    category = Column(String(100), primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(DECIMAL(16,2), nullable=False, default=0)
+    price_min = Column(DECIMAL(10,2), nullable=True)
+    price_max = Column(DECIMAL(10,2), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def price_mean(self):
+        return self.price_sum / self.product_count if self.product_count else None
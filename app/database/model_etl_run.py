@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from .db import Base
+from datetime import datetime
+
+class EtlRun(Base):
+    __tablename__ = "etl_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    status = Column(String(20), nullable=False, default="running")
+    extracted = Column(Integer, nullable=False, default=0)
+    added = Column(Integer, nullable=False, default=0)
+    changed = Column(Integer, nullable=False, default=0)
+    unchanged = Column(Integer, nullable=False, default=0)
+    removed = Column(Integer, nullable=False, default=0)
+    error = Column(String(255), nullable=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DECIMAL, DateTime, Index
+from .db import Base
+
+class ProductPriceHistory(Base):
+    """Histórico append-only de preços: uma linha por produto novo ou mudança de preço."""
+
+    __tablename__ = "product_price_history"
+    __table_args__ = (
+        Index("ix_price_history_product_extracted", "product_id", "extracted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Sem chave estrangeira: o histórico continua depois que o produto sai do catálogo
+    product_id = Column(Integer, nullable=False)
+    price = Column(DECIMAL(10,2), nullable=False)
+    extracted_at = Column(DateTime, nullable=False)
+    etl_run_id = Column(Integer, nullable=True)
@@ -1,9 +1,23 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, Text, DateTime, func
+from sqlalchemy import Column, Index, Integer, String, DECIMAL, Text, DateTime, func
 from .db import Base
 from datetime import datetime
 
+FULLTEXT_INDEX = "ft_products_name_description"
+
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Filtro por categoria com faixa de preço, e os agregados por categoria (cobertos pelo índice)
+        Index("ix_products_category_price", "category", "price"),
+        # Listagem paginada por categoria (`category = ? AND id > ? ORDER BY id`) sem ordenação extra;
+        # cobre as projeções enxutas (`fields=id,name,price`) sem ler a tabela
+        Index("ix_products_category_list", "category", "id", "price", "name"),
+        # Última extração (`MAX(timestamp)`) sem varrer a tabela
+        Index("ix_products_timestamp", "timestamp"),
+        # Índice de texto da busca; só existe no MySQL (nos demais dialetos a busca usa o índice em memória)
+        Index(FULLTEXT_INDEX, "name", "description", mysql_prefix="FULLTEXT").ddl_if(dialect=("mysql", "mariadb")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -12,3 +26,4 @@ class Product(Base):
     description = Column(Text, nullable=True)
     image_url = Column(String(255), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    content_hash = Column(String(64), nullable=True)
@@ -0,0 +1,80 @@
+"""
+Plano de execução das consultas (EXPLAIN), para detectar varreduras completas.
+
+`explain` roda `EXPLAIN QUERY PLAN` no SQLite e `EXPLAIN` no MySQL sobre uma
+consulta do SQLAlchemy, com os mesmos parâmetros que a rota usaria, e devolve
+os passos num formato comum aos dois dialetos.
+"""
+import re
+from dataclasses import dataclass
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN" if compiler.dialect.name == "sqlite" else "EXPLAIN"
+    return f"{prefix} {compiler.process(element.query, **kw)}"
+
+
+@dataclass
+class PlanStep:
+    table: str
+    # Varredura de todas as linhas da tabela ou de um índice inteiro
+    full_scan: bool
+    index: str | None
+    detail: str
+
+
+@dataclass
+class QueryPlan:
+    steps: list[PlanStep]
+    # Ordenação feita à parte (temp B-tree no SQLite, filesort no MySQL), e não pela ordem de um índice
+    sorts: bool
+
+    @property
+    def full_scans(self) -> list[PlanStep]:
+        return [step for step in self.steps if step.full_scan]
+
+    def __str__(self) -> str:
+        return "\n".join(f"{step.table}: {step.detail}" for step in self.steps)
+
+
+# SQLite: "SCAN products", "SCAN products USING COVERING INDEX ix", "SEARCH products USING INDEX ix (category=?)"
+_SQLITE_STEP = re.compile(r"^(SCAN|SEARCH) (\S+)(?: USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (\S+))?)?")
+
+
+def explain(db: Session, query) -> QueryPlan:
+    """Plano de `query`: os passos que leem tabelas (subconsultas materializadas ficam de fora)."""
+    dialect = db.get_bind().dialect.name
+    # Lido direto do cursor: o resultado traria os conversores de tipo das colunas de `query`
+    result = db.execute(Explain(query))
+    names = [column[0] for column in result.cursor.description]
+    rows = [dict(zip(names, row)) for row in result.cursor.fetchall()]
+    result.close()
+
+    steps = []
+    if dialect == "sqlite":
+        for row in rows:
+            match = _SQLITE_STEP.match(row["detail"])
+            if match is None or match[2].startswith("("):
+                continue
+            index = match[3] or ("PRIMARY KEY" if "PRIMARY KEY" in row["detail"] else None)
+            steps.append(PlanStep(match[2], match[1] == "SCAN", index, row["detail"]))
+        sorts = any("TEMP B-TREE FOR ORDER BY" in row["detail"] for row in rows)
+    else:
+        for row in rows:
+            if row["table"] is None or row["table"].startswith("<"):
+                continue
+            detail = f"type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}"
+            steps.append(PlanStep(row["table"], row["type"] in ("ALL", "index"), row["key"], detail))
+        sorts = any("filesort" in (row["Extra"] or "") for row in rows)
+    return QueryPlan(steps, sorts)
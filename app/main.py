@@ -1,9 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database.db import engine, Base
+from fastapi.responses import PlainTextResponse
+from .database.db import dispose_async_engine, dispose_engine, get_async_engine, get_engine
 from .api.routes import router
+from .metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .services.etl_pipeline import start_etl_scheduler
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="FakeStore ETL API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O schema é criado por `python -m app.migrate`, não na inicialização;
+    # os engines já saem instrumentados para as métricas de pool
+    get_engine()
+    # Rotas de leitura usam o engine assíncrono (aiomysql / aiosqlite)
+    get_async_engine()
+    scheduler = start_etl_scheduler()
+    yield
+    if scheduler is not None:
+        scheduler.stop()
+    # Antes de `dispose_engine`, que descarta também o conjunto de réplicas
+    await dispose_async_engine()
+    dispose_engine()
+
+
+app = FastAPI(title="FakeStore ETL API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+# Desligado por padrão (PROFILING=off): só repassa a requisição
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(router, prefix="/api", tags=["ETL"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,275 @@
+"""
+Métricas da aplicação no formato texto do Prometheus, servidas em `/metrics`.
+
+Implementação mínima e sem dependências: cada observação custa um lock e uma
+busca binária nos buckets, então as métricas podem ficar sempre ligadas.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable
+from sqlalchemy import event
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera os labels {self.labelnames}, recebeu {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def collect(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.collect())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    Gauge cujo valor pode ser definido com `set` ou lido de uma função no
+    momento da coleta (`function`, ou uma por combinação de labels com
+    `set_function`); funções que devolvem None não geram linha.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function: Callable[[], float] | None = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._functions: dict[tuple, Callable[[], float | None]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float | None], **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def collect(self):
+        if self.function is not None:
+            value = self.function()
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        items += [(key, function()) for key, function in functions]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items if value is not None
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+ETL_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "etl_stage_duration_seconds", "Duração de cada etapa do ETL.", ["stage"]
+))
+ETL_RUNS = REGISTRY.register(Counter("etl_runs_total", "Execuções do ETL por status.", ["status"]))
+ETL_ROWS_PER_RUN = REGISTRY.register(Histogram(
+    "etl_rows_per_run", "Linhas processadas por execução do ETL, por resultado.", ["outcome"],
+    buckets=(0, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+))
+REPORT_RENDER_SECONDS = REGISTRY.register(Histogram(
+    "report_render_seconds", "Tempo de geração do relatório.", ["mode"]
+))
+REPORT_SIZE_BYTES = REGISTRY.register(Histogram(
+    "report_size_bytes", "Tamanho do relatório gerado.", ["mode"],
+    buckets=tuple(2 ** power for power in range(12, 32, 2)),
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota.", ["method", "route", "status"]
+))
+DB_POOL_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "db_pool_wait_seconds", "Tempo para obter uma conexão do pool do SQLAlchemy.", ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 30),
+))
+# Estado de cada pool, por engine (primary, primary_async, replica0...), lido só na coleta
+DB_POOL_STATS = {
+    method: REGISTRY.register(Gauge(name, documentation, ["engine"]))
+    for name, method, documentation in (
+        ("db_pool_checked_out", "checkedout", "Conexões do pool em uso."),
+        ("db_pool_overflow", "overflow", "Conexões abertas além do tamanho do pool."),
+        ("db_pool_size", "size", "Tamanho configurado do pool."),
+    )
+}
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """
+    Expõe o estado do pool do `engine` (síncrono ou assíncrono) com o label
+    `engine=name` e mede o tempo de espera por conexão. O pool é lido na
+    coleta e volta a ser medido quando `engine.dispose()` o recria.
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    if getattr(engine, "_metrics_name", None) is not None:
+        return
+    engine._metrics_name = name
+
+    def pool_stat(method):
+        def read():
+            reader = getattr(engine.pool, method, None)
+            return reader() if callable(reader) else None
+        return read
+
+    for method, gauge in DB_POOL_STATS.items():
+        gauge.set_function(pool_stat(method), engine=name)
+
+    _time_pool_connect(engine.pool, name)
+    # Não há evento antes do checkout; o dispose troca o pool, que recebe o wrapper de novo
+    event.listen(engine, "engine_disposed", lambda disposed: _time_pool_connect(disposed.pool, name))
+
+
+def _time_pool_connect(pool, name: str):
+    # Engine.raw_connection() chama pool.connect(); o wrapper mede a espera
+    # (inclui abrir uma conexão nova quando o pool ainda não tem uma livre)
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, engine=name)
+
+    pool.connect = timed_connect
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede a latência de cada requisição pelo template da rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"]),
+            )
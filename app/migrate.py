@@ -0,0 +1,60 @@
+"""
+Cria o schema do banco fora da inicialização da API.
+
+Uso:
+    python -m app.migrate
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from .database.db import Base, get_engine
+# Registra todas as tabelas no metadata
+from .database import model_category_summary, model_etl_run, model_price_history, model_product  # noqa: F401
+
+
+def _add_missing_columns(engine: Engine):
+    """
+    `create_all` também não altera tabelas existentes; adiciona as colunas
+    novas (ex.: `products.content_hash`) com `ALTER TABLE ... ADD COLUMN`.
+    Só colunas que aceitam NULL: as linhas antigas ficam sem valor.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Coluna obrigatória {table.name}.{column.name} não pode ser adicionada")
+            with engine.begin() as connection:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                    f"{preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+                )
+
+
+def _create_missing_indexes(engine: Engine):
+    """`create_all` não cria índices novos em tabelas que já existiam; cria os que faltam."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                # Índices condicionais (ex.: FULLTEXT só no MySQL) são ignorados nos demais dialetos
+                index.create(bind=engine)
+
+
+def migrate(engine: Engine | None = None) -> list[str]:
+    """Cria as tabelas, colunas e índices que ainda não existem; retorna os nomes das tabelas do schema."""
+    engine = engine or get_engine()
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _create_missing_indexes(engine)
+    return sorted(Base.metadata.tables)
+
+
+if __name__ == "__main__":
+    tables = migrate()
+    print(f"✅ Schema atualizado: {', '.join(tables)}")
@@ -0,0 +1,325 @@
+"""
+Profiler por requisição e rastreamento de SQL, ligados sob demanda.
+
+`PROFILING` escolhe quando perfilar: `off` (padrão), `header` (só as
+requisições com o header `X-Profile: <PROFILE_TOKEN>`) ou `all`. Sem
+`PROFILE_TOKEN` o modo `header` não perfila nada: qualquer cliente poderia
+mandar o header e fazer o servidor gravar perfis. Com `off` o middleware só
+repassa a requisição e nenhum listener é registrado no SQLAlchemy.
+
+Para cada requisição perfilada:
+- Um amostrador em thread lê as pilhas de todas as threads a cada
+  `PROFILE_INTERVAL_MS` (padrão 5). Endpoints síncronos, streaming e o ETL
+  rodam fora da thread do event loop, onde um cProfile não enxergaria nada.
+  Threads ociosas são ignoradas; requisições simultâneas aparecem no mesmo
+  perfil.
+- Os eventos `before/after_cursor_execute` de todos os engines contam e
+  cronometram cada comando SQL executado no contexto da requisição
+  (incluindo as threads do ETL, que herdam o contexto). Comandos repetidos
+  com parâmetros diferentes são sinalizados como N+1; os repetidos com os
+  mesmos parâmetros, como duplicados.
+
+O resumo vai nos headers `X-Profile` e `Server-Timing`. Os detalhes ficam
+em `PROFILE_DIR`: `<id>.json`, com os comandos agrupados, os alertas e as
+funções mais amostradas, e `<id>.folded`, com as pilhas no formato do
+flamegraph.pl / speedscope. Em respostas em streaming os arquivos incluem o
+corpo inteiro, mas o header só reflete o que aconteceu até o envio. Só os
+`PROFILE_MAX_FILES` perfis mais recentes são mantidos; a gravação roda numa
+thread, fora do event loop.
+"""
+import hmac
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+import anyio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+MODES = ("off", "header", "all")
+HEADER = "X-Profile"
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "fakestore_profiles")
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_MAX_PROFILES = 200
+# Mesmo comando com parâmetros diferentes a partir de quantas execuções conta como N+1
+N_PLUS_ONE_THRESHOLD = 5
+TOP_FUNCTIONS = 25
+MAX_STATEMENT_LENGTH = 500
+
+# Funções em que uma thread está só esperando (lock, fila, select): não entram no perfil
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_base.py", "result"),
+}
+
+mode = os.getenv("PROFILING", "off")
+profile_dir = os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR)
+interval = float(os.getenv("PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS)) / 1000
+token = os.getenv("PROFILE_TOKEN", "")
+max_profiles = int(os.getenv("PROFILE_MAX_FILES", DEFAULT_MAX_PROFILES))
+
+_current: ContextVar["RequestTrace | None"] = ContextVar("profiling_trace", default=None)
+_hooks_lock = threading.Lock()
+_hooks_installed = False
+
+
+@dataclass
+class _StatementStats:
+    count: int = 0
+    seconds: float = 0.0
+    parameters: Counter = field(default_factory=Counter)
+
+
+class RequestTrace:
+    """Comandos SQL de uma requisição, agrupados pelo texto do comando."""
+
+    def __init__(self):
+        self.statements: dict[str, _StatementStats] = {}
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, parameters, seconds: float):
+        key = repr(parameters)[:MAX_STATEMENT_LENGTH]
+        with self._lock:
+            if self.closed:
+                return
+            stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = _StatementStats()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.parameters[key] += 1
+            self.queries += 1
+            self.sql_seconds += seconds
+
+    def n_plus_one(self) -> list[str]:
+        """Comandos executados muitas vezes com parâmetros diferentes (ex.: um SELECT por item de um laço)."""
+        return [
+            statement for statement, stats in self.statements.items()
+            if stats.count >= N_PLUS_ONE_THRESHOLD and len(stats.parameters) > 1
+        ]
+
+    def duplicates(self) -> list[str]:
+        """Comandos executados mais de uma vez com exatamente os mesmos parâmetros."""
+        return [
+            statement for statement, stats in self.statements.items()
+            if any(count > 1 for count in stats.parameters.values())
+        ]
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            ranked = sorted(self.statements.items(), key=lambda item: item[1].seconds, reverse=True)
+            return {
+                "queries": self.queries,
+                "sql_ms": round(self.sql_seconds * 1000, 3),
+                "n_plus_one": self.n_plus_one(),
+                "duplicates": self.duplicates(),
+                "statements": [
+                    {
+                        "sql": statement[:MAX_STATEMENT_LENGTH],
+                        "count": stats.count,
+                        "distinct_parameters": len(stats.parameters),
+                        "total_ms": round(stats.seconds * 1000, 3),
+                    }
+                    for statement, stats in ranked
+                ],
+            }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profiling_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    started = getattr(context, "_profiling_started", None)
+    if trace is not None and started is not None:
+        trace.record(statement, parameters, time.perf_counter() - started)
+
+
+def install_sql_hooks():
+    """Registra os listeners em `Engine` (todos os engines), uma única vez e só se o profiler for usado."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _hooks_installed = True
+
+
+class StackSampler:
+    """Amostra as pilhas das threads ativas a cada `interval` segundos, numa thread própria."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> list[dict]:
+        """Funções por amostras próprias (no topo da pilha) e acumuladas (em qualquer ponto da pilha)."""
+        own, cumulative = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                cumulative[name] += count
+        return [
+            {"function": name, "own": own[name], "cumulative": count}
+            for name, count in cumulative.most_common(limit)
+        ]
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _wants_profile(scope) -> bool:
+    if mode == "all":
+        return True
+    if mode != "header" or not token:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return hmac.compare_digest(value, token.encode())
+    return False
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila as requisições conforme `PROFILING`."""
+
+    def __init__(self, app):
+        self.app = app
+        if mode != "off":
+            install_sql_hooks()
+        if mode == "header" and not token:
+            print("⚠️ PROFILING=header sem PROFILE_TOKEN: nenhuma requisição será perfilada")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or mode == "off" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        install_sql_hooks()
+        profile_id = uuid.uuid4().hex[:16]
+        trace = RequestTrace()
+        sampler = StackSampler(interval)
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                summary = (
+                    f"id={profile_id}; queries={trace.queries}; sql_ms={trace.sql_seconds * 1000:.1f}; "
+                    f"n_plus_one={len(trace.n_plus_one())}; duplicates={len(trace.duplicates())}"
+                )
+                timing = f"sql;dur={trace.sql_seconds * 1000:.1f};desc=\"{trace.queries} queries\", app;dur={elapsed_ms:.1f}"
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (HEADER.lower().encode(), summary.encode()),
+                    (b"server-timing", timing.encode()),
+                ]
+            await send(message)
+
+        context_token = _current.set(trace)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(context_token)
+            with trace._lock:
+                trace.closed = True
+            # Parar o amostrador (join) e gravar os arquivos bloqueiam: vão para uma thread
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(
+                    _write_profile, profile_id, scope, status["code"], time.perf_counter() - start, trace, sampler
+                )
+
+
+def _write_profile(profile_id: str, scope, status: int, seconds: float, trace: RequestTrace, sampler: StackSampler):
+    sampler.stop()
+    directory = Path(profile_dir)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        route = scope.get("route")
+        summary = {
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "query_string": scope.get("query_string", b"").decode(errors="replace"),
+            "status": status,
+            "duration_ms": round(seconds * 1000, 3),
+            "sql": trace.as_dict(),
+            "profile": {
+                "interval_ms": sampler.interval * 1000,
+                "samples": sampler.samples,
+                "top_functions": sampler.top_functions(),
+            },
+        }
+        (directory / f"{profile_id}.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2))
+        (directory / f"{profile_id}.folded").write_text(sampler.folded())
+        _evict_profiles(directory, keep=profile_id)
+    except OSError as error:
+        print(f"⚠️ Não foi possível gravar o perfil {profile_id}: {error}")
+
+
+def _evict_profiles(directory: Path, keep: str):
+    """Remove os perfis mais antigos (`.json` e `.folded`) até sobrarem `max_profiles`."""
+    entries = []
+    for path in directory.glob("*.json"):
+        try:
+            entries.append((path.stat().st_mtime, path.stem))
+        except FileNotFoundError:
+            continue
+    excess = len(entries) - max_profiles
+    for _, profile_id in sorted(entries)[:max(excess, 0)]:
+        if profile_id == keep:
+            continue
+        for suffix in (".json", ".folded"):
+            try:
+                (directory / f"{profile_id}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
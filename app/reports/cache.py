@@ -0,0 +1,110 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "fakestore_reports")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ReportCache:
+    """
+    Cache em disco de relatórios já gerados, endereçado pela versão dos dados.
+
+    Cada arquivo é nomeado pelo hash da sua chave; um acerto custa apenas um
+    `stat`. O mtime é atualizado a cada acerto e serve de ordem LRU: quando o
+    diretório passa de `max_bytes`, os arquivos menos usados são removidos.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, suffix=".xlsx"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        # Uma geração por vez: requisições concorrentes pela mesma versão
+        # esperam a primeira terminar em vez de renderizar em paralelo
+        self._build_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Path | None:
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, key: str, build: Callable[[str], object]) -> Path | None:
+        """
+        Retorna o arquivo da chave, gerando-o com `build(caminho)` se necessário.
+
+        A geração é feita em um arquivo temporário no mesmo diretório e movida
+        atomicamente, então leitores nunca veem um relatório pela metade. Se
+        `build` não gravar nada (ex.: tabela vazia), retorna None.
+        """
+        path = self.get(key)
+        if path is not None:
+            return path
+
+        with self._build_lock:
+            path = self.get(key)
+            if path is not None:
+                return path
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=f".tmp{self.suffix}")
+            os.close(fd)
+            try:
+                build(tmp_path)
+                if os.path.getsize(tmp_path) == 0:
+                    return None
+                path = self.path_for(key)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Path | None = None):
+        """Remove os relatórios menos usados até o diretório caber em `max_bytes`."""
+        entries = []
+        for path in self.directory.glob(f"*{self.suffix}"):
+            if ".tmp" in path.name:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+report_cache = ReportCache(
+    directory=os.getenv("REPORT_CACHE_DIR", DEFAULT_CACHE_DIR),
+    max_bytes=int(os.getenv("REPORT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+)
+
+
+def get_report_cache() -> ReportCache:
+    return report_cache
@@ -1,13 +1,66 @@
+import io
 import pandas as pd
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import CellIsRule
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.chart import BarChart, Reference, Series
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.database.crud_products import get_products  
+from app.database.crud_products import get_products, iter_product_rows
+from app.database.crud_category_summary import get_category_summaries
+from app.database.model_product import Product
+from app.reports.exports import EXPORT_COLUMNS
+from app.services.images import ImageStore
 
 
-def generate_report(db: Session, file_name="products_report.xlsx"):
+STREAMING_CHUNK_SIZE = 5000
+PRICE_THRESHOLD = 100
+STATS_COLUMNS = ["category", "Média", "Máximo", "Mínimo"]
+# Colunas da aba "Produtos", nesta ordem (as mesmas das exportações; `content_hash` é interno)
+REPORT_COLUMNS = EXPORT_COLUMNS
+# Cada miniatura vira uma imagem separada no .xlsx; acima disso a coluna fica vazia
+THUMBNAIL_LIMIT = 2000
+THUMBNAIL_ROW_HEIGHT = 50
+
+
+def _thumbnail_image(path):
+    """Imagem do openpyxl lida para a memória, sem manter o arquivo aberto até o `save`."""
+    from openpyxl.drawing.image import Image as XLImage
+
+    with open(path, "rb") as thumbnail:
+        return XLImage(io.BytesIO(thumbnail.read()))
+
+
+def _add_thumbnails(ws, column: int, urls, thumbnails: ImageStore, set_height: bool = True) -> int:
+    """Ancora a miniatura de cada URL na linha correspondente (a partir da linha 2)."""
+    letter = get_column_letter(column)
+    added = 0
+    for row_number, url in enumerate(urls, 2):
+        path = thumbnails.thumbnail_path(url)
+        if path is None:
+            continue
+        if added == THUMBNAIL_LIMIT:
+            print(f"⚠️ Mais de {THUMBNAIL_LIMIT} miniaturas; as demais linhas ficam sem imagem")
+            break
+        ws.add_image(_thumbnail_image(path), f"{letter}{row_number}")
+        if set_height:
+            ws.row_dimensions[row_number].height = THUMBNAIL_ROW_HEIGHT
+        added += 1
+    return added
+
+
+def _summary_stats(db: Session) -> list[list]:
+    """Linhas da aba de estatísticas, lidas da tabela `category_summaries`."""
+    return [
+        [s.category, float(s.price_mean), float(s.price_max), float(s.price_min)]
+        for s in get_category_summaries(db)
+    ]
+
+
+def generate_report(db: Session, file_name="products_report.xlsx", thumbnails: ImageStore | None = None):
     """
     Gera um relatório estratégico em Excel com:
     - Coloração condicional: 
@@ -15,6 +68,7 @@ def generate_report(db: Session, file_name="products_report.xlsx"):
         🟢 Verde para preços ≤ 100
     - Gráfico de barras para análise visual.
     - Melhor formatação dos dados e layout mais limpo.
+    - Com `thumbnails`, uma coluna com a miniatura já baixada de cada produto.
     """
 
     # 🔹 1. Obter dados do MySQL e converter em DataFrame
@@ -24,16 +78,9 @@ def generate_report(db: Session, file_name="products_report.xlsx"):
         print("⚠️ Nenhum produto encontrado no banco de dados! O relatório não será gerado.")
         return
 
-    df = pd.DataFrame([p.__dict__ for p in products])
-    print("📌 DataFrame colunas disponíveis:", df.columns.tolist())
-
-    # 🔹 2. Remover colunas técnicas do SQLAlchemy
-    # df.drop(columns=["_sa_instance_state"], inplace=True, errors="ignore")
-
-    # 🔹 3. Garantir que as colunas essenciais existem
-    if "price" not in df.columns or "category" not in df.columns:
-        print("⚠️ As colunas 'price' ou 'category' não foram encontradas! O relatório não pode ser gerado.")
-        return
+    # 🔹 2. Só as colunas do relatório, em ordem fixa
+    names = [column.name for column in REPORT_COLUMNS]
+    df = pd.DataFrame([[getattr(p, name) for name in names] for p in products], columns=names)
 
     df["price"] = pd.to_numeric(df["price"], errors="coerce")
 
@@ -69,13 +116,25 @@ def generate_report(db: Session, file_name="products_report.xlsx"):
                 pass
         ws.column_dimensions[col_letter].width = max_length + 2
 
+    # 🔹 7.1 Miniaturas pré-carregadas pelo ETL (se houver)
+    if thumbnails is not None and "image_url" in df.columns:
+        thumbnail_column = len(df.columns) + 1
+        cell = ws.cell(row=1, column=thumbnail_column, value="thumbnail")
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal="center")
+        cell.border = thin_border
+        ws.column_dimensions[get_column_letter(thumbnail_column)].width = 12
+        _add_thumbnails(ws, thumbnail_column, df["image_url"], thumbnails)
+
     # 🔹 8. Aplicar coloração condicional:
     # 🔴 Vermelho para preços > 100
     # 🟢 Verde para preços ≤ 100
     red_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")  
     green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
 
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=4, max_col=4):  # Coluna de preços
+    price_column = df.columns.get_loc("price") + 1
+    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=price_column, max_col=price_column):
         for cell in row:
             try:
                 if isinstance(cell.value, (int, float)):  # Certifica que é numérico
@@ -90,8 +149,12 @@ def generate_report(db: Session, file_name="products_report.xlsx"):
     ws_stats = wb.create_sheet(title="Estatísticas")
 
     if "price" in df.columns and "category" in df.columns:
-        stats = df.groupby("category")["price"].agg(["mean", "max", "min"]).reset_index()
-        stats.rename(columns={"mean": "Média", "max": "Máximo", "min": "Mínimo"}, inplace=True)
+        # Os resumos são mantidos pelo ETL; a agregação no DataFrame só é usada
+        # se a tabela de resumos ainda estiver vazia (ex.: banco não migrado)
+        stats = pd.DataFrame(_summary_stats(db), columns=STATS_COLUMNS)
+        if stats.empty:
+            stats = df.groupby("category")["price"].agg(["mean", "max", "min"]).reset_index()
+            stats.rename(columns={"mean": "Média", "max": "Máximo", "min": "Mínimo"}, inplace=True)
 
         # Adicionar cabeçalhos formatados
         for col_num, column_title in enumerate(stats.columns, 1):
@@ -128,3 +191,120 @@ def generate_report(db: Session, file_name="products_report.xlsx"):
 
     print(f"✅ Relatório estratégico gerado com sucesso: {file_name}")
     return {"message": f"Relatório gerado: {file_name}"}
+
+
+def _header_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = Font(bold=True, color="FFFFFF")
+    cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    cell.alignment = Alignment(horizontal="center")
+    cell.border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    return cell
+
+
+def _column_widths(db: Session, columns) -> tuple[int, list[int]]:
+    """
+    Calcula a largura de cada coluna com uma única consulta agregada.
+
+    Planilhas write-only gravam as larguras antes da primeira linha, então
+    não é possível ajustá-las depois de percorrer os dados como no modo normal.
+    """
+    text_columns = [c for c in columns if c.name in ("name", "category", "description", "image_url")]
+    aggregates = [func.count(), func.max(Product.id), func.max(Product.price)]
+    aggregates += [func.max(func.char_length(c)) for c in text_columns]
+    total, max_id, max_price, *text_lengths = db.execute(select(*aggregates)).one()
+
+    lengths = dict(zip((c.name for c in text_columns), text_lengths))
+    lengths["id"] = len(str(max_id or ""))
+    lengths["price"] = len(str(float(max_price or 0)))
+    lengths["timestamp"] = len("YYYY-MM-DD HH:MM:SS")
+
+    widths = [max(len(c.name), lengths.get(c.name) or 0) + 2 for c in columns]
+    return total, widths
+
+
+def generate_report_streaming(db: Session, file_name="products_report.xlsx", chunk_size=STREAMING_CHUNK_SIZE,
+                              thumbnails: ImageStore | None = None):
+    """
+    Gera o mesmo relatório de `generate_report` com memória constante:
+    - As linhas vêm do banco em lotes (`yield_per`) e são gravadas em uma
+      planilha write-only, sem DataFrame nem objetos ORM.
+    - As cores de preço são regras nativas de formatação condicional.
+    - As estatísticas por categoria vêm da tabela `category_summaries`.
+    - Com `thumbnails`, as miniaturas são ancoradas numa coluna extra.
+    """
+    columns = list(REPORT_COLUMNS)
+    total, widths = _column_widths(db, columns)
+
+    if not total:
+        print("⚠️ Nenhum produto encontrado no banco de dados! O relatório não será gerado.")
+        return
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Produtos")
+
+    for col_num, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    header = [_header_cell(ws, column.name) for column in columns]
+    if thumbnails is not None:
+        ws.column_dimensions[get_column_letter(len(columns) + 1)].width = 12
+        header.append(_header_cell(ws, "thumbnail"))
+
+    ws.append(header)
+
+    price_index = [c.name for c in columns].index("price")
+
+    for row in iter_product_rows(db, columns, chunk_size=chunk_size):
+        row = list(row)
+        if row[price_index] is not None:
+            row[price_index] = float(row[price_index])
+        ws.append(row)
+
+    if thumbnails is not None:
+        # Segunda leitura só das URLs, na mesma ordem, para não guardar uma lista do tamanho do catálogo.
+        # Planilhas write-only não ajustam a altura das linhas depois de gravadas
+        urls = (url for (url,) in iter_product_rows(db, [Product.image_url], chunk_size=chunk_size))
+        _add_thumbnails(ws, len(columns) + 1, urls, thumbnails, set_height=False)
+
+    # 🔴 Vermelho para preços > 100 / 🟢 Verde para preços ≤ 100
+    price_letter = get_column_letter(price_index + 1)
+    price_range = f"{price_letter}2:{price_letter}{total + 1}"
+    red_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+    green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
+    ws.conditional_formatting.add(price_range, CellIsRule(operator="greaterThan", formula=[str(PRICE_THRESHOLD)], fill=red_fill))
+    ws.conditional_formatting.add(price_range, CellIsRule(operator="lessThanOrEqual", formula=[str(PRICE_THRESHOLD)], fill=green_fill))
+
+    stats = _summary_stats(db)
+    if not stats:
+        stats = [
+            [category, float(mean), float(price_max), float(price_min)]
+            for category, mean, price_max, price_min in db.execute(
+                select(Product.category, func.avg(Product.price), func.max(Product.price), func.min(Product.price))
+                .group_by(Product.category)
+                .order_by(Product.category)
+            )
+        ]
+
+    ws_stats = wb.create_sheet(title="Estatísticas")
+    ws_stats.append([_header_cell(ws_stats, title) for title in STATS_COLUMNS])
+    for row in stats:
+        ws_stats.append(row)
+
+    chart = BarChart()
+    chart.title = "Comparação de Preços por Categoria"
+    chart.x_axis.title = "Categoria"
+    chart.y_axis.title = "Preço Médio"
+    chart.style = 13
+
+    data = Reference(ws_stats, min_col=2, min_row=1, max_row=len(stats) + 1, max_col=2)
+    categories = Reference(ws_stats, min_col=1, min_row=2, max_row=len(stats) + 1)
+    series = Series(data, title_from_data=True)
+    series.graphicalProperties.solidFill = "4472C4"
+    chart.series.append(series)
+    chart.set_categories(categories)
+    ws_stats.add_chart(chart, "E5")
+
+    wb.save(file_name)
+
+    print(f"✅ Relatório estratégico gerado com sucesso: {file_name}")
+    return {"message": f"Relatório gerado: {file_name}"}
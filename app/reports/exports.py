@@ -0,0 +1,119 @@
+"""
+Exportações em fluxo (CSV, NDJSON e Parquet) direto do cursor do banco, sem
+montar planilha nem DataFrame: cada lote de linhas vira um pedaço da resposta.
+"""
+import csv
+import importlib.util
+import io
+import json
+from itertools import islice
+from typing import Iterator
+from sqlalchemy.orm import Session
+from ..database.crud_products import iter_product_rows
+from ..database.model_product import Product
+
+
+EXPORT_COLUMNS = (
+    Product.id, Product.name, Product.category, Product.price,
+    Product.description, Product.image_url, Product.timestamp,
+)
+EXPORT_CHUNK_SIZE = 5000
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Parquet depende do pyarrow, que é opcional."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _batches(db: Session, chunk_size: int) -> Iterator[list[tuple]]:
+    rows = iter_product_rows(db, columns=EXPORT_COLUMNS, chunk_size=chunk_size)
+    while batch := list(islice(rows, chunk_size)):
+        yield batch
+
+
+def iter_csv(db: Session, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in EXPORT_COLUMNS])
+    for batch in _batches(db, chunk_size):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(db: Session, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    keys = [column.key for column in EXPORT_COLUMNS]
+    for batch in _batches(db, chunk_size):
+        lines = []
+        for row in batch:
+            record = dict(zip(keys, row))
+            record["price"] = float(record["price"])
+            record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+            lines.append(json.dumps(record, ensure_ascii=False))
+        yield "\n".join(lines) + "\n"
+
+
+class _DrainableSink:
+    """Destino do ParquetWriter que guarda só os bytes ainda não enviados, mantendo a posição total."""
+
+    closed = False
+
+    def __init__(self):
+        self._pending: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._pending.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._pending)
+        self._pending.clear()
+        return data
+
+
+def iter_parquet(db: Session, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Um row group por lote; cada row group é enviado assim que escrito."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("name", pa.string()),
+        ("category", pa.string()),
+        ("price", pa.decimal128(10, 2)),
+        ("description", pa.string()),
+        ("image_url", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+    ])
+    sink = _DrainableSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in _batches(db, chunk_size):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+EXPORTERS = {"csv": iter_csv, "ndjson": iter_ndjson, "parquet": iter_parquet}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
 
@@ -8,8 +8,8 @@ class ProductBase(BaseModel):
     name: str
     category: str
     price: float
-    description: str
-    image_url: str
+    description: str | None = None
+    image_url: str | None = None
 
 
 class ProductCreate(ProductBase):
@@ -20,8 +20,7 @@ class ProductCreate(ProductBase):
 class ProductResponse(ProductBase):
     """Schema for returning a product in API responses."""
 
-    id: int
-    timestamp: datetime
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+    id: int
+    timestamp: datetime | None = None
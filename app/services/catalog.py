@@ -0,0 +1,271 @@
+"""
+Snapshot do catálogo em memória para as leituras de `GET /api/products`.
+
+O snapshot é colunar (arrays do módulo `array` e listas de textos, em ordem
+de id) com um índice por categoria e um índice ordenado por preço, e responde
+listagem, filtros e faixas de preço sem ir ao banco. É versionado pelo id da
+última execução bem-sucedida do ETL: cada worker confere essa versão no banco
+no máximo a cada `version_ttl` segundos e reconstrói o snapshot quando ela
+muda, trocando a referência de uma vez — leituras em andamento continuam no
+snapshot antigo. Nas rotas assíncronas a reconstrução roda numa thread à
+parte, com sessão síncrona própria, e as leituras seguem pelo banco até o
+snapshot novo ser publicado.
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..database.crud_etl_runs import get_catalog_version, get_catalog_version_async
+from ..database.crud_products import PRODUCT_FIELDS, iter_product_rows
+from ..database.db import new_read_session
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_VERSION_TTL = 1.0
+BUILD_CHUNK_SIZE = 5000
+
+
+class CatalogTooLarge(Exception):
+    """O catálogo passou do limite de memória configurado para o snapshot."""
+
+
+class CatalogSnapshot:
+    """Catálogo imutável de uma versão; as posições seguem a ordem de id."""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.ids = array("q")
+        self.prices = array("d")
+        self.category_codes = array("H")
+        self.categories: list[str] = []
+        self.names: list[str] = []
+        self.descriptions: list[str | None] = []
+        self.image_urls: list[str | None] = []
+        self.timestamps: list = []
+        self.nbytes = 0
+        self._category_index: dict[str, array] = {}
+        self._price_order = array("q")
+        self._sorted_prices = array("d")
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, db: Session, version: int, max_bytes: int | None = None) -> "CatalogSnapshot":
+        """Lê o catálogo em lotes; levanta `CatalogTooLarge` se a estimativa passar de `max_bytes`."""
+        snapshot = cls(version)
+        codes: dict[str, int] = {}
+        # Um mesmo timestamp se repete em todos os produtos de uma carga: guarda uma instância só
+        timestamps: dict = {}
+        columns = [PRODUCT_FIELDS[field] for field in PRODUCT_FIELDS]
+        for row in iter_product_rows(db, columns=columns, chunk_size=BUILD_CHUNK_SIZE):
+            product_id, name, category, price, description, image_url, timestamp = row
+            code = codes.get(category)
+            if code is None:
+                code = codes[category] = len(snapshot.categories)
+                snapshot.categories.append(category)
+            snapshot.ids.append(product_id)
+            snapshot.prices.append(price)
+            snapshot.category_codes.append(code)
+            snapshot.names.append(name)
+            snapshot.descriptions.append(description)
+            snapshot.image_urls.append(image_url)
+            snapshot.timestamps.append(timestamps.setdefault(timestamp, timestamp))
+
+            # 8 (id) + 8 (preço) + 2 (categoria) + 4 ponteiros de lista + os textos
+            snapshot.nbytes += 50 + sys.getsizeof(name) + sys.getsizeof(description) + sys.getsizeof(image_url)
+            if max_bytes is not None and snapshot.nbytes > max_bytes:
+                raise CatalogTooLarge(f"Snapshot passou de {max_bytes} bytes com {len(snapshot)} produtos")
+
+        positions: dict[int, array] = {code: array("q") for code in range(len(snapshot.categories))}
+        for position, code in enumerate(snapshot.category_codes):
+            positions[code].append(position)
+        snapshot._category_index = {snapshot.categories[code]: index for code, index in positions.items()}
+
+        prices = snapshot.prices
+        snapshot._price_order = array("q", sorted(range(len(prices)), key=prices.__getitem__))
+        snapshot._sorted_prices = array("d", (prices[position] for position in snapshot._price_order))
+        snapshot.nbytes += 16 * len(prices) + 8 * len(prices)
+        return snapshot
+
+    def _values(self, field: str, positions) -> list:
+        column = {
+            "id": self.ids,
+            "name": self.names,
+            "category": self.category_codes,
+            "price": self.prices,
+            "description": self.descriptions,
+            "image_url": self.image_urls,
+            "timestamp": self.timestamps,
+        }[field]
+        if isinstance(positions, range):
+            values = column[positions.start:positions.stop]
+        else:
+            values = [column[position] for position in positions]
+        if field == "category":
+            categories = self.categories
+            return [categories[code] for code in values]
+        return values
+
+    def select(self, limit: int | None = None, after_id: int | None = None, category: str | None = None,
+               min_price: float | None = None, max_price: float | None = None):
+        """Posições dos produtos que passam nos filtros, em ordem de id (mesma semântica de `get_product_rows`)."""
+        start = bisect_right(self.ids, after_id) if after_id is not None else 0
+        has_price_filter = min_price is not None or max_price is not None
+
+        if category is not None:
+            index = self._category_index.get(category, array("q"))
+            candidates = islice(index, bisect_left(index, start), None)
+        elif has_price_filter:
+            low = bisect_left(self._sorted_prices, min_price) if min_price is not None else 0
+            high = bisect_right(self._sorted_prices, max_price) if max_price is not None else len(self)
+            matched = high - low
+            # Faixa larga: percorrer em ordem de id testando o preço chega ao `limit` em cerca de
+            # limit * len / matched posições, sem filtrar e ordenar a fatia inteira do índice de preço
+            scanned = len(self) - start
+            if limit is not None and matched:
+                scanned = min(scanned, limit * len(self) // matched)
+            if scanned <= matched:
+                candidates = range(start, len(self))
+            else:
+                candidates = sorted(position for position in self._price_order[low:high] if position >= start)
+                has_price_filter = False
+        else:
+            return range(start, len(self) if limit is None else min(len(self), start + limit))
+
+        if has_price_filter:
+            prices = self.prices
+            low = min_price if min_price is not None else float("-inf")
+            high = max_price if max_price is not None else float("inf")
+            candidates = (position for position in candidates if low <= prices[position] <= high)
+        return list(islice(candidates, limit))
+
+    def rows(self, positions, fields: list[str]) -> list[dict]:
+        """Monta os dicts de resposta só com os `fields` pedidos."""
+        values = [self._values(field, positions) for field in fields]
+        return [dict(zip(fields, row)) for row in zip(*values)]
+
+
+class CatalogStore:
+    """
+    Guarda o snapshot atual do processo e o troca quando a versão muda.
+
+    Com `max_bytes=0` o snapshot fica desligado e as leituras vão ao banco;
+    o mesmo acontece se o catálogo não couber no limite.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, version_ttl: float = DEFAULT_VERSION_TTL,
+                 clock=time.monotonic, session_factory=None):
+        self.max_bytes = max_bytes
+        self.version_ttl = version_ttl
+        self._clock = clock
+        self._session_factory = session_factory or new_read_session
+        self._rebuild: threading.Thread | None = None
+        self._snapshot: CatalogSnapshot | None = None
+        self._checked_at = float("-inf")
+        self._oversized_version: int | None = None
+        self._build_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes != 0
+
+    def current(self, db: Session) -> CatalogSnapshot | None:
+        """Snapshot válido para a versão atual do banco, ou None se as leituras devem ir ao banco."""
+        if not self.enabled:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and self._clock() - self._checked_at < self.version_ttl:
+            return snapshot
+        version = get_catalog_version(db)
+        self._checked_at = self._clock()
+        # Uma réplica atrasada informa uma versão anterior: o snapshot mais novo continua valendo
+        if snapshot is not None and snapshot.version >= version:
+            return snapshot
+        return self.refresh(db, version)
+
+    async def current_async(self, db: AsyncSession) -> CatalogSnapshot | None:
+        """
+        Igual a `current`, para as rotas assíncronas, mas sem reconstruir no
+        event loop: quando a versão mudou (raro: só quando outro processo rodou
+        o ETL) dispara `rebuild_in_background` e devolve None, e a listagem vai
+        ao banco até o snapshot novo ser publicado.
+        """
+        if not self.enabled:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and self._clock() - self._checked_at < self.version_ttl:
+            return snapshot
+        version = await get_catalog_version_async(db)
+        self._checked_at = self._clock()
+        if snapshot is not None and snapshot.version >= version:
+            return snapshot
+        if self._oversized_version != version:
+            self.rebuild_in_background()
+        return None
+
+    def rebuild_in_background(self) -> threading.Thread:
+        """
+        Reconstrói o snapshot numa thread, com uma sessão síncrona própria
+        (`session_factory`, por padrão uma réplica de leitura). Não toca no
+        `_build_lock`: se já houver uma reconstrução em andamento, devolve a
+        thread dela.
+        """
+        rebuild = self._rebuild
+        if rebuild is not None and rebuild.is_alive():
+            return rebuild
+        self._rebuild = rebuild = threading.Thread(target=self._rebuild_snapshot, name="catalog-rebuild", daemon=True)
+        rebuild.start()
+        return rebuild
+
+    def _rebuild_snapshot(self):
+        try:
+            # Versão e produtos lidos na mesma sessão: uma réplica atrasada não
+            # publica produtos antigos com a versão nova
+            with self._session_factory() as db:
+                self.refresh(db)
+        except Exception as error:
+            print(f"⚠️ Falha ao reconstruir o snapshot do catálogo: {error}")
+
+    def refresh(self, db: Session, version: int | None = None) -> CatalogSnapshot | None:
+        """Reconstrói o snapshot (se a versão mudou) e o publica com uma única atribuição."""
+        if not self.enabled:
+            return None
+        # Uma reconstrução por vez; quem chega depois reaproveita o snapshot recém-publicado
+        with self._build_lock:
+            version = get_catalog_version(db) if version is None else version
+            if self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+            if self._oversized_version == version:
+                return None
+            try:
+                snapshot = CatalogSnapshot.build(db, version, self.max_bytes)
+            except CatalogTooLarge as error:
+                print(f"⚠️ {error}; listagens seguem pelo banco")
+                self._oversized_version, snapshot = version, None
+            self._snapshot = snapshot
+            self._checked_at = self._clock()
+            return snapshot
+
+    def invalidate(self):
+        """Descarta o snapshot; necessário quando o catálogo muda fora do `run_etl`."""
+        with self._build_lock:
+            self._snapshot = None
+            self._oversized_version = None
+            self._checked_at = float("-inf")
+
+
+catalog_store = CatalogStore(
+    max_bytes=int(float(os.getenv("CATALOG_SNAPSHOT_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+    version_ttl=float(os.getenv("CATALOG_VERSION_TTL", DEFAULT_VERSION_TTL)),
+)
+
+
+async def get_catalog_store() -> CatalogStore:
+    # Assíncrona: uma dependência síncrona ocuparia o threadpool na listagem assíncrona
+    return catalog_store
@@ -1,9 +1,194 @@
+import os
+import threading
+from typing import Callable
 from sqlalchemy.orm import Session
-from ..adapters.fakestore import FakeStoreAPI
-from ..database.crud_products import insert_products
-
-def run_etl(db: Session):
-    products = FakeStoreAPI.fetch_products()
-    print(products)
-    insert_products(db, products)
-    return {"message": f"{len(products)} produtos extraídos e salvos"}
+from ..adapters.fakestore import get_fakestore_api
+from ..database.db import mark_primary_write, new_session
+from ..database.crud_products import UpsertResult, insert_products, remove_missing_products
+from ..database.crud_etl_runs import start_etl_run, finish_etl_run, fail_etl_run
+from .. import metrics
+from .catalog import CatalogStore, catalog_store
+from .images import DEFAULT_CONCURRENCY, ImagePrefetcher, ImageStore, get_image_store
+from .jobs import IntervalScheduler, JobManager
+from .pipeline import Pipeline, Stage
+from .search import ProductSearchIndex, get_search_index
+
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_QUEUE_SIZE = 4
+# Fração máxima do catálogo que uma execução pode remover
+DEFAULT_MAX_REMOVED_RATIO = 0.5
+
+
+def _batches(products: list[dict], batch_size: int):
+    for start in range(0, len(products), batch_size):
+        yield products[start:start + batch_size]
+
+
+def run_etl(db: Session, on_stage: Callable[[str], None] | None = None, batch_size: int | None = None,
+            transform_workers: int | None = None, queue_size: int | None = None,
+            prefetch_images: bool | None = None, images: ImageStore | None = None,
+            stream_extract: bool | None = None, max_removed_ratio: float | None = None):
+    """
+    Executa o ETL como uma pipeline: extração, transformação e carga rodam
+    em paralelo, em lotes de `batch_size`, ligadas por filas de `queue_size`
+    lotes. A transformação pode ter vários workers; a carga é um único
+    escritor que grava os lotes na ordem da extração (entre ids repetidos em
+    lotes diferentes prevalece o último) e faz commit por lote. Produtos que
+    sumiram da API só são removidos depois que todos os lotes foram gravados;
+    os que vieram rejeitados pela transformação continuam no banco como estão.
+    Uma extração vazia não remove nada, e uma que removeria mais que
+    `max_removed_ratio` do catálogo (ou `ETL_MAX_REMOVED_RATIO`, padrão 0,5)
+    falha a execução sem remover, como sinal de extração incompleta.
+
+    Com `stream_extract` (ou `ETL_STREAM_EXTRACT=1`) a resposta da API é lida
+    em fluxo e cada lote segue para a transformação assim que seus produtos
+    chegam: o pico de memória depende de `batch_size` e `queue_size`, não do
+    tamanho do catálogo.
+
+    Com `prefetch_images` (ou `ETL_PREFETCH_IMAGES=1`) um último estágio baixa
+    as imagens de cada lote gravado para o `ImageStore` e gera as miniaturas;
+    falhas de download não interrompem a carga.
+    """
+    # Importado aqui para que pandas/numpy não pesem na inicialização da API
+    from .transform import RejectSink, transform_products
+
+    batch_size = batch_size or int(os.getenv("ETL_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    transform_workers = transform_workers or int(os.getenv("ETL_TRANSFORM_WORKERS", 1))
+    queue_size = queue_size or int(os.getenv("ETL_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+    if stream_extract is None:
+        stream_extract = os.getenv("ETL_STREAM_EXTRACT", "0") == "1"
+    if prefetch_images is None:
+        prefetch_images = os.getenv("ETL_PREFETCH_IMAGES", "0") == "1"
+    if max_removed_ratio is None:
+        max_removed_ratio = float(os.getenv("ETL_MAX_REMOVED_RATIO", DEFAULT_MAX_REMOVED_RATIO))
+
+    run = start_etl_run(db)
+    api = get_fakestore_api()
+    rejects = RejectSink(os.getenv("ETL_REJECTS_PATH"))
+    totals = {"duplicates": 0}
+    result = UpsertResult()
+    keep_ids: set[int] = set()
+    lock = threading.Lock()
+    prefetcher = None
+    if prefetch_images:
+        prefetcher = ImagePrefetcher(
+            images or get_image_store(),
+            max_concurrency=int(os.getenv("IMAGE_PREFETCH_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        )
+
+    def extract():
+        if stream_extract:
+            yield from api.iter_products(batch_size)
+        else:
+            yield from _batches(api.fetch_products(), batch_size)
+
+    def transform(batch):
+        transformed = transform_products(batch, extracted_at=run.started_at, rejects=rejects)
+        with lock:
+            totals["duplicates"] += transformed.duplicates
+        return transformed
+
+    def load(transformed):
+        batch_result = insert_products(db, transformed.records(), run_id=run.id)
+        keep_ids.update(transformed.frame["id"].tolist())
+        keep_ids.update(transformed.rejected_ids)
+        for name in ("added", "changed", "unchanged"):
+            setattr(result, name, getattr(result, name) + getattr(batch_result, name))
+        # O lote só segue adiante se houver o estágio de imagens
+        return transformed if prefetcher is not None else len(transformed)
+
+    stages = [
+        Stage("transform", transform, workers=transform_workers, queue_size=queue_size),
+        Stage("load", load, queue_size=queue_size, ordered=True),
+    ]
+    if prefetcher is not None:
+        stages.append(Stage(
+            "images", lambda transformed: prefetcher.prefetch(transformed.frame["image_url"].tolist()),
+            queue_size=queue_size,
+        ))
+
+    pipeline = Pipeline(extract(), stages, source_name="extract", on_stage_start=on_stage)
+    try:
+        pipeline.run()
+        if pipeline.stats["extract"].rows:
+            result.removed = remove_missing_products(db, keep_ids, max_ratio=max_removed_ratio)
+        else:
+            print("⚠️ Extração vazia: nenhum produto removido")
+    except Exception as error:
+        metrics.ETL_RUNS.inc(status="failed")
+        fail_etl_run(db, run, error)
+        mark_primary_write()
+        raise
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+    image_result = prefetcher.finish().as_dict() if prefetcher is not None else None
+
+    extracted = pipeline.stats["extract"].rows
+    if rejects.count:
+        print(f"⚠️ {rejects.count} produtos rejeitados na transformação")
+    finish_etl_run(db, run, extracted=extracted, counts=result.as_dict())
+    mark_primary_write()
+    metrics.ETL_RUNS.inc(status="success")
+    for stage, stats in pipeline.stats.items():
+        metrics.ETL_STAGE_SECONDS.observe(stats.busy_seconds, stage=stage)
+    for outcome, count in {"extracted": extracted, "rejected": rejects.count, **result.as_dict()}.items():
+        metrics.ETL_ROWS_PER_RUN.observe(count, outcome=outcome)
+    return {
+        "message": f"{extracted} produtos extraídos e salvos",
+        "run_id": run.id,
+        **result.as_dict(),
+        "rejected": rejects.count,
+        "duplicates": totals["duplicates"],
+        "extract_seconds": {"products": round(api.timings.get("products", 0.0), 4)},
+        "pipeline": {stage: stats.as_dict() for stage, stats in pipeline.stats.items()},
+        **({"images": image_result} if image_result is not None else {}),
+    }
+
+
+def make_etl_job_manager(session_factory=new_session, catalog: CatalogStore | None = None,
+                         search: ProductSearchIndex | None = None) -> JobManager:
+    """
+    Gerenciador de jobs em que cada job roda `run_etl` com uma sessão própria
+    e, ao final, publica o novo snapshot do catálogo e atualiza o índice de
+    busca deste processo.
+    """
+
+    def task(job):
+        db = session_factory()
+        try:
+            result = run_etl(db, on_stage=job.set_stage)
+            caches = {
+                "snapshot do catálogo": catalog or catalog_store,
+                "índice de busca": search or get_search_index(),
+            }
+            for name, cache in caches.items():
+                try:
+                    cache.refresh(db)
+                except Exception as error:
+                    # São só caches: a carga já foi concluída e as leituras reconstroem sob demanda
+                    print(f"⚠️ Erro ao atualizar o {name}: {error}")
+                    cache.invalidate()
+            return result
+        finally:
+            db.close()
+
+    return JobManager(task)
+
+
+etl_jobs = make_etl_job_manager()
+
+
+def get_etl_job_manager() -> JobManager:
+    return etl_jobs
+
+
+def start_etl_scheduler() -> IntervalScheduler | None:
+    """Inicia o ETL periódico se `ETL_SCHEDULE_SECONDS` estiver definido."""
+    interval = os.getenv("ETL_SCHEDULE_SECONDS")
+    if not interval:
+        return None
+    scheduler = IntervalScheduler(float(interval), lambda: get_etl_job_manager().submit())
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,337 @@
+"""
+Pré-carga das imagens dos produtos e miniaturas para os relatórios.
+
+As imagens são baixadas em paralelo (no máximo `max_concurrency` em voo) e
+guardadas em um diretório endereçado pelo SHA-256 do conteúdo: URLs
+diferentes com a mesma imagem ocupam um único arquivo e geram uma única
+miniatura. Um índice em JSON guarda, por URL, o hash e os validadores
+(ETag / Last-Modified) da última resposta, então imagens inalteradas custam
+só uma requisição condicional com resposta 304. Quando o diretório passa de
+`max_bytes`, as imagens menos usadas (mtime) são removidas junto com as
+miniaturas. As miniaturas dependem do Pillow, que é opcional.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable
+import httpx
+
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "fakestore_images")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CONCURRENCY = 8
+THUMBNAIL_SIZE = (64, 64)
+
+
+def thumbnails_available() -> bool:
+    """Miniaturas (e imagens no Excel) dependem do Pillow, que é opcional."""
+    return importlib.util.find_spec("PIL") is not None
+
+
+class ImageStore:
+    """
+    Imagens endereçadas por conteúdo em `directory/blobs`, miniaturas PNG em
+    `directory/thumbs` e o índice URL -> hash em `directory/index.json`.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 thumbnail_size: tuple[int, int] = THUMBNAIL_SIZE):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] | None = None
+
+    @property
+    def blobs(self) -> Path:
+        return self.directory / "blobs"
+
+    @property
+    def thumbs(self) -> Path:
+        return self.directory / "thumbs"
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs / digest
+
+    def thumbnail_for_digest(self, digest: str) -> Path:
+        return self.thumbs / f"{digest}.png"
+
+    # 🔹 Índice URL -> {sha256, etag, last_modified}
+    def _load_index(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_path.read_text())
+            except (FileNotFoundError, ValueError):
+                self._index = {}
+        return self._index
+
+    def entry(self, url: str) -> dict | None:
+        """Entrada do índice, só se a imagem ainda estiver no disco (pode ter sido removida pela LRU)."""
+        with self._lock:
+            entry = self._load_index().get(url)
+        if entry is None or not self.blob_path(entry["sha256"]).exists():
+            return None
+        return entry
+
+    def record(self, url: str, digest: str, etag: str | None, last_modified: str | None):
+        with self._lock:
+            self._load_index()[url] = {"sha256": digest, "etag": etag, "last_modified": last_modified}
+
+    def save_index(self):
+        """Grava o índice atomicamente (arquivo temporário + `os.replace`)."""
+        with self._lock:
+            index = dict(self._load_index())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(index, tmp)
+        os.replace(tmp_path, self.index_path)
+
+    @property
+    def version(self) -> int:
+        """Muda sempre que o índice é regravado; entra na chave dos relatórios com miniaturas."""
+        try:
+            return self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def touch(self, digest: str):
+        try:
+            os.utime(self.blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def add(self, tmp_path: str, digest: str) -> bool:
+        """Move um download para o store; devolve False se o conteúdo já existia (deduplicado)."""
+        path = self.blob_path(digest)
+        if path.exists():
+            os.remove(tmp_path)
+            self.touch(digest)
+            return False
+        os.replace(tmp_path, path)
+        return True
+
+    def make_thumbnail(self, digest: str) -> Path | None:
+        """
+        Gera a miniatura PNG do conteúdo; None sem Pillow ou se o arquivo não
+        for uma imagem que o Pillow decodifique (inclusive as que passam do
+        limite de pixels, `DecompressionBombError`).
+        """
+        target = self.thumbnail_for_digest(digest)
+        if target.exists():
+            return target
+        if not thumbnails_available():
+            return None
+        from PIL import Image
+
+        tmp_path = None
+        try:
+            self.thumbs.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.thumbs, suffix=".tmp")
+            os.close(fd)
+            with Image.open(self.blob_path(digest)) as image:
+                image.thumbnail(self.thumbnail_size)
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA")
+                image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, target)
+        except (Image.DecompressionBombError, OSError, ValueError, SyntaxError) as error:
+            # UnidentifiedImageError é um OSError; decodificadores com o arquivo
+            # corrompido também levantam ValueError ou SyntaxError
+            print(f"⚠️ Não foi possível gerar a miniatura {digest[:12]}: {error}")
+            return None
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return target
+
+    def thumbnail_path(self, url: str | None) -> Path | None:
+        """Miniatura já gerada para a URL, se houver."""
+        if not url:
+            return None
+        with self._lock:
+            entry = self._load_index().get(url)
+        if entry is None:
+            return None
+        path = self.thumbnail_for_digest(entry["sha256"])
+        return path if path.exists() else None
+
+    def evict(self, keep: set[str] = frozenset()):
+        """Remove as imagens menos usadas (e suas miniaturas) até o store caber em `max_bytes`."""
+        entries = []
+        for path in self.blobs.glob("*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            thumbnail = self.thumbnail_for_digest(path.name)
+            size = stat.st_size + (thumbnail.stat().st_size if thumbnail.exists() else 0)
+            entries.append((stat.st_mtime, size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if path.name in keep:
+                continue
+            for victim in (path, self.thumbnail_for_digest(path.name)):
+                try:
+                    victim.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+
+@dataclass
+class PrefetchResult:
+    downloaded: int = 0
+    not_modified: int = 0
+    deduplicated: int = 0
+    failed: int = 0
+    evicted: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        result = asdict(self)
+        result["seconds"] = round(self.seconds, 4)
+        return result
+
+
+class ImagePrefetcher:
+    """
+    Baixa as imagens de uma execução do ETL para o `ImageStore`.
+
+    Cada URL é buscada no máximo uma vez por instância, mesmo que apareça em
+    vários lotes; falhas são contadas e registradas, nunca interrompem o ETL.
+    """
+
+    def __init__(self, store: ImageStore, max_concurrency: int = DEFAULT_CONCURRENCY, timeout: float = 10.0,
+                 transport: httpx.BaseTransport | None = None, chunk_size: int = 64 * 1024):
+        self.store = store
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.client = httpx.Client(
+            timeout=timeout,
+            transport=transport,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self.result = PrefetchResult()
+        self._seen: set[str] = set()
+        self._used: set[str] = set()
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _count(self, outcome: str, digest: str | None = None):
+        with self._lock:
+            setattr(self.result, outcome, getattr(self.result, outcome) + 1)
+            if digest:
+                self._used.add(digest)
+
+    def _fetch(self, url: str):
+        store = self.store
+        entry = store.entry(url)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        tmp_path = None
+        try:
+            store.blobs.mkdir(parents=True, exist_ok=True)
+            with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and entry is not None:
+                    store.touch(entry["sha256"])
+                    self._count(self._checked("not_modified", url, entry["sha256"]), entry["sha256"])
+                    return
+                if response.status_code != 200:
+                    print(f"⚠️ Imagem {url}: status {response.status_code}")
+                    self._count("failed")
+                    return
+                # O hash é calculado enquanto o corpo é gravado, sem carregar a imagem inteira
+                digest = hashlib.sha256()
+                fd, tmp_path = tempfile.mkstemp(dir=store.blobs, suffix=".tmp")
+                with os.fdopen(fd, "wb") as tmp:
+                    for chunk in response.iter_bytes(self.chunk_size):
+                        digest.update(chunk)
+                        tmp.write(chunk)
+                etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            digest = digest.hexdigest()
+            # Sob o lock: duas URLs com o mesmo conteúdo não disputam o mesmo arquivo
+            with self._lock:
+                added = store.add(tmp_path, digest)
+        except (httpx.HTTPError, httpx.InvalidURL, OSError) as error:
+            # InvalidURL não é um HTTPError (image_url malformada); OSError: disco
+            # cheio, sem permissão... a imagem conta como falha e o ETL segue
+            print(f"⚠️ Erro ao baixar a imagem {url}: {error}")
+            if tmp_path is not None:
+                with suppress(OSError):
+                    os.remove(tmp_path)
+            self._count("failed")
+            return
+
+        store.record(url, digest, etag, last_modified)
+        self._count(self._checked("downloaded" if added else "deduplicated", url, digest), digest)
+
+    def _checked(self, outcome: str, url: str, digest: str) -> str:
+        """Gera a miniatura; conteúdo que o Pillow não decodifica faz a imagem contar como falha."""
+        if self.store.make_thumbnail(digest) is None and thumbnails_available():
+            print(f"⚠️ Imagem {url} não pôde ser decodificada")
+            return "failed"
+        return outcome
+
+    def prefetch(self, urls: Iterable[str | None]) -> int:
+        """Baixa as URLs ainda não vistas nesta execução; devolve quantas foram processadas."""
+        with self._lock:
+            pending = [url for url in dict.fromkeys(urls) if url and url not in self._seen]
+            self._seen.update(pending)
+        if not pending:
+            return 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pending))) as executor:
+            list(executor.map(self._fetch, pending))
+        self.result.seconds += time.perf_counter() - start
+        return len(pending)
+
+    def finish(self) -> PrefetchResult:
+        """Grava o índice e aplica a LRU, preservando as imagens usadas nesta execução."""
+        self.store.save_index()
+        self.result.evicted = self.store.evict(keep=self._used)
+        return self.result
+
+
+image_store = ImageStore(
+    directory=os.getenv("IMAGE_CACHE_DIR", DEFAULT_CACHE_DIR),
+    max_bytes=int(os.getenv("IMAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+)
+
+
+def get_image_store() -> ImageStore:
+    return image_store
@@ -0,0 +1,130 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+
+@dataclass
+class Job:
+    """Estado de uma execução em segundo plano, exposto em `GET /api/jobs/{id}`."""
+
+    id: str
+    status: str = "queued"
+    stage: str | None = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _stage_started: float | None = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def set_stage(self, stage: str | None):
+        """Encerra o cronômetro da etapa atual e inicia o da próxima."""
+        now = time.perf_counter()
+        if self.stage is not None and self._stage_started is not None:
+            self.stage_seconds[self.stage] = round(now - self._stage_started, 4)
+        self.stage = stage
+        self._stage_started = now if stage is not None else None
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "stage_seconds": dict(self.stage_seconds),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Executa uma tarefa em uma thread de fundo com single-flight: enquanto uma
+    execução estiver em andamento, novos disparos recebem o mesmo job em vez
+    de iniciar outro.
+    """
+
+    def __init__(self, task: Callable[[Job], dict], max_history: int = 100):
+        self.task = task
+        self.max_history = max_history
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._current: Job | None = None
+        self._lock = threading.Lock()
+
+    def submit(self) -> tuple[Job, bool]:
+        """Dispara a tarefa. Retorna (job, criado); `criado` é False se reaproveitou o job em voo."""
+        with self._lock:
+            if self._current is not None and not self._current.done:
+                return self._current, False
+
+            job = Job(id=uuid.uuid4().hex)
+            self._current = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+
+        # Propaga o contexto (ex.: rastreamento da requisição) para a thread
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._run, job), name=f"job-{job.id[:8]}", daemon=True).start()
+        return job, True
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def wait(self, job: Job, timeout: float | None = None) -> bool:
+        return job._done.wait(timeout)
+
+    def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        try:
+            job.result = self.task(job)
+            job.status = "succeeded"
+        except Exception as error:
+            job.error = str(error)
+            job.status = "failed"
+        finally:
+            job.set_stage(None)
+            job.finished_at = datetime.utcnow()
+            job._done.set()
+
+
+class IntervalScheduler:
+    """Dispara `callback` a cada `interval` segundos em uma thread daemon."""
+
+    def __init__(self, interval: float, callback: Callable[[], object]):
+        if interval <= 0:
+            raise ValueError("interval deve ser maior que zero")
+        self.interval = interval
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="etl-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.callback()
+            except Exception as error:
+                print(f"❌ Erro no agendamento do ETL: {error}")
@@ -0,0 +1,247 @@
+"""
+Executor de pipeline em threads: uma fonte e uma sequência de estágios
+ligados por filas limitadas.
+
+Cada estágio tem `workers` threads e uma fila de entrada com no máximo
+`queue_size` itens; quando um estágio atrasa, a fila enche e os anteriores
+esperam (backpressure), então a memória fica limitada ao que cabe nas filas.
+Uma exceção em qualquer ponto cancela a pipeline inteira: as demais threads
+param na próxima espera de fila e `run` relança o erro original.
+"""
+import contextvars
+import heapq
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+
+_DONE = object()
+# Item descartado (func devolveu None): segue adiante só para manter a sequência contígua
+_SKIP = object()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+@dataclass
+class Stage:
+    """
+    Estágio da pipeline. `func` recebe um item e devolve o item do próximo
+    estágio (None descarta). Com `ordered=True` (exige `workers=1`) os itens
+    são processados na ordem em que saíram da fonte, mesmo que um estágio
+    anterior paralelo os entregue fora de ordem.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 4
+    ordered: bool = False
+
+    def __post_init__(self):
+        if self.workers < 1 or self.queue_size < 1:
+            raise ValueError("workers e queue_size devem ser maiores que zero")
+        if self.ordered and self.workers != 1:
+            raise ValueError("Um estágio ordenado precisa de exatamente um worker")
+
+
+@dataclass
+class StageStats:
+    """Vazão e profundidade de fila de um estágio, reportadas ao fim da execução."""
+
+    name: str
+    workers: int = 1
+    items: int = 0
+    rows: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    _depth_sum: int = field(default=0, repr=False)
+
+    def as_dict(self) -> dict:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "rows": self.rows,
+            "busy_seconds": round(self.busy_seconds, 4),
+            "rows_per_second": round(self.rows / self.busy_seconds, 1) if self.busy_seconds else None,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_queue_depth": round(self._depth_sum / self.items, 2) if self.items else 0.0,
+        }
+
+
+def _size(item) -> int:
+    try:
+        return len(item)
+    except TypeError:
+        return 1
+
+
+class Pipeline:
+    """
+    Executa `source` (um iterável, em uma thread própria) e os `stages` em
+    paralelo. `run` devolve as saídas do último estágio e preenche `stats`.
+    `on_stage_start(nome)` é chamado quando cada etapa recebe o primeiro item.
+    """
+
+    def __init__(self, source: Iterable, stages: list[Stage], source_name: str = "source",
+                 on_stage_start: Callable[[str], None] | None = None, poll_interval: float = 0.05):
+        if not stages:
+            raise ValueError("A pipeline precisa de pelo menos um estágio")
+        self.source = source
+        self.source_name = source_name
+        self.stages = stages
+        self.on_stage_start = on_stage_start
+        self.poll_interval = poll_interval
+        self.stats: dict[str, StageStats] = {source_name: StageStats(source_name)}
+        for stage in stages:
+            self.stats[stage.name] = StageStats(stage.name, workers=stage.workers)
+
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self._finished = [0] * len(stages)
+        self._started: set[str] = set()
+        self._results: list[tuple[int, Any]] = []
+        self._error: BaseException | None = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    # 🔹 Filas com cancelamento: as esperas acordam a cada `poll_interval`
+    def _put(self, index: int, item):
+        target = self._queues[index]
+        while True:
+            if self._cancelled.is_set():
+                raise _Cancelled
+            try:
+                target.put(item, timeout=self.poll_interval)
+            except queue.Full:
+                continue
+            if item is not _DONE:
+                depth = target.qsize()
+                stats = self.stats[self.stages[index].name]
+                with self._lock:
+                    stats.max_queue_depth = max(stats.max_queue_depth, depth)
+                    stats._depth_sum += depth
+            return
+
+    def _get(self, index: int):
+        source = self._queues[index]
+        while True:
+            if self._cancelled.is_set():
+                raise _Cancelled
+            try:
+                return source.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._cancelled.set()
+
+    def _mark_started(self, name: str):
+        with self._lock:
+            if name in self._started:
+                return
+            self._started.add(name)
+        if self.on_stage_start is not None:
+            self.on_stage_start(name)
+
+    def _record(self, name: str, item, seconds: float):
+        stats = self.stats[name]
+        with self._lock:
+            stats.items += 1
+            stats.rows += _size(item)
+            stats.busy_seconds += seconds
+
+    def _run_source(self):
+        try:
+            iterator = iter(self.source)
+            sequence = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                self._mark_started(self.source_name)
+                self._record(self.source_name, item, time.perf_counter() - start)
+                self._put(0, (sequence, item))
+                sequence += 1
+            for _ in range(self.stages[0].workers):
+                self._put(0, _DONE)
+        except _Cancelled:
+            pass
+        except BaseException as error:
+            self._fail(error)
+
+    def _stage_done(self, index: int):
+        """O último worker de um estágio a terminar avisa todos os workers do próximo."""
+        with self._lock:
+            self._finished[index] += 1
+            last = self._finished[index] == self.stages[index].workers
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                self._put(index + 1, _DONE)
+
+    def _process(self, index: int, sequence: int, item):
+        stage = self.stages[index]
+        output = _SKIP
+        if item is not _SKIP:
+            self._mark_started(stage.name)
+            start = time.perf_counter()
+            output = stage.func(item)
+            self._record(stage.name, item, time.perf_counter() - start)
+            if output is None:
+                output = _SKIP
+        if index + 1 < len(self.stages):
+            self._put(index + 1, (sequence, output))
+        elif output is not _SKIP:
+            with self._lock:
+                self._results.append((sequence, output))
+
+    def _run_worker(self, index: int):
+        stage = self.stages[index]
+        # Itens que chegaram adiantados num estágio ordenado; no máximo o que
+        # cabe em trânsito nos estágios anteriores
+        pending: list[tuple[int, int, Any]] = []
+        next_sequence = 0
+        try:
+            while True:
+                entry = self._get(index)
+                if entry is _DONE:
+                    break
+                sequence, item = entry
+                if not stage.ordered:
+                    self._process(index, sequence, item)
+                    continue
+                heapq.heappush(pending, (sequence, id(item), item))
+                while pending and pending[0][0] == next_sequence:
+                    _, _, item = heapq.heappop(pending)
+                    self._process(index, next_sequence, item)
+                    next_sequence += 1
+            self._stage_done(index)
+        except _Cancelled:
+            pass
+        except BaseException as error:
+            self._fail(error)
+
+    def run(self) -> list:
+        threads = []
+        targets = [(self._run_source, ())]
+        for index, stage in enumerate(self.stages):
+            targets.extend((self._run_worker, (index,)) for _ in range(stage.workers))
+        for target, args in targets:
+            # Cada thread herda o contexto de quem chamou (ex.: rastreamento)
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(target, *args), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return [output for _, output in sorted(self._results, key=lambda entry: entry[0])]
@@ -0,0 +1,378 @@
+"""
+Busca textual de produtos (`name` e `description`).
+
+No MySQL a busca usa o índice FULLTEXT. Nos demais dialetos usa um índice
+invertido em memória, no mesmo esquema do snapshot do catálogo: versionado
+pela última execução bem-sucedida do ETL e trocado com uma única atribuição.
+
+O índice é formado por segmentos imutáveis em formato CSR (vocabulário
+ordenado, offsets e listas de documentos em arrays NumPy). A primeira carga
+gera um segmento com todo o catálogo; as seguintes comparam os hashes de
+conteúdo com os do índice e só tokenizam os produtos novos ou alterados, que
+vão para um segmento novo, enquanto as versões antigas são marcadas como
+removidas. Quando sobram segmentos demais ou documentos removidos demais, o
+índice é reconstruído do zero.
+
+A consulta exige todos os termos, trata o último como prefixo (busca
+enquanto se digita) e ordena por BM25, com os termos do nome valendo dobrado.
+"""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from sqlalchemy.orm import Session
+from ..database.crud_etl_runs import get_catalog_version
+from ..database.crud_search import (
+    iter_content_hashes,
+    iter_search_documents,
+    search_products_fulltext,
+    uses_fulltext,
+)
+from .catalog import DEFAULT_VERSION_TTL
+
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_WEIGHT = 2
+# Um prefixo curto pode casar milhares de termos: usa só os mais frequentes
+MAX_PREFIX_EXPANSIONS = 64
+MAX_SEGMENTS = 8
+MAX_DELETED_RATIO = 0.25
+
+_TOKEN = re.compile(r"\w+")
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Termos em minúsculas e sem acentos (`Algodão` -> `algodao`)."""
+    if not text:
+        return []
+    text = text.lower()
+    if not text.isascii():
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return _TOKEN.findall(text)
+
+
+def _hash_key(content_hash: str | None) -> int:
+    """Os 64 primeiros bits do hash de conteúdo bastam para detectar mudanças."""
+    return int(content_hash[:16], 16) if content_hash else 0
+
+
+class _Segment:
+    """Listas invertidas imutáveis: `docs[offsets[i]:offsets[i + 1]]` são os documentos de `terms[i]`."""
+
+    def __init__(self, term_ids: array, docs: array, tfs: array, vocabulary: dict[str, int]):
+        import numpy as np
+
+        terms_by_id = list(vocabulary)
+        order = sorted(range(len(terms_by_id)), key=terms_by_id.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        posting_ranks = rank[np.frombuffer(term_ids, dtype=np.uint32)] if len(term_ids) else np.empty(0, np.int64)
+        by_term = np.argsort(posting_ranks, kind="stable")
+        self.terms = [terms_by_id[term_id] for term_id in order]
+        self.docs = np.frombuffer(docs, dtype=np.uint32)[by_term] if len(docs) else np.empty(0, np.uint32)
+        self.tfs = np.frombuffer(tfs, dtype=np.uint16)[by_term] if len(tfs) else np.empty(0, np.uint16)
+        self.offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_ranks, minlength=len(self.terms)), out=self.offsets[1:])
+
+    @property
+    def nbytes(self) -> int:
+        return self.docs.nbytes + self.tfs.nbytes + self.offsets.nbytes
+
+    def lookup(self, term: str, prefix: bool) -> list[tuple[str, slice]]:
+        """Termos do vocabulário que casam com `term` (exato ou como prefixo) e o trecho das suas listas."""
+        start = bisect_left(self.terms, term)
+        if not prefix:
+            if start < len(self.terms) and self.terms[start] == term:
+                return [(term, slice(self.offsets[start], self.offsets[start + 1]))]
+            return []
+        stop = bisect_left(self.terms, term + "\uffff", lo=start)
+        if stop - start > MAX_PREFIX_EXPANSIONS:
+            import numpy as np
+
+            sizes = self.offsets[start + 1:stop + 1] - self.offsets[start:stop]
+            chosen = np.sort(np.argpartition(-sizes, MAX_PREFIX_EXPANSIONS)[:MAX_PREFIX_EXPANSIONS]) + start
+        else:
+            chosen = range(start, stop)
+        return [(self.terms[i], slice(self.offsets[i], self.offsets[i + 1])) for i in chosen]
+
+
+class _SegmentBuilder:
+    """Acumula documentos tokenizados e gera um `_Segment`; as posições continuam a partir de `first_position`."""
+
+    def __init__(self, first_position: int, categories: list[str], category_codes: dict[str, int]):
+        self.position = first_position
+        self.categories = categories
+        self.category_codes = category_codes
+        self.vocabulary: dict[str, int] = {}
+        self.term_ids = array("I")
+        self.docs = array("I")
+        self.tfs = array("H")
+        self.ids = array("q")
+        self.hashes = array("Q")
+        self.lengths = array("f")
+        self.codes = array("H")
+
+    def add(self, product_id: int, content_hash: str | None, category: str, name: str | None,
+            description: str | None):
+        counts: dict[str, int] = {}
+        for term in tokenize(name):
+            counts[term] = counts.get(term, 0) + NAME_WEIGHT
+        for term in tokenize(description):
+            counts[term] = counts.get(term, 0) + 1
+
+        vocabulary = self.vocabulary
+        for term, count in counts.items():
+            term_id = vocabulary.get(term)
+            if term_id is None:
+                term_id = vocabulary[term] = len(vocabulary)
+            self.term_ids.append(term_id)
+            self.docs.append(self.position)
+            self.tfs.append(min(count, 65535))
+
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        self.ids.append(product_id)
+        self.hashes.append(_hash_key(content_hash))
+        self.lengths.append(sum(counts.values()))
+        self.codes.append(code)
+        self.position += 1
+
+    def segment(self) -> _Segment:
+        return _Segment(self.term_ids, self.docs, self.tfs, self.vocabulary)
+
+
+@dataclass
+class SearchHits:
+    total: int
+    hits: list[tuple[int, float]] = field(default_factory=list)
+
+
+class _IndexState:
+    """
+    Uma versão publicada do índice. Por documento (posição): id, comprimento
+    ponderado, categoria e marca de removido. `live_*` mapeia, em ordem de id,
+    cada produto atual para sua posição e hash de conteúdo.
+    """
+
+    def __init__(self, version, segments, ids, lengths, codes, deleted, categories, live_ids, live_positions,
+                 live_hashes):
+        self.version = version
+        self.segments: list[_Segment] = segments
+        self.ids = ids
+        self.lengths = lengths
+        self.codes = codes
+        self.deleted = deleted
+        self.categories: list[str] = categories
+        self.live_ids = live_ids
+        self.live_positions = live_positions
+        self.live_hashes = live_hashes
+        self.document_count = len(live_ids)
+        self.average_length = float(lengths[live_positions].mean()) if len(live_positions) else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.ids, self.lengths, self.codes, self.deleted, self.live_ids, self.live_positions, self.live_hashes)
+        return sum(segment.nbytes for segment in self.segments) + sum(values.nbytes for values in arrays)
+
+    def needs_compaction(self) -> bool:
+        return len(self.segments) >= MAX_SEGMENTS or self.deleted.sum() > MAX_DELETED_RATIO * len(self.deleted)
+
+    def _postings(self, term: str, prefix: bool) -> dict:
+        """{termo do vocabulário: (docs, tfs)} somando todos os segmentos."""
+        import numpy as np
+
+        found: dict[str, list] = {}
+        for segment in self.segments:
+            for matched, span in segment.lookup(term, prefix):
+                found.setdefault(matched, []).append((segment.docs[span], segment.tfs[span]))
+        return {
+            matched: (np.concatenate([docs for docs, _ in parts]), np.concatenate([tfs for _, tfs in parts]))
+            for matched, parts in found.items()
+        }
+
+    def search(self, terms: list[str], category: str | None, limit: int, offset: int) -> SearchHits:
+        import numpy as np
+
+        size = len(self.ids)
+        candidates = ~self.deleted
+        if category is not None:
+            if category not in self.categories:
+                return SearchHits(0)
+            candidates &= self.codes == self.categories.index(category)
+
+        scores = np.zeros(size, dtype=np.float32)
+        count, average = self.document_count, self.average_length or 1.0
+        for position, term in enumerate(terms):
+            matched = np.zeros(size, dtype=bool)
+            for docs, tfs in self._postings(term, prefix=position == len(terms) - 1).values():
+                live = ~self.deleted[docs]
+                frequency = int(live.sum())
+                if not frequency:
+                    continue
+                docs, tfs = docs[live], tfs[live].astype(np.float32)
+                idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[docs] / average)
+                scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+                matched[docs] = True
+            candidates &= matched
+
+        positions = np.flatnonzero(candidates)
+        total = len(positions)
+        wanted = offset + limit
+        if total > wanted:
+            # Só ordena os candidatos acima da nota de corte (incluindo empates, para a ordem por id ser estável)
+            cutoff = np.partition(-scores[positions], wanted - 1)[wanted - 1]
+            positions = positions[-scores[positions] <= cutoff]
+        order = np.lexsort((self.ids[positions], -scores[positions]))
+        page = positions[order[offset:wanted]]
+        return SearchHits(total, [(int(self.ids[p]), round(float(scores[p]), 4)) for p in page])
+
+
+class ProductSearchIndex:
+    """
+    Guarda o índice de busca do processo e o atualiza quando a versão do
+    catálogo muda (no máximo uma consulta de versão a cada `version_ttl` segundos).
+    """
+
+    def __init__(self, version_ttl: float = DEFAULT_VERSION_TTL, clock=time.monotonic):
+        self.version_ttl = version_ttl
+        self._clock = clock
+        self._state: _IndexState | None = None
+        self._checked_at = float("-inf")
+        self._build_lock = threading.Lock()
+
+    def search(self, db: Session, query: str, category: str | None = None, limit: int = 20,
+               offset: int = 0) -> SearchHits:
+        """Produtos que contêm todos os termos de `query`, do mais ao menos relevante."""
+        terms = tokenize(query)
+        if not terms:
+            return SearchHits(0)
+        if uses_fulltext(db):
+            return SearchHits(*search_products_fulltext(db, terms, category, limit, offset))
+        return self.current(db).search(terms, category, limit, offset)
+
+    def current(self, db: Session) -> _IndexState:
+        state = self._state
+        if state is not None and self._clock() - self._checked_at < self.version_ttl:
+            return state
+        version = get_catalog_version(db)
+        self._checked_at = self._clock()
+        if state is not None and state.version == version:
+            return state
+        return self.refresh(db, version)
+
+    def refresh(self, db: Session, version: int | None = None) -> _IndexState | None:
+        """Atualiza o índice para a versão atual: incremental se possível, do zero se precisar compactar."""
+        if uses_fulltext(db):
+            return None
+        with self._build_lock:
+            version = get_catalog_version(db) if version is None else version
+            state = self._state
+            if state is not None and state.version == version:
+                return state
+            if state is None or state.needs_compaction():
+                state = self._build(db, version)
+            else:
+                state = self._update(db, state, version)
+            self._state = state
+            self._checked_at = self._clock()
+            return state
+
+    def invalidate(self):
+        with self._build_lock:
+            self._state = None
+            self._checked_at = float("-inf")
+
+    @staticmethod
+    def _build(db: Session, version: int) -> _IndexState:
+        import numpy as np
+
+        builder = _SegmentBuilder(0, [], {})
+        for row in iter_search_documents(db):
+            builder.add(*row)
+        ids = np.array(builder.ids, dtype=np.int64)
+        return _IndexState(
+            version,
+            [builder.segment()],
+            ids=ids,
+            lengths=np.array(builder.lengths, dtype=np.float32),
+            codes=np.array(builder.codes, dtype=np.uint16),
+            deleted=np.zeros(len(ids), dtype=bool),
+            categories=builder.categories,
+            live_ids=ids,
+            live_positions=np.arange(len(ids), dtype=np.int64),
+            live_hashes=np.array(builder.hashes, dtype=np.uint64),
+        )
+
+    @staticmethod
+    def _update(db: Session, state: _IndexState, version: int) -> _IndexState:
+        import numpy as np
+
+        current_ids, current_hashes = array("q"), array("Q")
+        for product_id, content_hash in iter_content_hashes(db):
+            current_ids.append(product_id)
+            current_hashes.append(_hash_key(content_hash))
+        current_ids = np.array(current_ids, dtype=np.int64)
+        current_hashes = np.array(current_hashes, dtype=np.uint64)
+
+        # Casa os produtos atuais com os do índice (ambos em ordem de id)
+        found = np.searchsorted(state.live_ids, current_ids)
+        found_clipped = np.minimum(found, max(len(state.live_ids) - 1, 0))
+        unchanged = np.zeros(len(current_ids), dtype=bool)
+        if len(state.live_ids):
+            unchanged = (state.live_ids[found_clipped] == current_ids) & (
+                state.live_hashes[found_clipped] == current_hashes
+            )
+
+        kept = np.zeros(len(state.live_ids), dtype=bool)
+        kept[found_clipped[unchanged]] = True
+        deleted = state.deleted.copy()
+        deleted[state.live_positions[~kept]] = True
+
+        categories = list(state.categories)
+        builder = _SegmentBuilder(len(state.ids), categories, {name: code for code, name in enumerate(categories)})
+        for row in iter_search_documents(db, ids=current_ids[~unchanged].tolist()):
+            builder.add(*row)
+        added_ids = np.array(builder.ids, dtype=np.int64)
+
+        # Produtos alterados que sumiram entre as duas consultas ficam de fora
+        changed_ids = current_ids[~unchanged]
+        present = np.isin(changed_ids, added_ids)
+        positions = np.empty(len(current_ids), dtype=np.int64)
+        positions[unchanged] = state.live_positions[found_clipped[unchanged]]
+        positions[~unchanged] = len(state.ids) + np.searchsorted(added_ids, changed_ids)
+        keep = np.ones(len(current_ids), dtype=bool)
+        keep[np.flatnonzero(~unchanged)[~present]] = False
+
+        segments = list(state.segments)
+        if len(added_ids):
+            segments.append(builder.segment())
+        return _IndexState(
+            version,
+            segments,
+            ids=np.concatenate([state.ids, added_ids]),
+            lengths=np.concatenate([state.lengths, np.array(builder.lengths, dtype=np.float32)]),
+            codes=np.concatenate([state.codes, np.array(builder.codes, dtype=np.uint16)]),
+            deleted=np.concatenate([deleted, np.zeros(len(added_ids), dtype=bool)]),
+            categories=categories,
+            live_ids=current_ids[keep],
+            live_positions=positions[keep],
+            live_hashes=current_hashes[keep],
+        )
+
+
+search_index = ProductSearchIndex(version_ttl=float(os.getenv("CATALOG_VERSION_TTL", DEFAULT_VERSION_TTL)))
+
+
+def get_search_index() -> ProductSearchIndex:
+    return search_index
@@ -0,0 +1,186 @@
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from itertools import repeat
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+
+# Campos da FakeStore API → colunas da tabela `products`
+COLUMN_MAP = {
+    "id": "id",
+    "title": "name",
+    "category": "category",
+    "price": "price",
+    "description": "description",
+    "image": "image_url",
+}
+# Limites das colunas String(n) do modelo Product
+MAX_LENGTHS = {"name": 255, "category": 100, "image_url": 255}
+REQUIRED_TEXT = ("name", "category")
+
+
+class RejectSink:
+    """
+    Destino dos registros rejeitados pela transformação.
+
+    Guarda a contagem e uma amostra dos primeiros `sample_size` registros; se
+    `path` for informado, grava todos em NDJSON (um registro por linha, com os
+    motivos da rejeição). Pode ser compartilhado entre workers da transformação.
+    """
+
+    def __init__(self, path: str | None = None, sample_size: int = 20):
+        self.path = path
+        self.sample_size = sample_size
+        self.count = 0
+        self.sample: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: dict, reasons: list[str]):
+        entry = {"record": record, "reasons": reasons}
+        with self._lock:
+            self.count += 1
+            if len(self.sample) < self.sample_size:
+                self.sample.append(entry)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+
+@dataclass
+class TransformResult:
+    """Produtos válidos em formato colunar, prontos para a carga."""
+
+    frame: pd.DataFrame
+    extracted_at: datetime
+    rejected: int = 0
+    duplicates: int = 0
+    truncated: int = 0
+    rejects: RejectSink = field(default_factory=RejectSink)
+    # Ids válidos de registros rejeitados por outros motivos: o produto segue
+    # na API e não deve ser removido do banco por causa da rejeição
+    rejected_ids: list[int] = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def iter_records(self, chunk_size: int = 1000):
+        """
+        Materializa as linhas em dicts no formato de `insert_products`, um lote
+        por vez, convertendo o preço para Decimal apenas no lote corrente.
+        """
+        columns = list(COLUMN_MAP.values())
+        arrays = [self.frame[column].to_numpy() for column in columns]
+        # Centavos inteiros: `Decimal(centavos).scaleb(-2)` dá o mesmo valor (e
+        # o mesmo texto no content_hash) que `Decimal(f"{preço:.2f}")`, mais rápido
+        cents = np.rint(self.frame["price"].to_numpy() * 100).astype(np.int64)
+        price_index = columns.index("price")
+        columns.append("timestamp")
+        for start in range(0, len(cents), chunk_size):
+            stop = start + chunk_size
+            values = [array[start:stop].tolist() for array in arrays]
+            values[price_index] = [Decimal(cent).scaleb(-2) for cent in cents[start:stop].tolist()]
+            values.append(repeat(self.extracted_at, len(values[price_index])))
+            yield [dict(zip(columns, row)) for row in zip(*values)]
+
+    def records(self) -> list[dict]:
+        return [record for chunk in self.iter_records() for record in chunk]
+
+
+def _column(records: list[dict], key: str) -> np.ndarray:
+    try:
+        return np.fromiter(map(itemgetter(key), records), dtype=object, count=len(records))
+    except KeyError:
+        return np.fromiter((record.get(key) for record in records), dtype=object, count=len(records))
+
+
+def _to_float(values: np.ndarray) -> np.ndarray:
+    """Converte para float64; valores não numéricos viram NaN."""
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(np.float64)
+
+
+def _text_lengths(values: np.ndarray) -> np.ndarray:
+    """Tamanho de cada texto; -1 para valores ausentes ou que não são texto."""
+    try:
+        return np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    except TypeError:
+        return np.fromiter(
+            (len(value) if isinstance(value, str) else -1 for value in values),
+            dtype=np.int64, count=len(values),
+        )
+
+
+def transform_products(records: list[dict], extracted_at: datetime | None = None,
+                       rejects: RejectSink | None = None) -> TransformResult:
+    """
+    Transforma o payload da FakeStore API em lote, coluna a coluna:
+    renomeia os campos, valida ids, textos obrigatórios e preços, remove
+    duplicados por id (prevalece o último), trunca os textos aos limites do
+    modelo e aplica um único timestamp para toda a execução.
+    """
+    extracted_at = extracted_at or datetime.utcnow()
+    rejects = rejects if rejects is not None else RejectSink()
+
+    columns = {column: _column(records, key) for key, column in COLUMN_MAP.items()}
+    ids = _to_float(columns["id"])
+    prices = _to_float(columns["price"])
+    lengths = {column: _text_lengths(columns[column]) for column in MAX_LENGTHS}
+
+    with np.errstate(invalid="ignore"):
+        bad_ids = ~np.isfinite(ids) | (np.mod(ids, 1) != 0)
+        checks = {
+            "id ausente ou inválido": bad_ids,
+            "preço ausente ou inválido": ~np.isfinite(prices),
+            "preço negativo": prices < 0,
+        }
+    for column in REQUIRED_TEXT:
+        checks[f"{column} ausente"] = lengths[column] <= 0
+
+    invalid = np.logical_or.reduce(list(checks.values()))
+    for position in np.flatnonzero(invalid):
+        reasons = [reason for reason, mask in checks.items() if mask[position]]
+        rejects.add(records[position], reasons)
+
+    # Entre ids repetidos, mantém a última ocorrência válida
+    valid_positions = np.flatnonzero(~invalid)
+    valid_ids = ids[valid_positions].astype(np.int64)
+    duplicated = pd.Series(valid_ids).duplicated(keep="last").to_numpy()
+    keep = valid_positions[~duplicated]
+
+    if len(keep) == len(records):
+        data = dict(columns)
+        data["id"] = valid_ids
+    else:
+        data = {column: values[keep] for column, values in columns.items()}
+        data["id"] = valid_ids[~duplicated]
+    data["price"] = np.round(prices[keep], 2)
+
+    truncated = 0
+    for column, limit in MAX_LENGTHS.items():
+        too_long = np.flatnonzero(lengths[column][keep] > limit)
+        truncated += len(too_long)
+        for position in too_long:
+            data[column][position] = data[column][position][:limit]
+
+    # Textos ficam como object: a inferência de string do pandas copiaria cada
+    # coluna para Arrow (e trocaria None por NaN) só para voltar a str na carga
+    frame = pd.DataFrame(
+        {column: pd.Series(values, dtype=object if values.dtype == object else None, copy=False)
+         for column, values in data.items()},
+        copy=False,
+    )
+    return TransformResult(
+        frame=frame,
+        extracted_at=extracted_at,
+        rejected=int(invalid.sum()),
+        duplicates=int(duplicated.sum()),
+        truncated=truncated,
+        rejects=rejects,
+        rejected_ids=ids[invalid & ~bad_ids].astype(np.int64).tolist(),
+    )
@@ -1,10 +1,16 @@
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool, StaticPool
 from testcontainers.mysql import MySqlContainer
 from fastapi.testclient import TestClient
 from app.main import app
-from app.database.db import Base, get_db
+from app.adapters import fakestore
+from app.database.db import Base, get_async_read_db, get_read_db, to_async_url
+from app.services.catalog import CatalogStore, get_catalog_store
+from app.services.etl_pipeline import get_etl_job_manager, make_etl_job_manager
+from app.services.search import ProductSearchIndex, get_search_index
 
 
 @pytest.fixture(scope="session")
@@ -15,6 +21,50 @@ def engine():
         yield _engine
 
 
+def _provide(value):
+    """Override assíncrono de uma dependência, para não passar pelo threadpool."""
+
+    async def override():
+        return value
+
+    return override
+
+
+def _async_session_override(url):
+    """`get_async_read_db` apontando para o mesmo banco do teste (NullPool: nada a fechar entre event loops)."""
+    factory = async_sessionmaker(
+        create_async_engine(to_async_url(url), poolclass=NullPool), autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_async_read_db():
+        async with factory() as db:
+            yield db
+
+    return override_get_async_read_db
+
+
+# 🔹 Banco SQLite em arquivo temporário, para testes que não dependem do Docker
+# (em arquivo para que o engine assíncrono das rotas de leitura veja os mesmos dados)
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    _engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(_engine)
+    yield _engine
+    _engine.dispose()
+
+
+@pytest.fixture
+def sqlite_session(sqlite_engine):
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+
+
 # 🔹 Criar sessão do banco de dados de teste
 @pytest.fixture
 def session(engine):
@@ -34,12 +84,99 @@ def session(engine):
 def client(session):
     """Substitui a conexão do FastAPI para usar o banco do Testcontainers"""
 
-    def override_get_db():
+    def override_get_read_db():
         yield session
 
-    app.dependency_overrides[get_db] = override_get_db
+    catalog = CatalogStore(session_factory=lambda: Session(bind=session.get_bind()))
+    search = ProductSearchIndex()
+    job_manager = make_etl_job_manager(session_factory=lambda: session, catalog=catalog, search=search)
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_async_read_db] = _async_session_override(session.get_bind().url)
+    app.dependency_overrides[get_etl_job_manager] = lambda: job_manager
+    app.dependency_overrides[get_catalog_store] = _provide(catalog)
+    app.dependency_overrides[get_search_index] = lambda: search
 
     with TestClient(app) as client:
         yield client
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def sqlite_client(sqlite_session):
+    """Cliente de teste do FastAPI apontando para o SQLite do teste"""
+
+    def override_get_read_db():
+        yield sqlite_session
+
+    catalog = CatalogStore(session_factory=lambda: Session(bind=sqlite_session.get_bind()))
+    search = ProductSearchIndex()
+    job_manager = make_etl_job_manager(session_factory=lambda: sqlite_session, catalog=catalog, search=search)
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_async_read_db] = _async_session_override(sqlite_session.get_bind().url)
+    app.dependency_overrides[get_etl_job_manager] = lambda: job_manager
+    app.dependency_overrides[get_catalog_store] = _provide(catalog)
+    app.dependency_overrides[get_search_index] = lambda: search
+
+    with TestClient(app) as client:
+        yield client
+
+    app.dependency_overrides.clear()
+
+
+# 🔹 Adapter falso da FakeStore API, para rodar o ETL sem rede
+class StubAPI:
+    """Adapter falso que devolve o catálogo definido no teste."""
+
+    def __init__(self, products):
+        self.products = products
+        self.timings = {}
+
+    def fetch_products(self):
+        self.timings["products"] = 0.0
+        return [dict(p) for p in self.products]
+
+
+def _product_payload(product_id, price=10.0):
+    return {
+        "id": product_id,
+        "title": f"Produto {product_id}",
+        "category": "electronics",
+        "price": price,
+        "description": "descrição",
+        "image": "",
+        "extracted_at": "2025-01-01T00:00:00",
+    }
+
+
+@pytest.fixture
+def make_product():
+    """Fábrica de produtos no formato retornado pela FakeStore API."""
+    return _product_payload
+
+
+@pytest.fixture
+def make_row():
+    """Fábrica de linhas no formato de `insert_products` (colunas de Product)."""
+
+    def _make_row(product_id, price=10.0, category="electronics"):
+        return {
+            "id": product_id,
+            "name": f"Produto {product_id}",
+            "category": category,
+            "price": price,
+            "description": "descrição",
+            "image_url": "",
+            "timestamp": "2025-01-01T00:00:00",
+        }
+
+    return _make_row
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    api = StubAPI([_product_payload(i) for i in range(1, 5)])
+    monkeypatch.setattr(fakestore, "_default_api", api)
+    return api
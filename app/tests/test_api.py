@@ -1,19 +1,20 @@
 def test_create_product(client):
     """Testa a criação de produtos via API ETL"""
-    response = client.post("/api/products")
+    response = client.post("/api/products", params={"wait": True})
     
     assert response.status_code == 200 
     data = response.json()
     
-    assert "message" in data
-    assert  "produtos extraídos e salvos" in data["message"]
+    assert data["status"] == "succeeded"
+    assert "message" in data["result"]
+    assert  "produtos extraídos e salvos" in data["result"]["message"]
 
 
 def test_get_products(client):
     """Testa a listagem de produtos"""
     
     # Primeiro, rodamos o ETL para garantir que existam produtos no banco
-    client.post("/api/products")
+    client.post("/api/products", params={"wait": True})
     
     # Agora, testamos o GET /api/products
     response = client.get("/api/products")
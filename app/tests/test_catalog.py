@@ -0,0 +1,129 @@
+import asyncio
+import itertools
+
+import orjson
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database import db
+from app.database.crud_products import PRODUCT_FIELDS, get_product_rows, insert_products
+from app.services.catalog import CatalogSnapshot, CatalogStore
+from app.services.etl_pipeline import run_etl
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def catalog_rows(sqlite_session, make_row):
+    categories = ["electronics", "jewelery", "men's clothing"]
+    rows = [make_row(i, price=(i * 37) % 101 + (0.5 if i % 2 else 0), category=categories[i % 3]) for i in range(1, 61)]
+    insert_products(sqlite_session, rows)
+    return rows
+
+
+def test_snapshot_matches_database(sqlite_session, catalog_rows):
+    """Para cada combinação de filtros, o snapshot serializa igual à consulta no banco."""
+    snapshot = CatalogSnapshot.build(sqlite_session, version=1)
+    fields = list(PRODUCT_FIELDS)
+
+    for limit, after_id, category, min_price, max_price in itertools.product(
+        (None, 7), (None, 20), (None, "jewelery", "books"), (None, 30.5), (None, 70)
+    ):
+        filters = {"after_id": after_id, "category": category, "min_price": min_price, "max_price": max_price}
+        expected = [dict(zip(fields, row)) for row in get_product_rows(sqlite_session, limit=limit, **filters)]
+
+        actual = snapshot.rows(snapshot.select(limit=limit, **filters), fields)
+        assert orjson.dumps(actual) == orjson.dumps(expected), filters
+
+
+def test_snapshot_pages_through_wide_price_range(sqlite_session, catalog_rows):
+    """Faixas largas (varredura em ordem de id) e estreitas (índice de preço) paginam igual ao banco."""
+    snapshot = CatalogSnapshot.build(sqlite_session, version=1)
+
+    for min_price, max_price in ((0, 95), (None, 100), (40, 45)):
+        after_id, pages = None, []
+        while True:
+            page = snapshot.rows(snapshot.select(limit=7, after_id=after_id, min_price=min_price,
+                                                 max_price=max_price), ["id"])
+            if not page:
+                break
+            pages.extend(row["id"] for row in page)
+            after_id = page[-1]["id"]
+
+        expected = [row[0] for row in get_product_rows(sqlite_session, min_price=min_price, max_price=max_price)]
+        assert pages == expected, (min_price, max_price)
+
+
+def test_store_rebuilds_when_version_changes(sqlite_session, stub_api):
+    """Um segundo worker enxerga a carga feita por outro assim que o TTL da versão expira."""
+    clock = FakeClock()
+    worker_a, worker_b = CatalogStore(version_ttl=5, clock=clock), CatalogStore(version_ttl=5, clock=clock)
+    run_etl(sqlite_session)
+    first = worker_b.current(sqlite_session)
+    assert len(first) == 4
+
+    stub_api.products = stub_api.products[:2]
+    run = run_etl(sqlite_session)
+    worker_a.refresh(sqlite_session)
+
+    assert worker_b.current(sqlite_session) is first  # ainda dentro do TTL
+    clock.now = 6
+    second = worker_b.current(sqlite_session)
+    assert second is not first
+    assert (second.version, len(second)) == (run["run_id"], 2)
+    assert worker_b.current(sqlite_session) is second
+
+
+def test_async_reads_never_build_on_the_event_loop(sqlite_engine, sqlite_session, stub_api):
+    """Sem snapshot válido a leitura assíncrona vai ao banco; a reconstrução roda numa thread com sessão própria."""
+    run = run_etl(sqlite_session)
+    store = CatalogStore(session_factory=lambda: Session(bind=sqlite_engine))
+
+    async def current():
+        engine = db.create_async_db_engine(db.to_async_url(sqlite_engine.url))
+        try:
+            async with db.AsyncSessionLocal(bind=engine) as session:
+                return await asyncio.wait_for(store.current_async(session), timeout=5)
+        finally:
+            await engine.dispose()
+
+    # Com o lock de reconstrução ocupado por outra thread, o event loop não espera por ele
+    with store._build_lock:
+        assert asyncio.run(current()) is None
+        rebuild = store._rebuild
+        assert rebuild.is_alive()
+    rebuild.join(timeout=5)
+
+    snapshot = asyncio.run(current())
+    assert (snapshot.version, len(snapshot)) == (run["run_id"], 4)
+
+
+def test_store_memory_limit_falls_back_to_database(sqlite_client, sqlite_session, catalog_rows):
+    """Sem caber no limite, o snapshot é descartado e a listagem segue pelo banco."""
+    from app.main import app
+    from app.services.catalog import get_catalog_store
+
+    app.dependency_overrides[get_catalog_store] = lambda: CatalogStore(max_bytes=1024)
+
+    response = sqlite_client.get("/api/products", params={"category": "jewelery"})
+
+    assert response.status_code == 200
+    assert "X-Catalog-Version" not in response.headers
+    assert len(response.json()) == 20
+
+
+def test_etl_job_publishes_snapshot(sqlite_client, stub_api):
+    """Ao fim do ETL o snapshot novo já está publicado e a listagem informa a versão."""
+    job = sqlite_client.post("/api/products", params={"wait": True}).json()
+
+    response = sqlite_client.get("/api/products", params={"limit": 2})
+
+    assert response.headers["X-Catalog-Version"] == str(job["result"]["run_id"])
+    assert response.headers["X-Next-Cursor"] == "2"
+    assert [product["id"] for product in response.json()] == [1, 2]
@@ -0,0 +1,66 @@
+from decimal import Decimal
+from sqlalchemy import func, select
+
+from app.database.crud_category_summary import get_category_summaries, rebuild_category_summaries
+from app.database.crud_products import insert_products, remove_missing_products
+from app.database.model_product import Product
+
+
+def summaries(session):
+    return {
+        s.category: (s.product_count, s.price_sum, s.price_min, s.price_max)
+        for s in get_category_summaries(session)
+    }
+
+
+def aggregated(session):
+    """Resultado esperado, calculado direto na tabela de produtos."""
+    rows = session.execute(
+        select(Product.category, func.count(), func.sum(Product.price), func.min(Product.price), func.max(Product.price))
+        .group_by(Product.category)
+    )
+    return {category: (count, Decimal(total), min_, max_) for category, count, total, min_, max_ in rows}
+
+
+def test_summaries_follow_inserts_changes_and_removals(sqlite_session, make_row):
+    """Os resumos mantidos durante a carga batem com uma agregação completa."""
+    insert_products(sqlite_session, [
+        make_row(1, 10, "a"), make_row(2, 20, "a"),
+        make_row(3, 30, "b"), make_row(4, 40, "b"),
+    ])
+    assert summaries(sqlite_session) == aggregated(sqlite_session)
+    assert summaries(sqlite_session)["a"] == (2, Decimal("30.00"), Decimal("10.00"), Decimal("20.00"))
+
+    # Alteração de preço que não toca mínimo/máximo, nova categoria e troca de categoria
+    insert_products(sqlite_session, [
+        make_row(2, 15, "a"), make_row(5, 50, "c"), make_row(3, 35, "a"),
+    ])
+    assert summaries(sqlite_session) == aggregated(sqlite_session)
+
+    # Remove o mínimo da categoria "a" e esvazia a categoria "c"
+    remove_missing_products(sqlite_session, [2, 3, 4])
+    assert summaries(sqlite_session) == aggregated(sqlite_session)
+    assert "c" not in summaries(sqlite_session)
+
+
+def test_rebuild_category_summaries(sqlite_session):
+    sqlite_session.add_all([Product(id=i, name="p", category="x", price=i) for i in range(1, 4)])
+    sqlite_session.commit()
+
+    rebuild_category_summaries(sqlite_session)
+
+    assert summaries(sqlite_session) == {"x": (3, Decimal("6.00"), Decimal("1.00"), Decimal("3.00"))}
+
+
+def test_stats_endpoint(sqlite_client, sqlite_session, make_row):
+    insert_products(sqlite_session, [
+        make_row(1, 10, "a"), make_row(2, 30, "a"), make_row(3, 5, "b"),
+    ])
+
+    response = sqlite_client.get("/api/stats")
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"category": "a", "count": 2, "mean": 20.0, "min": 10.0, "max": 30.0, "sum": 40.0},
+        {"category": "b", "count": 1, "mean": 5.0, "min": 5.0, "max": 5.0, "sum": 5.0},
+    ]
@@ -0,0 +1,82 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+
+from app.database.crud_products import insert_products, get_products, remove_missing_products
+
+
+def make_product(product_id, price=10.0, title=None):
+    return {
+        "id": product_id,
+        "name": title or f"Produto {product_id}",
+        "category": "electronics",
+        "price": price,
+        "description": "descrição",
+        "image_url": f"https://example.com/{product_id}.jpg",
+        "timestamp": "2025-01-01T00:00:00",
+    }
+
+
+def test_insert_products_counts_inserted(sqlite_session):
+    """Testa a inserção em lotes de produtos novos."""
+    result = insert_products(sqlite_session, [make_product(i) for i in range(1, 8)], chunk_size=3)
+
+    assert result.as_dict() == {"added": 7, "changed": 0, "unchanged": 0, "removed": 0}
+    assert len(get_products(sqlite_session)) == 7
+
+
+def test_insert_products_upserts_changed_rows(sqlite_session):
+    """Testa que apenas as linhas alteradas são atualizadas em uma nova carga."""
+    insert_products(sqlite_session, [make_product(i) for i in range(1, 5)])
+
+    products = [make_product(1, price=99.9), make_product(2, title="Novo nome"), make_product(3), make_product(5)]
+    result = insert_products(sqlite_session, products, chunk_size=2)
+
+    assert result.as_dict() == {"added": 1, "changed": 2, "unchanged": 1, "removed": 0}
+    by_id = {p.id: p for p in get_products(sqlite_session)}
+    assert by_id[1].price == Decimal("99.90")
+    assert by_id[2].name == "Novo nome"
+    assert len(by_id) == 5
+
+
+def test_insert_products_rejects_invalid_chunk_size(sqlite_session):
+    with pytest.raises(ValueError):
+        insert_products(sqlite_session, [make_product(1)], chunk_size=0)
+
+
+def test_insert_products_skips_write_when_nothing_changed(sqlite_session):
+    """Uma recarga idêntica não deve emitir nenhum INSERT/UPDATE."""
+    products = [make_product(i) for i in range(1, 4)]
+    insert_products(sqlite_session, products)
+
+    statements = []
+    engine = sqlite_session.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = insert_products(sqlite_session, products)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert result.unchanged == 3
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+
+def test_insert_products_stores_content_hash(sqlite_session):
+    insert_products(sqlite_session, [make_product(1)])
+    first_hash = get_products(sqlite_session)[0].content_hash
+
+    insert_products(sqlite_session, [make_product(1, price=11.0)])
+    sqlite_session.expire_all()
+
+    assert len(first_hash) == 64
+    assert get_products(sqlite_session)[0].content_hash != first_hash
+
+
+def test_remove_missing_products(sqlite_session):
+    insert_products(sqlite_session, [make_product(i) for i in range(1, 6)])
+
+    removed = remove_missing_products(sqlite_session, [1, 3, 5])
+
+    assert removed == 2
+    assert sorted(p.id for p in get_products(sqlite_session)) == [1, 3, 5]
@@ -0,0 +1,91 @@
+import pytest
+from decimal import Decimal
+
+from app.database.crud_etl_runs import get_last_etl_run
+from app.database.crud_products import TooManyRemovals
+from app.database.model_product import Product
+from app.services.etl_pipeline import run_etl
+
+
+def test_run_etl_reports_diff_and_records_run(sqlite_session, stub_api, make_product):
+    """A segunda execução só grava o que mudou e registra o diff em etl_runs."""
+    first = run_etl(sqlite_session)
+    assert (first["added"], first["changed"], first["unchanged"], first["removed"]) == (4, 0, 0, 0)
+
+    stub_api.products = [make_product(1, price=99.0), make_product(2), make_product(3), make_product(5)]
+    second = run_etl(sqlite_session)
+
+    assert (second["added"], second["changed"], second["unchanged"], second["removed"]) == (1, 1, 2, 1)
+    run = get_last_etl_run(sqlite_session)
+    assert run.id == second["run_id"]
+    assert run.status == "success"
+    assert (run.extracted, run.added, run.changed, run.unchanged, run.removed) == (4, 1, 1, 2, 1)
+    assert run.finished_at >= run.started_at
+
+
+def test_run_etl_keeps_products_whose_update_was_rejected(sqlite_session, stub_api, make_product):
+    """Um produto que volta com preço inválido é rejeitado, mas não some do banco."""
+    run_etl(sqlite_session)
+
+    stub_api.products = [make_product(1, price=-5.0), make_product(2), make_product(3), make_product(4)]
+    result = run_etl(sqlite_session)
+
+    assert (result["rejected"], result["removed"], result["unchanged"]) == (1, 0, 3)
+    assert sqlite_session.get(Product, 1).price == Decimal("10.00")
+
+
+def test_run_etl_empty_extraction_keeps_catalog(sqlite_session, stub_api):
+    """Uma extração vazia não apaga o catálogo."""
+    run_etl(sqlite_session)
+
+    stub_api.products = []
+    result = run_etl(sqlite_session)
+
+    assert result["removed"] == 0
+    assert sqlite_session.query(Product).count() == 4
+
+
+def test_run_etl_fails_instead_of_removing_most_of_catalog(sqlite_session, stub_api, make_product):
+    """Uma extração que removeria mais que o limite falha a execução sem remover nada."""
+    run_etl(sqlite_session)
+
+    stub_api.products = [make_product(1)]
+    with pytest.raises(TooManyRemovals):
+        run_etl(sqlite_session, max_removed_ratio=0.5)
+
+    assert sqlite_session.query(Product).count() == 4
+    run = get_last_etl_run(sqlite_session, status=None)
+    assert run.status == "failed"
+    assert "3 de 4" in run.error
+    assert run_etl(sqlite_session, max_removed_ratio=1)["removed"] == 3
+
+
+def test_run_etl_records_failure(sqlite_session, stub_api):
+    def broken():
+        raise RuntimeError("API fora do ar")
+
+    stub_api.fetch_products = broken
+
+    with pytest.raises(RuntimeError):
+        run_etl(sqlite_session)
+
+    run = get_last_etl_run(sqlite_session, status=None)
+    assert run.status == "failed"
+    assert "API fora do ar" in run.error
+
+
+def test_run_etl_streams_http_payload_in_batches(sqlite_session, monkeypatch):
+    """Com `stream_extract`, os lotes saem da resposta ainda em leitura, mesmo com conexões cortadas."""
+    from app.adapters import fakestore
+    from app.adapters.fakestore import FakeStoreAPI
+    from benchmarks.fakestore_stub import Faults, FakeStoreStub
+
+    with FakeStoreStub(products=2300, faults=Faults(truncate_rate=0.3)) as stub:
+        api = FakeStoreAPI(base_url=stub.url, max_retries=20, chunk_size=4096, sleep=lambda seconds: None)
+        monkeypatch.setattr(fakestore, "_default_api", api)
+        result = run_etl(sqlite_session, batch_size=500, stream_extract=True)
+        api.close()
+
+    assert result["added"] == 2300
+    assert result["pipeline"]["extract"]["items"] == 5
+    assert result["duplicates"] == 0
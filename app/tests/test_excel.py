@@ -5,8 +5,9 @@ from openpyxl import load_workbook
 from unittest.mock import MagicMock
 import factory
 
-from app.reports.excel_generator import generate_report
+from app.reports.excel_generator import generate_report, generate_report_streaming
 from app.database.model_product import Product
+from app.database.model_category_summary import CategorySummary
 
 
 class ProductFactory(factory.Factory):
@@ -60,16 +61,15 @@ def test_excel_has_correct_columns(excel_file):
     """
     Garante que o arquivo Excel contém todas as colunas obrigatórias.
 
-    Valida se as colunas ['id', 'name', 'category', 'price'] estão na planilha "Produtos".
+    Valida as colunas da planilha "Produtos", na ordem fixa do relatório.
     """
     wb = load_workbook(excel_file)
     ws = wb["Produtos"]
 
-    expected_columns = ["id", "name", "category", "price"]
+    expected_columns = ["id", "name", "category", "price", "description", "image_url", "timestamp"]
     actual_columns = [cell.value for cell in ws[1]]  # Primeira linha contém os cabeçalhos
 
-    assert set(expected_columns) == set(
-        actual_columns), f"Colunas esperadas: {expected_columns}, encontradas: {actual_columns}"
+    assert expected_columns == actual_columns, f"Colunas esperadas: {expected_columns}, encontradas: {actual_columns}"
 
 
 def test_price_column_formatting(excel_file):
@@ -123,3 +123,87 @@ def test_chart_exists(excel_file):
     ws = wb["Estatísticas"]
 
     assert len(ws._charts) > 0, "Erro: Nenhum gráfico encontrado na aba 'Estatísticas'!"
+
+
+@pytest.fixture
+def streaming_excel_file(tmp_path, sqlite_session):
+    """Gera o relatório em modo streaming a partir de um banco SQLite populado."""
+    sqlite_session.add_all([
+        Product(id=i, name=f"Produto {i}", category=["Eletrônicos", "Móveis"][i % 2], price=i * 20)
+        for i in range(1, 11)
+    ])
+    sqlite_session.commit()
+
+    file_path = tmp_path / "test_products_report_streaming.xlsx"
+    generate_report_streaming(sqlite_session, str(file_path), chunk_size=3)
+    return file_path
+
+
+def test_streaming_report_rows_and_columns(streaming_excel_file):
+    """O relatório em streaming contém todas as linhas, na ordem dos ids."""
+    wb = load_workbook(streaming_excel_file)
+    ws = wb["Produtos"]
+
+    header = [cell.value for cell in ws[1]]
+    assert header[:4] == ["id", "name", "category", "price"]
+    ids = [row[0] for row in ws.iter_rows(min_row=2, values_only=True)]
+    assert ids == list(range(1, 11))
+    assert ws.column_dimensions["B"].width == len("Produto 10") + 2
+
+
+def test_streaming_report_conditional_formatting(streaming_excel_file):
+    """As cores de preço são regras de formatação condicional na coluna 'price'."""
+    wb = load_workbook(streaming_excel_file)
+    ws = wb["Produtos"]
+
+    rules = {
+        rule.operator: rule.dxf.fill.fgColor.rgb
+        for cf in ws.conditional_formatting
+        if str(cf.sqref) == "D2:D11"
+        for rule in cf.rules
+    }
+    assert rules["greaterThan"].endswith("FF0000")
+    assert rules["lessThanOrEqual"].endswith("00FF00")
+
+
+def test_streaming_report_statistics(streaming_excel_file):
+    """As estatísticas por categoria são acumuladas durante a leitura."""
+    wb = load_workbook(streaming_excel_file)
+    ws = wb["Estatísticas"]
+
+    stats = {row[0]: row[1:] for row in ws.iter_rows(min_row=2, values_only=True)}
+    assert stats["Eletrônicos"] == (120.0, 200.0, 40.0)
+    assert stats["Móveis"] == (100.0, 180.0, 20.0)
+    assert len(ws._charts) > 0
+
+
+def test_statistics_sheet_reads_category_summaries(tmp_path, sqlite_session):
+    """Com a tabela de resumos preenchida, a aba de estatísticas usa os valores dela."""
+    sqlite_session.add_all([Product(id=i, name=f"Produto {i}", category="Roupas", price=i * 10) for i in range(1, 4)])
+    sqlite_session.add(CategorySummary(category="Roupas", product_count=3, price_sum=60, price_min=10, price_max=30))
+    sqlite_session.commit()
+
+    file_path = tmp_path / "report.xlsx"
+    generate_report(sqlite_session, str(file_path))
+
+    ws = load_workbook(file_path)["Estatísticas"]
+    assert list(ws.iter_rows(min_row=2, values_only=True)) == [("Roupas", 20.0, 30.0, 10.0)]
+
+
+@pytest.mark.parametrize("generator", [generate_report, generate_report_streaming])
+def test_report_header_and_price_colors_from_database(tmp_path, sqlite_session, make_row, generator):
+    """Produtos vindos do banco: sem `content_hash` no cabeçalho e a cor aplicada na coluna 'price'."""
+    from app.database.crud_products import insert_products
+
+    insert_products(sqlite_session, [make_row(1, price=50.0), make_row(2, price=150.0)])
+    file_path = tmp_path / "report.xlsx"
+    generator(sqlite_session, str(file_path))
+
+    ws = load_workbook(file_path)["Produtos"]
+    header = [cell.value for cell in ws[1]]
+    assert header == ["id", "name", "category", "price", "description", "image_url", "timestamp"]
+    if generator is generate_report:
+        colors = {cell.value: cell.fill.start_color.index for (cell,) in ws.iter_rows(min_row=2, min_col=4, max_col=4)}
+        assert colors == {50.0: "0000FF00", 150.0: "00FF0000"}
+    else:
+        assert {str(cf.sqref) for cf in ws.conditional_formatting} == {"D2:D3"}
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from app.api import routes
+from app.database.crud_products import insert_products
+
+
+@pytest.fixture
+def seeded(sqlite_session, make_row, monkeypatch):
+    """12 produtos, exportados em lotes de 5 para cobrir vários lotes e um lote parcial."""
+    insert_products(sqlite_session, [make_row(i, price=i * 1.5) for i in range(1, 13)])
+    monkeypatch.setattr(routes, "EXPORT_CHUNK_SIZE", 5)
+
+
+def test_export_csv(sqlite_client, seeded):
+    """CSV com cabeçalho e uma linha por produto, em ordem de id."""
+    response = sqlite_client.get("/api/report", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="products_report.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(r["id"]) for r in rows] == list(range(1, 13))
+    assert rows[1]["price"] == "3.00"
+    assert "content_hash" not in rows[0]
+
+
+def test_export_ndjson(sqlite_client, seeded):
+    response = sqlite_client.get("/api/report", params={"format": "ndjson"})
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == list(range(1, 13))
+    assert rows[2]["price"] == 4.5
+    assert rows[0]["timestamp"] == "2025-01-01T00:00:00"
+
+
+def test_export_parquet_row_groups(sqlite_client, seeded):
+    """Cada lote do cursor vira um row group do Parquet."""
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    response = sqlite_client.get("/api/report", params={"format": "parquet"})
+
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("id").to_pylist() == list(range(1, 13))
+    assert table.column("price").to_pylist()[1] == Decimal("3.00")
+
+
+def test_export_parquet_without_pyarrow(sqlite_client, seeded, monkeypatch):
+    monkeypatch.setattr(routes, "parquet_available", lambda: False)
+
+    response = sqlite_client.get("/api/report", params={"format": "parquet"})
+
+    assert response.status_code == 501
+
+
+def test_export_conditional_request(sqlite_client, seeded):
+    """As exportações usam o mesmo ETag por versão dos dados que o Excel."""
+    etag = sqlite_client.get("/api/report", params={"format": "csv"}).headers["etag"]
+
+    response = sqlite_client.get("/api/report", params={"format": "csv"}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
@@ -1,10 +1,259 @@
+import json
+import threading
+import time
+import httpx
 import pytest
-from app.adapters.fakestore import FakeStoreAPI
+from app.adapters import fakestore
+from app.adapters.fakestore import FakeStoreAPI, FakeStoreAPIError, RateLimiter, iter_json_array
 
 
 def test_fetch_products():
-    products = FakeStoreAPI.fetch_products()
+    products = FakeStoreAPI().fetch_products()
     assert isinstance(products, list)
     assert len(products) > 0
     assert "title" in products[0]
     assert "price" in products[0]
+
+
+PRODUCTS = [{"id": 1, "title": "Mochila", "price": 109.95}, {"id": 2, "title": "Camiseta", "price": 22.3}]
+
+
+def make_api(handler, **kwargs):
+    """Cria o adapter com um transporte simulado, sem acesso à rede."""
+    return FakeStoreAPI(transport=httpx.MockTransport(handler), sleep=lambda seconds: None, **kwargs)
+
+
+def test_fetch_products_offline():
+    api = make_api(lambda request: httpx.Response(200, json=PRODUCTS))
+
+    products = api.fetch_products()
+
+    assert [p["id"] for p in products] == [1, 2]
+    assert "products" in api.timings
+
+
+def test_retries_with_backoff_on_server_errors():
+    """Responde 503 duas vezes e depois 200: o adapter deve tentar de novo."""
+    calls = []
+    delays = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json=PRODUCTS)
+
+    api = FakeStoreAPI(transport=httpx.MockTransport(handler), backoff_factor=0.1, sleep=delays.append)
+
+    assert api.fetch("products") == PRODUCTS
+    assert len(calls) == 3
+    assert delays == [0.1, 0.2]
+
+
+def test_honors_retry_after_on_429():
+    delays = []
+    responses = iter([httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200, json=[])])
+    api = FakeStoreAPI(transport=httpx.MockTransport(lambda request: next(responses)), sleep=delays.append)
+
+    api.fetch("products")
+
+    assert delays == [2.0]
+
+
+def test_raises_on_client_error_without_retry():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    api = make_api(handler)
+
+    with pytest.raises(FakeStoreAPIError) as error:
+        api.fetch("products")
+    assert error.value.status_code == 404
+    assert len(calls) == 1
+
+
+def test_conditional_request_reuses_cached_body():
+    """Na segunda busca envia If-None-Match e reaproveita o corpo em caso de 304."""
+    def handler(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=PRODUCTS, headers={"ETag": '"v1"'})
+
+    api = make_api(handler)
+
+    assert api.fetch("products") == PRODUCTS
+    assert api.fetch("products") == PRODUCTS
+
+
+def test_conditional_cache_is_capped_by_size():
+    """Corpos acima de `cache_max_bytes` não ficam em memória nem geram requisições condicionais."""
+    conditional = []
+
+    def handler(request):
+        conditional.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=PRODUCTS if request.url.path == "/products" else [], headers={"ETag": '"v1"'})
+
+    api = make_api(handler, cache_max_bytes=16)
+
+    assert api.fetch("products") == PRODUCTS
+    assert api.fetch("products") == PRODUCTS
+    assert conditional == [None, None]
+    assert api.fetch("carts") == []
+    assert api.fetch("carts") == []
+    assert conditional[2:] == [None, '"v1"']
+    assert list(api._validators) == ["/carts"]
+
+
+def test_fetch_many_endpoints_concurrently():
+    payloads = {
+        "/products": PRODUCTS,
+        "/products/categories": ["electronics"],
+        "/carts": [{"id": 1}],
+        "/users": [{"id": 7}],
+    }
+    api = make_api(lambda request: httpx.Response(200, json=payloads[request.url.path]))
+
+    results = api.fetch_many()
+
+    assert results == {
+        "products": PRODUCTS, "categories": ["electronics"], "carts": [{"id": 1}], "users": [{"id": 7}]
+    }
+    assert set(api.timings) == {"products", "categories", "carts", "users"}
+
+
+def test_product_details_respect_concurrency_limit():
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def handler(request):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return httpx.Response(200, json={"id": int(request.url.path.rsplit("/", 1)[1])})
+
+    api = make_api(handler, max_concurrency=3)
+
+    details = api.fetch_product_details(range(1, 13))
+
+    assert [d["id"] for d in details] == list(range(1, 13))
+    assert max_in_flight <= 3
+
+
+def test_rate_limiter_waits_for_tokens():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, burst=1, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.acquire()
+
+    assert waits == [0.5, 0.5]
+
+
+def test_retries_truncated_json_body():
+    """Um corpo JSON incompleto é tratado como falha temporária."""
+    responses = [httpx.Response(200, content=b'[{"id": 1, "ti'), httpx.Response(200, json=PRODUCTS)]
+    api = make_api(lambda request: responses.pop(0))
+
+    assert api.fetch_products() == PRODUCTS
+    assert api.retries == 1
+
+
+def test_paginates_until_short_page_without_total():
+    catalog = [{"id": i} for i in range(1, 8)]
+    paths = []
+
+    def handler(request):
+        paths.append(str(request.url.params))
+        offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+        return httpx.Response(200, json=catalog[offset:offset + limit])
+
+    api = make_api(handler, page_size=3)
+
+    assert api.fetch_products() == catalog
+    assert paths == ["limit=3&offset=0", "limit=3&offset=3", "limit=3&offset=6"]
+
+
+def test_pages_short_of_announced_total_raise():
+    """Páginas que somam menos que `X-Total-Count` indicam extração incompleta."""
+    catalog = [{"id": i} for i in range(1, 6)]
+
+    def handler(request):
+        offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+        return httpx.Response(200, json=catalog[offset:offset + limit], headers={"X-Total-Count": "9"})
+
+    api = make_api(handler, page_size=3)
+
+    with pytest.raises(FakeStoreAPIError, match="5 de 9"):
+        api.fetch_products()
+
+
+def test_stub_server_pages_in_parallel_through_injected_faults():
+    """Contra o stub local, com 429/5xx, corpos cortados e slow drip, as páginas chegam completas e em ordem."""
+    from benchmarks.fakestore_stub import Faults, FakeStoreStub
+
+    faults = Faults(latency_ms=2, jitter_ms=2, error_rate=0.2, truncate_rate=0.2, drip_rate=0.2,
+                    drip_chunk=512, drip_delay_ms=1)
+    with FakeStoreStub(products=2500, faults=faults) as stub:
+        api = FakeStoreAPI(base_url=stub.url, page_size=200, max_concurrency=4, max_retries=20,
+                           sleep=lambda seconds: None)
+        products = api.fetch_products()
+        api.close()
+
+    assert [product["id"] for product in products] == list(range(1, 2501))
+    assert products[1234] == stub.page(1234, 1)[0]
+    assert api.retries == sum(count for outcome, count in stub.stats.items() if outcome.startswith(("error", "truncated")))
+
+
+def test_base_url_and_page_size_from_environment(monkeypatch):
+    monkeypatch.setattr(fakestore, "_default_api", None)
+    monkeypatch.setenv("FAKESTORE_BASE_URL", "http://127.0.0.1:8001")
+    monkeypatch.setenv("FAKESTORE_PAGE_SIZE", "500")
+
+    api = fakestore.get_fakestore_api()
+
+    assert str(api.client.base_url) == "http://127.0.0.1:8001"
+    assert api.page_size == 500
+    api.close()
+
+
+def test_iter_json_array_handles_any_chunk_boundary():
+    data = [{"id": 1, "title": "Jaqueta de algodão", "price": 2.5e3}, -12.75, [], "ação", None, True]
+    raw = json.dumps(data, ensure_ascii=False).encode()
+
+    for size in (1, 2, 3, 7, len(raw)):
+        assert list(iter_json_array(raw[i:i + size] for i in range(0, len(raw), size))) == data
+
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[{"id": 1}, {"id"']))
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"id": 1}']))
+
+
+def test_iter_products_resumes_stream_after_dropped_connection():
+    """Ao reconectar no meio do array, os produtos já entregues não se repetem."""
+    from benchmarks.fakestore_stub import Faults, FakeStoreStub
+
+    with FakeStoreStub(products=1500, faults=Faults(truncate_rate=0.5)) as stub:
+        api = FakeStoreAPI(base_url=stub.url, max_retries=20, chunk_size=1024, sleep=lambda seconds: None)
+        batches = list(api.iter_products(batch_size=400))
+        api.close()
+
+    assert [len(batch) for batch in batches] == [400, 400, 400, 300]
+    assert [product["id"] for batch in batches for product in batch] == list(range(1, 1501))
+    assert api.retries == stub.stats["truncated"]
+    assert "products" in api.timings
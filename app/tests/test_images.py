@@ -0,0 +1,230 @@
+import hashlib
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from openpyxl import load_workbook
+
+from app.database.crud_products import insert_products
+from app.main import app
+from app.reports.excel_generator import generate_report_streaming
+from app.services.etl_pipeline import run_etl
+from app.services.images import ImagePrefetcher, ImageStore, get_image_store, thumbnails_available
+
+
+def _png(color, size=(200, 120)) -> bytes:
+    if not thumbnails_available():
+        # Sem Pillow o conteúdo só precisa ser distinto por cor
+        return f"fake-png-{color}".encode() * 64
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ImageServer:
+    """Servidor HTTP local com imagens fixas, ETag e contagem de requisições."""
+
+    def __init__(self, images: dict[str, bytes]):
+        self.images = images
+        self.requests: list[tuple[str, str | None]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                body = server.images.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+
+@pytest.fixture
+def image_server():
+    server = ImageServer({"/red.png": _png("red"), "/red-copy.png": _png("red"), "/blue.png": _png("blue")})
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def image_store(tmp_path):
+    return ImageStore(directory=str(tmp_path / "images"))
+
+
+def test_prefetch_dedupes_urls_and_content(image_server, image_store):
+    """URLs repetidas são buscadas uma vez; conteúdos iguais ocupam um único arquivo."""
+    urls = [image_server.url(path) for path in ("/red.png", "/red-copy.png", "/red.png", "/blue.png")]
+
+    with ImagePrefetcher(image_store, max_concurrency=4) as prefetcher:
+        assert prefetcher.prefetch(urls + [None, ""]) == 3
+        assert prefetcher.prefetch(urls) == 0  # já vistas nesta execução
+        result = prefetcher.finish()
+
+    assert len(image_server.requests) == 3
+    assert result.downloaded + result.deduplicated == 3
+    assert result.deduplicated == 1
+    assert len(list(image_store.blobs.iterdir())) == 2
+    assert image_store.entry(urls[0])["sha256"] == image_store.entry(urls[1])["sha256"]
+
+
+def test_prefetch_skips_unchanged_images_with_conditional_requests(image_server, image_store):
+    urls = [image_server.url("/red.png"), image_server.url("/blue.png")]
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch(urls)
+        prefetcher.finish()
+
+    image_server.requests.clear()
+    # Nova execução com um store recarregado do disco, como em outro processo
+    reloaded = ImageStore(directory=str(image_store.directory))
+    with ImagePrefetcher(reloaded) as prefetcher:
+        prefetcher.prefetch(urls)
+        result = prefetcher.finish()
+
+    assert result.not_modified == 2
+    assert result.downloaded == 0
+    assert all(etag is not None for _, etag in image_server.requests)
+
+
+def test_prefetch_counts_failures_without_raising(image_server, image_store):
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch([image_server.url("/missing.png"), "http://127.0.0.1:1/unreachable.png"])
+        result = prefetcher.finish()
+
+    assert result.failed == 2
+    assert list(image_store.blobs.glob("*.tmp")) == []
+
+
+def test_prefetch_counts_malformed_urls_as_failures(image_server, image_store):
+    """Uma image_url malformada (`httpx.InvalidURL`) ou de outro protocolo conta como falha, sem levantar."""
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch([image_server.url("/red.png"), "http://[::1/bad.jpg", "ftp://example.com/a.jpg"])
+        result = prefetcher.finish()
+
+    assert (result.downloaded, result.failed) == (1, 2)
+
+
+def test_prefetch_counts_disk_errors_as_failures(image_server, image_store, monkeypatch):
+    """Um erro ao gravar no disco (ex.: disco cheio) conta como falha da imagem, sem derrubar o estágio."""
+    def disk_full(tmp_path, digest):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(image_store, "add", disk_full)
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch([image_server.url("/red.png"), image_server.url("/blue.png")])
+        result = prefetcher.finish()
+
+    assert (result.failed, result.downloaded) == (2, 0)
+    assert list(image_store.blobs.glob("*.tmp")) == []
+
+
+def test_lru_eviction_keeps_images_of_current_run(image_server, tmp_path):
+    red, blue = image_server.url("/red.png"), image_server.url("/blue.png")
+    store = ImageStore(directory=str(tmp_path / "images"), max_bytes=len(_png("red")) + 10)
+
+    with ImagePrefetcher(store) as prefetcher:
+        prefetcher.prefetch([red])
+        prefetcher.finish()
+    with ImagePrefetcher(store) as prefetcher:
+        prefetcher.prefetch([blue])
+        result = prefetcher.finish()
+
+    assert result.evicted == 1
+    assert store.entry(red) is None  # removida: a próxima execução baixa de novo, sem requisição condicional
+    assert store.entry(blue) is not None
+
+
+def test_undecodable_images_count_as_failures(image_server, image_store):
+    pytest.importorskip("PIL")
+    image_server.images["/broken.png"] = _png("red")[:40]
+
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch([image_server.url("/broken.png"), image_server.url("/blue.png")])
+        result = prefetcher.finish()
+
+    assert (result.downloaded, result.failed) == (1, 1)
+
+
+def test_thumbnails_are_generated_once_per_content(image_server, image_store):
+    pytest.importorskip("PIL")
+    from PIL import Image
+
+    urls = [image_server.url("/red.png"), image_server.url("/red-copy.png")]
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch(urls)
+        prefetcher.finish()
+
+    first, second = (image_store.thumbnail_path(url) for url in urls)
+    assert first == second
+    with Image.open(first) as thumbnail:
+        assert max(thumbnail.size) <= max(image_store.thumbnail_size)
+    assert len(list(image_store.thumbs.iterdir())) == 1
+
+
+def test_etl_image_stage(sqlite_session, stub_api, image_server, image_store):
+    """O estágio opcional baixa as imagens dos lotes gravados sem afetar a carga."""
+    for product, path in zip(stub_api.products, ("/red.png", "/red-copy.png", "/blue.png", "/missing.png")):
+        product["image"] = image_server.url(path)
+
+    result = run_etl(sqlite_session, batch_size=2, prefetch_images=True, images=image_store)
+
+    assert result["added"] == 4
+    assert result["images"]["downloaded"] + result["images"]["deduplicated"] == 3
+    assert result["images"]["failed"] == 1
+    assert result["pipeline"]["images"]["items"] == 2
+
+
+def test_etl_without_image_stage(sqlite_session, stub_api):
+    result = run_etl(sqlite_session, prefetch_images=False)
+    assert "images" not in result
+    assert "images" not in result["pipeline"]
+
+
+def test_streaming_report_embeds_thumbnails(sqlite_session, make_row, image_server, image_store, tmp_path):
+    pytest.importorskip("PIL")
+    rows = [make_row(i) for i in range(1, 4)]
+    rows[0]["image_url"] = image_server.url("/red.png")
+    rows[2]["image_url"] = image_server.url("/blue.png")
+    insert_products(sqlite_session, rows)
+    with ImagePrefetcher(image_store) as prefetcher:
+        prefetcher.prefetch(row["image_url"] for row in rows)
+        prefetcher.finish()
+
+    path = tmp_path / "report.xlsx"
+    generate_report_streaming(sqlite_session, str(path), thumbnails=image_store)
+
+    ws = load_workbook(path)["Produtos"]
+    assert ws.cell(row=1, column=ws.max_column).value == "thumbnail"
+    anchors = sorted(image.anchor._from.row for image in ws._images)
+    assert anchors == [1, 3]  # linhas 2 e 4 da planilha (índice a partir de 0)
+
+
+def test_report_thumbnails_only_for_xlsx(sqlite_client, image_store):
+    app.dependency_overrides[get_image_store] = lambda: image_store
+    response = sqlite_client.get("/api/report", params={"format": "csv", "thumbnails": True})
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from app.services.jobs import IntervalScheduler, JobManager
+
+
+def test_concurrent_submits_share_the_running_job():
+    """Disparos simultâneos recebem o mesmo job enquanto ele está em execução."""
+    release = threading.Event()
+    calls = []
+
+    def task(job):
+        calls.append(job.id)
+        job.set_stage("extract")
+        release.wait(5)
+        return {"ok": True}
+
+    jobs = JobManager(task)
+    first, created_first = jobs.submit()
+    second, created_second = jobs.submit()
+    release.set()
+    jobs.wait(first, timeout=5)
+
+    assert created_first and not created_second
+    assert first is second
+    assert len(calls) == 1
+    assert first.status == "succeeded"
+    assert first.result == {"ok": True}
+    assert "extract" in first.stage_seconds
+
+    third, created_third = jobs.submit()
+    jobs.wait(third, timeout=5)
+    assert created_third and third.id != first.id
+
+
+def test_failed_job_records_error():
+    def task(job):
+        raise RuntimeError("falhou")
+
+    jobs = JobManager(task)
+    job, _ = jobs.submit()
+    jobs.wait(job, timeout=5)
+
+    assert job.status == "failed"
+    assert job.error == "falhou"
+    assert jobs.get(job.id) is job
+
+
+def test_interval_scheduler_triggers_callback():
+    ticks = threading.Semaphore(0)
+    scheduler = IntervalScheduler(0.01, ticks.release)
+    scheduler.start()
+    try:
+        assert ticks.acquire(timeout=2)
+        assert ticks.acquire(timeout=2)
+    finally:
+        scheduler.stop(timeout=2)
+
+
+def test_post_products_returns_job_and_status_endpoint(sqlite_client, stub_api):
+    """POST devolve o job imediatamente e GET /api/jobs/{id} acompanha o progresso."""
+    response = sqlite_client.post("/api/products")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.monotonic() + 5
+    while True:
+        job = sqlite_client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["added"] == 4
+    assert set(job["stage_seconds"]) == {"extract", "transform", "load"}
+
+
+def test_post_products_wait(sqlite_client, stub_api):
+    response = sqlite_client.post("/api/products", params={"wait": True})
+
+    assert response.status_code == 200
+    assert "produtos extraídos e salvos" in response.json()["result"]["message"]
+
+
+def test_unknown_job_returns_404(sqlite_client):
+    assert sqlite_client.get("/api/jobs/inexistente").status_code == 404
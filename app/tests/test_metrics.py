@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+
+from app.metrics import (
+    Counter, Histogram, Registry, instrument_engine, DB_POOL_WAIT_SECONDS, REGISTRY,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("latency_seconds", "Latência.", ["route"], buckets=(0.1, 1)))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    text = registry.render()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{route="/a"} 5.55' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_counter_escapes_labels_and_validates_names():
+    counter = Counter("events_total", "Eventos.", ["name"])
+    counter.inc(name='com "aspas"')
+
+    assert 'events_total{name="com \\"aspas\\""} 1' in counter.render()
+    with pytest.raises(ValueError):
+        counter.inc(outro="x")
+
+
+def test_metrics_endpoint_exposes_route_latency_and_etl(sqlite_client, stub_api):
+    """Após requisições e um ETL, /metrics expõe latência por rota e as etapas do ETL."""
+    sqlite_client.post("/api/products", params={"wait": True})
+    sqlite_client.get("/api/products")
+
+    response = sqlite_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/products",status="200"}' in text
+    assert 'etl_stage_duration_seconds_count{stage="transform"}' in text
+    assert 'etl_rows_per_run_count{outcome="added"}' in text
+    assert "# TYPE db_pool_checked_out gauge" in text
+
+
+def _pool_waits(name: str) -> int:
+    prefix = f'db_pool_wait_seconds_count{{engine="{name}"}}'
+    lines = [line for line in DB_POOL_WAIT_SECONDS.collect() if line.startswith(prefix)]
+    return int(lines[0].split()[-1]) if lines else 0
+
+
+def test_instrument_engine_measures_pool_wait(sqlite_engine):
+    """A espera por conexão continua medida depois que `dispose()` recria o pool."""
+    instrument_engine(sqlite_engine, "teste")
+    before = _pool_waits("teste")
+
+    with sqlite_engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+    sqlite_engine.dispose()
+    with sqlite_engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+
+    assert _pool_waits("teste") == before + 2
+
+
+def test_pool_gauges_per_engine(tmp_path):
+    """Cada engine (inclusive o assíncrono) aparece com o próprio label nos gauges do pool."""
+    from sqlalchemy import create_engine
+    from app.database import db
+
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine, async_engine = create_engine(url), db.create_async_db_engine(db.to_async_url(url))
+    instrument_engine(engine, "teste")
+    instrument_engine(async_engine, "teste_async")
+
+    async def read():
+        async with async_engine.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+            checked_out = REGISTRY.render()
+        await async_engine.dispose()
+        return checked_out
+
+    text = asyncio.run(read())
+
+    assert 'db_pool_checked_out{engine="teste_async"} 1' in text
+    assert 'db_pool_checked_out{engine="teste"} 0' in text
+    assert _pool_waits("teste_async") >= 1
+    engine.dispose()
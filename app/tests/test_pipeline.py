@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+
+import pytest
+
+from app.database.crud_etl_runs import get_last_etl_run
+from app.database.crud_products import get_products
+from app.services.etl_pipeline import run_etl
+from app.services.pipeline import Pipeline, Stage
+
+
+def test_pipeline_keeps_source_order_with_parallel_stage():
+    """Um estágio ordenado recebe os itens na ordem da fonte, mesmo depois de um estágio paralelo."""
+    def jitter(item):
+        time.sleep(random.random() / 200)
+        return None if item % 5 == 0 else item * 10
+
+    loaded = []
+    pipeline = Pipeline(range(40), [
+        Stage("transform", jitter, workers=4, queue_size=2),
+        Stage("load", lambda item: loaded.append(item) or item, ordered=True),
+    ])
+
+    outputs = pipeline.run()
+
+    expected = [item * 10 for item in range(40) if item % 5]
+    assert loaded == outputs == expected
+    assert pipeline.stats["source"].items == 40
+    assert pipeline.stats["load"].items == len(expected)
+    assert pipeline.stats["transform"].max_queue_depth <= 2
+
+
+def test_pipeline_backpressure_bounds_items_in_flight():
+    """Com a carga lenta, a fonte não avança mais do que cabe nas filas."""
+    produced, consumed = [], []
+    lock = threading.Lock()
+
+    def source():
+        for item in range(30):
+            with lock:
+                produced.append(item)
+                in_flight = len(produced) - len(consumed)
+            assert in_flight <= 7  # filas (2 + 2) + um item na fonte e em cada estágio
+            yield item
+
+    def slow_load(item):
+        time.sleep(0.002)
+        with lock:
+            consumed.append(item)
+        return item
+
+    Pipeline(source(), [Stage("transform", lambda item: item, queue_size=2), Stage("load", slow_load, queue_size=2)]).run()
+
+    assert consumed == list(range(30))
+
+
+def test_pipeline_failure_cancels_everything():
+    """Um erro em um estágio interrompe a fonte e é relançado por `run`."""
+    produced = []
+
+    def endless():
+        item = 0
+        while True:
+            produced.append(item)
+            yield item
+            item += 1
+
+    def broken(item):
+        if item == 3:
+            raise ValueError("lote inválido")
+        return item
+
+    with pytest.raises(ValueError, match="lote inválido"):
+        Pipeline(endless(), [Stage("transform", broken, queue_size=2), Stage("load", lambda item: item)]).run()
+
+    assert len(produced) < 20
+
+
+def test_run_etl_in_batches(sqlite_session, stub_api, make_product):
+    """Lotes pequenos e transformação paralela dão o mesmo resultado de uma carga única."""
+    stub_api.products = [make_product(i, price=float(i)) for i in range(1, 26)] + [make_product(3, price=99.0)]
+
+    result = run_etl(sqlite_session, batch_size=4, transform_workers=3, queue_size=2)
+
+    assert result["added"] == 25
+    assert result["pipeline"]["extract"]["items"] == 7
+    assert result["pipeline"]["load"]["rows"] == 26
+    prices = {product.id: float(product.price) for product in get_products(sqlite_session)}
+    assert len(prices) == 25
+    assert prices[3] == 99.0  # entre lotes, prevalece a última ocorrência
+
+
+def test_run_etl_failure_during_load_keeps_catalog(sqlite_session, stub_api, make_product, monkeypatch):
+    """Se a carga falha no meio, a execução fica como failed e nada é removido."""
+    from app.services import etl_pipeline
+
+    run_etl(sqlite_session)
+    stub_api.products = [make_product(i) for i in range(10, 20)]
+    original = etl_pipeline.insert_products
+    calls = []
+
+    def flaky_insert(db, products, **kwargs):
+        calls.append(len(products))
+        if len(calls) == 2:
+            raise RuntimeError("banco indisponível")
+        return original(db, products, **kwargs)
+
+    monkeypatch.setattr(etl_pipeline, "insert_products", flaky_insert)
+
+    with pytest.raises(RuntimeError):
+        run_etl(sqlite_session, batch_size=3)
+
+    assert get_last_etl_run(sqlite_session, status=None).status == "failed"
+    ids = {product.id for product in get_products(sqlite_session)}
+    assert {1, 2, 3, 4} <= ids  # remoção não aconteceu
@@ -0,0 +1,56 @@
+from sqlalchemy import select
+
+from app.database.crud_products import insert_products
+from app.database.model_price_history import ProductPriceHistory
+
+
+def history(session):
+    return session.execute(
+        select(ProductPriceHistory.product_id, ProductPriceHistory.price).order_by(ProductPriceHistory.id)
+    ).all()
+
+
+def test_only_price_changes_are_recorded(sqlite_session, make_row):
+    """Produto novo grava o primeiro preço; depois, só mudanças de preço entram no histórico."""
+    insert_products(sqlite_session, [make_row(1, price=10), make_row(2, price=20)])
+    described = {**make_row(1, price=10), "description": "nova descrição"}
+    insert_products(sqlite_session, [described, make_row(2, price=25)])
+    insert_products(sqlite_session, [described, make_row(2, price=25)])
+
+    assert [(product_id, float(price)) for product_id, price in history(sqlite_session)] == [
+        (1, 10.0), (2, 20.0), (2, 25.0)
+    ]
+
+
+def test_price_series_endpoint(sqlite_client, stub_api, make_product):
+    """A série traz a variação calculada no banco e o id de cada execução."""
+    runs = []
+    for price in (10.0, 12.5, 9.0):
+        stub_api.products = [make_product(1, price=price), make_product(2)]
+        runs.append(sqlite_client.post("/api/products", params={"wait": True}).json()["result"]["run_id"])
+
+    series = sqlite_client.get("/api/products/1/price-history").json()
+
+    assert [(point["price"], point["change"], point["etl_run_id"]) for point in series] == [
+        (10.0, None, runs[0]), (12.5, 2.5, runs[1]), (9.0, -3.5, runs[2])
+    ]
+    assert len(sqlite_client.get("/api/products/2/price-history").json()) == 1
+    assert sqlite_client.get("/api/products/99/price-history").status_code == 404
+
+
+def test_price_movers_between_runs(sqlite_client, stub_api, make_product):
+    """Por padrão compara as duas últimas execuções, ordenando pela maior variação percentual."""
+    stub_api.products = [make_product(i, price=100.0) for i in range(1, 5)]
+    first = sqlite_client.post("/api/products", params={"wait": True}).json()["result"]["run_id"]
+    stub_api.products = [
+        make_product(1, price=110.0), make_product(2, price=50.0), make_product(3, price=100.0),
+        make_product(4, price=130.0), make_product(5, price=1.0),
+    ]
+    second = sqlite_client.post("/api/products", params={"wait": True}).json()["result"]["run_id"]
+
+    data = sqlite_client.get("/api/price-movers", params={"limit": 2}).json()
+
+    assert (data["from_run"], data["to_run"]) == (first, second)
+    assert [(m["product_id"], m["change_pct"]) for m in data["movers"]] == [(2, -50.0), (4, 30.0)]
+    assert data["movers"][0]["name"] == "Produto 2"
+    assert sqlite_client.get("/api/price-movers", params={"to_run": 999}).status_code == 404
@@ -0,0 +1,118 @@
+import json
+
+from app.database.crud_products import insert_products
+
+
+def seed(session, count=25):
+    categories = ["electronics", "jewelery"]
+    insert_products(session, [
+        {
+            "id": i,
+            "name": f"Produto {i}",
+            "category": categories[i % 2],
+            "price": i * 10,
+            "description": "descrição",
+            "image_url": f"https://example.com/{i}.jpg",
+            "timestamp": "2025-01-01T00:00:00",
+        }
+        for i in range(1, count + 1)
+    ])
+
+
+def test_list_products_keyset_pagination(sqlite_client, sqlite_session):
+    """Percorre o catálogo página a página usando o cursor retornado."""
+    seed(sqlite_session)
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 10}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = sqlite_client.get("/api/products", params=params)
+        assert response.status_code == 200
+        ids.extend(p["id"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert ids == list(range(1, 26))
+
+
+def test_list_products_filters(sqlite_client, sqlite_session):
+    """Filtra por categoria e faixa de preço no servidor."""
+    seed(sqlite_session)
+
+    response = sqlite_client.get(
+        "/api/products", params={"category": "jewelery", "min_price": 50, "max_price": 150}
+    )
+    data = response.json()
+
+    assert [p["id"] for p in data] == [5, 7, 9, 11, 13, 15]
+    assert all(p["category"] == "jewelery" for p in data)
+
+
+def test_list_products_rejects_inverted_price_range(sqlite_client):
+    response = sqlite_client.get("/api/products", params={"min_price": 100, "max_price": 10})
+    assert response.status_code == 400
+
+
+def test_list_products_ndjson_stream(sqlite_client, sqlite_session):
+    """O modo NDJSON devolve um produto por linha."""
+    seed(sqlite_session)
+
+    response = sqlite_client.get("/api/products", params={"format": "ndjson", "category": "electronics"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == list(range(2, 26, 2))
+    assert rows[0]["price"] == 20.0
+
+
+def test_list_products_ndjson_stream_multiple_chunks(sqlite_client, sqlite_session, monkeypatch):
+    """O stream continua válido além do primeiro lote, mesmo com a dependência fechando a sessão."""
+    from app.api import routes
+
+    seed(sqlite_session)
+    monkeypatch.setattr(routes, "STREAM_CHUNK_SIZE", 4)
+
+    response = sqlite_client.get("/api/products", params={"format": "ndjson"})
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == list(range(1, 26))
+
+
+def test_list_products_sparse_fields(sqlite_client, sqlite_session):
+    """`fields` devolve só as colunas pedidas, inclusive na paginação e no NDJSON."""
+    seed(sqlite_session)
+
+    response = sqlite_client.get("/api/products", params={"fields": "price,name", "limit": 2})
+    stream = sqlite_client.get("/api/products", params={"fields": "id,price", "format": "ndjson"})
+
+    assert response.json() == [{"price": 10.0, "name": "Produto 1"}, {"price": 20.0, "name": "Produto 2"}]
+    assert response.headers["X-Next-Cursor"] == "2"
+    assert json.loads(stream.text.splitlines()[0]) == {"id": 1, "price": 10.0}
+
+
+def test_list_products_full_shape(sqlite_client, sqlite_session):
+    """Sem `fields`, cada produto segue o ProductResponse (sem colunas internas como content_hash)."""
+    seed(sqlite_session, count=1)
+
+    product = sqlite_client.get("/api/products").json()[0]
+
+    assert product == {
+        "id": 1,
+        "name": "Produto 1",
+        "category": "jewelery",
+        "price": 10.0,
+        "description": "descrição",
+        "image_url": "https://example.com/1.jpg",
+        "timestamp": "2025-01-01T00:00:00",
+    }
+
+
+def test_list_products_rejects_unknown_fields(sqlite_client):
+    response = sqlite_client.get("/api/products", params={"fields": "id,content_hash"})
+
+    assert response.status_code == 400
+    assert "content_hash" in response.json()["detail"]
@@ -0,0 +1,151 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import pytest
+from sqlalchemy import select
+
+from app import profiling
+from app.main import app
+from app.database.crud_products import insert_products
+from app.database.model_product import Product
+from app.profiling import RequestTrace, StackSampler
+
+
+TOKEN = "segredo-de-teste"
+PROFILE_HEADERS = {"X-Profile": TOKEN}
+
+
+@pytest.fixture
+def profile_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "mode", "header")
+    monkeypatch.setattr(profiling, "token", TOKEN)
+    directory = tmp_path / "profiles"
+    directory.mkdir()
+    monkeypatch.setattr(profiling, "profile_dir", str(directory))
+    return directory
+
+
+def _summary(response) -> dict:
+    return dict(part.split("=", 1) for part in response.headers["X-Profile"].split("; "))
+
+
+def _profile(profile_dir, response) -> dict:
+    return json.loads((profile_dir / f"{_summary(response)['id']}.json").read_text())
+
+
+def test_disabled_profiler_adds_no_hooks():
+    """Com PROFILING=off nenhuma requisição é perfilada e nenhum listener é registrado no SQLAlchemy."""
+    code = (
+        "from fastapi.testclient import TestClient; from sqlalchemy import event; from sqlalchemy.engine import Engine; "
+        "from app import profiling; from app.main import app; "
+        "response = TestClient(app).get('/metrics', headers={'X-Profile': '1'}); "
+        "print('X-Profile' in response.headers, event.contains(Engine, 'before_cursor_execute', "
+        "profiling._before_cursor_execute))"
+    )
+    env = {**os.environ, "PROFILING": "off", "DATABASE_URL": "sqlite://"}
+
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+    assert completed.stdout.split() == ["False", "False"]
+
+
+def test_trace_flags_n_plus_one_and_duplicates():
+    trace = RequestTrace()
+    for product_id in range(profiling.N_PLUS_ONE_THRESHOLD):
+        trace.record("SELECT * FROM products WHERE id = ?", (product_id,), 0.001)
+    trace.record("SELECT count(*) FROM products", (), 0.002)
+    trace.record("SELECT count(*) FROM products", (), 0.002)
+
+    assert trace.n_plus_one() == ["SELECT * FROM products WHERE id = ?"]
+    assert trace.duplicates() == ["SELECT count(*) FROM products"]
+    assert trace.as_dict()["queries"] == profiling.N_PLUS_ONE_THRESHOLD + 2
+
+
+def test_only_requests_with_header_are_profiled(sqlite_client, profile_dir):
+    assert "X-Profile" not in sqlite_client.get("/api/stats").headers
+    assert list(profile_dir.iterdir()) == []
+
+    response = sqlite_client.get("/api/stats", headers=PROFILE_HEADERS)
+
+    summary = _summary(response)
+    assert int(summary["queries"]) >= 1
+    assert response.headers["Server-Timing"].startswith("sql;dur=")
+    profile = _profile(profile_dir, response)
+    assert profile["route"] == "/api/stats"
+    assert profile["sql"]["queries"] == int(summary["queries"])
+    assert (profile_dir / f"{summary['id']}.folded").exists()
+
+
+def test_header_mode_requires_the_token(sqlite_client, profile_dir, monkeypatch):
+    """O header só liga o profiler com o `PROFILE_TOKEN` certo; sem token configurado, nunca."""
+    assert "X-Profile" not in sqlite_client.get("/api/stats", headers={"X-Profile": "1"}).headers
+
+    monkeypatch.setattr(profiling, "token", "")
+    assert "X-Profile" not in sqlite_client.get("/api/stats", headers={"X-Profile": ""}).headers
+    assert "X-Profile" not in sqlite_client.get("/api/stats", headers=PROFILE_HEADERS).headers
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_profile_dir_keeps_only_the_latest_profiles(sqlite_client, profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "max_profiles", 2)
+
+    ids = []
+    for _ in range(4):
+        ids.append(_summary(sqlite_client.get("/api/stats", headers=PROFILE_HEADERS))["id"])
+        time.sleep(0.01)
+
+    assert sorted(path.name for path in profile_dir.iterdir()) == sorted(
+        f"{profile_id}{suffix}" for profile_id in ids[-2:] for suffix in (".json", ".folded")
+    )
+
+
+def test_profile_detects_n_plus_one_in_request(sqlite_client, sqlite_session, make_row, profile_dir):
+    """Um endpoint que consulta produto a produto aparece como N+1 no perfil."""
+    insert_products(sqlite_session, [make_row(i) for i in range(1, 11)])
+
+    def n_plus_one():
+        ids = sqlite_session.scalars(select(Product.id)).all()
+        return [sqlite_session.execute(select(Product.name).where(Product.id == i)).scalar() for i in ids]
+
+    app.add_api_route("/test/n-plus-one", n_plus_one)
+    try:
+        response = sqlite_client.get("/test/n-plus-one", headers=PROFILE_HEADERS)
+    finally:
+        app.router.routes.pop()
+
+    assert _summary(response)["n_plus_one"] == "1"
+    statements = _profile(profile_dir, response)["sql"]["statements"]
+    assert max(statement["count"] for statement in statements) == 10
+
+
+def test_streaming_export_profile_covers_whole_body(sqlite_client, sqlite_session, make_row, profile_dir):
+    insert_products(sqlite_session, [make_row(i) for i in range(1, 6)])
+
+    response = sqlite_client.get("/api/report", params={"format": "csv"}, headers=PROFILE_HEADERS)
+
+    assert response.status_code == 200
+    statements = [s["sql"] for s in _profile(profile_dir, response)["sql"]["statements"]]
+    assert any("products.description" in statement for statement in statements)
+
+
+def test_etl_trigger_with_wait_traces_pipeline_threads(sqlite_client, stub_api, profile_dir):
+    response = sqlite_client.post("/api/products", params={"wait": True}, headers=PROFILE_HEADERS)
+
+    assert response.json()["status"] == "succeeded"
+    statements = [s["sql"] for s in _profile(profile_dir, response)["sql"]["statements"]]
+    assert any(statement.startswith("INSERT INTO products") for statement in statements)
+
+
+def test_sampler_records_busy_threads():
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert "test_sampler_records_busy_threads" in sampler.folded()
+    assert sampler.top_functions()[0]["cumulative"] > 0
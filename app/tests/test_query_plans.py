@@ -0,0 +1,73 @@
+"""
+Regressão de planos de execução: as consultas das rotas sobre `products`
+não podem voltar a varrer a tabela inteira, no SQLite e no MySQL.
+"""
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from app.database.crud_price_history import _price_series_query
+from app.database.crud_products import _product_rows_query, _product_rows_stream_query, insert_products
+from app.database.model_product import Product
+from app.database.query_plan import explain
+from app.migrate import migrate
+
+
+CATEGORIES = 40
+
+# Consultas das rotas, com os parâmetros típicos de cada acesso
+ROUTE_QUERIES = {
+    "GET /products paginado": lambda: _product_rows_query(None, 50, 1000, None, None, None),
+    "GET /products?category": lambda: _product_rows_query(None, 50, None, "cat-07", None, None),
+    "GET /products?category&min_price&max_price": lambda: _product_rows_query(None, 50, None, "cat-07", 10.0, 200.0),
+    "GET /products?category&fields=id,name,price": lambda: _product_rows_query(
+        ["id", "name", "price"], 50, 100, "cat-07", None, None
+    ),
+    "GET /products?category&format=ndjson": lambda: _product_rows_stream_query(None, 1000, {"category": "cat-07"}),
+    "GET /products/{id}/price-history": lambda: _price_series_query(7),
+    "última extração": lambda: select(func.max(Product.timestamp)),
+}
+
+
+@pytest.fixture(params=["sqlite_session", "session"], ids=["sqlite", "mysql"])
+def plan_session(request, make_row):
+    """Catálogo com muitas categorias e estatísticas atualizadas, para o otimizador escolher como em produção."""
+    db = request.getfixturevalue(request.param)
+    rows = [make_row(i, price=float(i % 500) + 0.5, category=f"cat-{i % CATEGORIES:02d}") for i in range(1, 3001)]
+    insert_products(db, rows)
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text("ANALYZE"))
+    else:
+        db.execute(text("ANALYZE TABLE products, product_price_history"))
+    return db
+
+
+@pytest.mark.parametrize("name", ROUTE_QUERIES)
+def test_route_queries_do_not_scan_tables(plan_session, name):
+    plan = explain(plan_session, ROUTE_QUERIES[name]())
+
+    assert not plan.full_scans, f"{name} voltou a varrer a tabela:\n{plan}"
+
+
+def test_category_page_is_covered_and_sorted_by_index(plan_session):
+    """A página por categoria com campos enxutos sai só do índice, já na ordem de id."""
+    plan = explain(plan_session, ROUTE_QUERIES["GET /products?category&fields=id,name,price"]())
+
+    assert [step.index for step in plan.steps] == ["ix_products_category_list"], str(plan)
+    assert not plan.sorts, str(plan)
+
+
+def test_migrate_adds_indexes_to_existing_table(tmp_path):
+    """Bancos criados antes dos índices os recebem em `python -m app.migrate`."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+            "category VARCHAR(100) NOT NULL, price DECIMAL(10,2) NOT NULL, description TEXT, "
+            "image_url VARCHAR(255), timestamp DATETIME, content_hash VARCHAR(64))"
+        )
+
+    migrate(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("products")}
+    assert {"ix_products_category_price", "ix_products_category_list", "ix_products_timestamp"} <= indexes
+    engine.dispose()
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.database import db
+from app.database.crud_products import insert_products
+from app.database.model_product import Product
+from app.migrate import migrate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _database(path, rows):
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    migrate(engine)
+    with Session(bind=engine) as session:
+        insert_products(session, rows)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch, make_row):
+    """Primário com 3 produtos e réplica com 1, para saber de onde veio cada leitura."""
+    primary = _database(tmp_path / "primary.db", [make_row(i) for i in range(1, 4)])
+    replica = _database(tmp_path / "replica.db", [make_row(1)])
+    monkeypatch.setenv("DATABASE_URL", primary)
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", replica)
+    monkeypatch.delenv("ASYNC_DATABASE_URL", raising=False)
+    db.dispose_engine()
+    yield primary, replica
+    asyncio.run(db.dispose_async_engine())
+    db.dispose_engine()
+
+
+def _count(session) -> int:
+    return session.scalar(select(func.count()).select_from(Product))
+
+
+def test_pool_options_per_engine(monkeypatch):
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "20")
+    monkeypatch.setenv("DATABASE_REPLICA_POOL_SIZE", "5")
+    monkeypatch.setenv("DATABASE_REPLICA_POOL_RECYCLE", "3600")
+
+    assert db.pool_options() == {"pool_size": 20}
+    assert db.pool_options("DATABASE_REPLICA") == {"pool_size": 5, "pool_recycle": 3600}
+
+
+def test_replicas_round_robin_and_fallback(tmp_path):
+    good = [f"sqlite:///{tmp_path / name}" for name in ("a.db", "b.db")]
+    down = f"sqlite:///{tmp_path / 'ausente' / 'c.db'}"
+    clock = FakeClock()
+    replicas = db.ReplicaSet([*good, down], retry_after=30, clock=clock)
+
+    picked = [replicas.engine().url.database for _ in range(6)]
+
+    # A réplica fora do ar é pulada e fica fora até `retry_after` passar
+    assert [p.rsplit("/", 1)[-1] for p in picked] == ["a.db", "b.db", "a.db", "a.db", "b.db", "a.db"]
+    assert replicas._down_until[2] == 30
+
+    only_down = db.ReplicaSet([down], clock=clock)
+    assert only_down.engine() is None
+    replicas.dispose()
+    only_down.dispose()
+
+
+def test_replica_engines_connect_with_timeout():
+    assert db.connect_args("mysql+pymysql://leitor@replica/fakestore_db", 2.0) == {"connect_timeout": 2.0}
+    assert db.connect_args(db.to_async_url("mysql+pymysql://leitor@replica/fakestore_db"), 2.0) == {
+        "connect_timeout": 2.0
+    }
+    assert db.connect_args("sqlite:///replica.db", 2.0) == {}
+    assert db.connect_args("mysql+pymysql://leitor@replica/fakestore_db", None) == {}
+
+
+def test_sync_and_async_checks_drop_replica_on_network_error(tmp_path, monkeypatch):
+    """Um erro de rede não embrulhado pelo driver tira a réplica de rotação nos dois caminhos."""
+
+    class Unreachable:
+        def connect(self):
+            raise ConnectionRefusedError("réplica fora do ar")
+
+    clock = FakeClock()
+    replicas = db.ReplicaSet([f"sqlite:///{tmp_path / 'a.db'}"], clock=clock)
+    monkeypatch.setattr(replicas, "_engine", lambda index: Unreachable())
+    monkeypatch.setattr(replicas, "_async_engine", lambda index: Unreachable())
+
+    assert replicas.engine() is None
+    clock.now = replicas.retry_after
+    assert asyncio.run(replicas.async_engine()) is None
+    assert replicas._down_until[0] == 2 * replicas.retry_after
+
+
+def test_read_your_writes_window_pins_primary(tmp_path):
+    clock = FakeClock()
+    replicas = db.ReplicaSet([f"sqlite:///{tmp_path / 'a.db'}"], read_your_writes=2.0, clock=clock)
+
+    replicas.mark_write()
+    assert replicas.engine() is None
+    clock.now = 2.5
+    assert replicas.engine() is not None
+    replicas.dispose()
+
+
+def test_get_read_db_uses_replica_and_primary_after_etl(databases, monkeypatch):
+    monkeypatch.setenv("READ_YOUR_WRITES_SECONDS", "60")
+
+    with db.new_read_session() as session:
+        from_replica = _count(session)
+    db.mark_primary_write()
+    with db.new_read_session() as session:
+        after_write = _count(session)
+    with db.new_session() as session:
+        from_primary = _count(session)
+
+    assert (from_replica, after_write, from_primary) == (1, 3, 3)
+
+
+def test_async_read_db_falls_back_to_primary(databases, monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", f"sqlite:///{tmp_path / 'ausente' / 'r.db'}")
+
+    async def count():
+        async with await db.new_async_read_session() as session:
+            return await session.scalar(select(func.count()).select_from(Product))
+
+    assert asyncio.run(count()) == 3
@@ -0,0 +1,116 @@
+import os
+import pytest
+from sqlalchemy import event
+
+from app.main import app
+from app.reports.cache import ReportCache, get_report_cache
+from app.database.crud_products import insert_products
+from app.database.crud_etl_runs import finish_etl_run, start_etl_run
+
+
+@pytest.fixture
+def report_cache(tmp_path):
+    cache = ReportCache(directory=str(tmp_path / "reports"))
+    app.dependency_overrides[get_report_cache] = lambda: cache
+    return cache
+
+
+def seed(session, price=50):
+    insert_products(session, [
+        {
+            "id": i,
+            "name": f"Produto {i}",
+            "category": "electronics",
+            "price": price,
+            "description": "descrição",
+            "image_url": f"https://example.com/{i}.jpg",
+            "timestamp": "2025-01-01T00:00:00",
+        }
+        for i in range(1, 6)
+    ])
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Ao passar do limite de bytes, remove primeiro o relatório menos usado."""
+    cache = ReportCache(directory=str(tmp_path), max_bytes=250, suffix=".bin")
+
+    def writer(content):
+        return lambda path: open(path, "wb").write(content)
+
+    first = cache.get_or_create("a", writer(b"x" * 100))
+    second = cache.get_or_create("b", writer(b"y" * 100))
+    os.utime(second, (1, 1))  # "b" passa a ser o menos usado
+    os.utime(first, (2, 2))
+    cache.get_or_create("c", writer(b"z" * 100))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_cache_ignores_empty_build(tmp_path):
+    cache = ReportCache(directory=str(tmp_path))
+    assert cache.get_or_create("vazio", lambda path: None) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_report_etag_and_not_modified(sqlite_client, sqlite_session, report_cache):
+    """Um segundo download com If-None-Match recebe 304 sem gerar o relatório."""
+    seed(sqlite_session)
+
+    response = sqlite_client.get("/api/report")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert len(list(report_cache.directory.glob("*.xlsx"))) == 1
+
+    cached = sqlite_client.get("/api/report", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_report_etag_changes_with_data(sqlite_client, sqlite_session, report_cache):
+    seed(sqlite_session)
+    etag = sqlite_client.get("/api/report").headers["ETag"]
+
+    insert_products(sqlite_session, [{
+        "id": 99, "name": "Novo", "category": "electronics", "price": 10,
+        "description": "", "image_url": "", "timestamp": "2025-02-01T00:00:00",
+    }])
+
+    response = sqlite_client.get("/api/report", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_report_empty_table(sqlite_client, report_cache):
+    assert sqlite_client.get("/api/report").status_code == 404
+
+
+def record_run(session):
+    return finish_etl_run(session, start_etl_run(session), extracted=5, counts={"added": 5})
+
+
+def test_report_version_follows_etl_runs(sqlite_client, sqlite_session, sqlite_engine, report_cache):
+    """Com o histórico do ETL o 304 sai de uma busca em etl_runs, sem varrer a tabela de produtos."""
+    seed(sqlite_session)
+    record_run(sqlite_session)
+    etag = sqlite_client.get("/api/report").headers["ETag"]
+
+    statements = []
+    event.listen(sqlite_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    cached = sqlite_client.get("/api/report", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert statements and not any("products" in statement for statement in statements)
+
+    record_run(sqlite_session)
+    response = sqlite_client.get("/api/report", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_report_empty_after_etl_run(sqlite_client, sqlite_session, report_cache):
+    record_run(sqlite_session)
+    assert sqlite_client.get("/api/report").status_code == 404
+    assert sqlite_client.get("/api/report?format=csv").status_code == 404
@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import mysql
+
+from app.database.crud_products import insert_products
+from app.database.model_product import Product
+from app.database.crud_search import boolean_query
+from app.services import search as search_module
+from app.services.search import ProductSearchIndex, tokenize
+
+
+def _row(product_id, name, description="", category="electronics"):
+    return {
+        "id": product_id,
+        "name": name,
+        "category": category,
+        "price": 10.0,
+        "description": description,
+        "image_url": "",
+        "timestamp": "2025-01-01T00:00:00",
+    }
+
+
+CATALOG = [
+    _row(1, "Camiseta de algodão", "camiseta básica de algodão orgânico"),
+    _row(2, "Jaqueta de couro", "jaqueta preta, forro de algodão", category="men's clothing"),
+    _row(3, "Monitor 27", "monitor com suporte de alumínio"),
+    _row(4, "Anel de prata", "anel simples", category="jewelery"),
+    _row(5, "Camiseta premium", "tecido leve", category="men's clothing"),
+]
+
+
+@pytest.fixture
+def catalog(sqlite_session):
+    insert_products(sqlite_session, CATALOG)
+    return sqlite_session
+
+
+def ids(index, db, query, **kwargs):
+    return [product_id for product_id, _ in index.search(db, query, **kwargs).hits]
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Camiseta BÁSICA, algodão-orgânico!") == ["camiseta", "basica", "algodao", "organico"]
+    assert tokenize(None) == []
+
+
+def test_ranking_prefix_and_filters(catalog):
+    index = ProductSearchIndex()
+
+    # Termo no nome vale mais que na descrição
+    assert ids(index, catalog, "algodão") == [1, 2]
+    # Todos os termos são obrigatórios e o último casa como prefixo
+    assert ids(index, catalog, "camiseta alg") == [1]
+    assert ids(index, catalog, "camis alg") == []  # só o último termo é prefixo
+    assert ids(index, catalog, "cami") == [5, 1]  # BM25 normaliza pelo tamanho: o documento curto vem antes
+    assert ids(index, catalog, "algodao", category="men's clothing") == [2]
+    assert ids(index, catalog, "inexistente") == []
+
+    page = index.search(catalog, "camiseta", limit=1, offset=1)
+    assert page.total == 2
+    assert [product_id for product_id, _ in page.hits] == [1]
+
+
+def test_incremental_refresh_matches_full_rebuild(catalog):
+    index = ProductSearchIndex()
+    index.refresh(catalog, version=1)
+
+    changed = [dict(CATALOG[0], description="camiseta de linho"), _row(6, "Camiseta de linho", "linho puro")]
+    insert_products(catalog, changed)
+    catalog.execute(delete(Product).where(Product.id == 4))
+    catalog.commit()
+
+    state = index.refresh(catalog, version=2)
+    rebuilt = ProductSearchIndex().refresh(catalog, version=2)
+
+    assert len(state.segments) == 2
+    assert int(state.deleted.sum()) == 2  # versão antiga do produto 1 e o produto 4
+    for query in ("linho", "camiseta", "algodao", "anel", "cam"):
+        assert ids(index, catalog, query) == [product_id for product_id, _ in rebuilt.search(
+            tokenize(query), None, 20, 0).hits], query
+
+
+def test_compaction_rebuilds_single_segment(catalog, monkeypatch):
+    monkeypatch.setattr(search_module, "MAX_SEGMENTS", 2)
+    index = ProductSearchIndex()
+    index.refresh(catalog, version=1)
+    for version in (2, 3):
+        insert_products(catalog, [dict(CATALOG[2], description=f"monitor versão {version}")])
+        state = index.refresh(catalog, version=version)
+
+    assert len(state.segments) == 1
+    assert not state.deleted.any()
+    assert ids(index, catalog, "versao 3") == [3]
+
+
+def test_search_endpoint(sqlite_client, catalog):
+    response = sqlite_client.get("/api/products/search", params={"q": "camiseta", "fields": "id,name"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "2"
+    body = response.json()
+    assert [product["id"] for product in body] == [5, 1]
+    assert set(body[0]) == {"id", "name", "score"}
+    assert body[0]["score"] >= body[1]["score"]
+
+    assert sqlite_client.get("/api/products/search").status_code == 422
+    assert sqlite_client.get("/api/products/search", params={"q": "x", "fields": "sku"}).status_code == 400
+
+
+def test_etl_job_refreshes_search_index(sqlite_client, stub_api):
+    sqlite_client.post("/api/products", params={"wait": True})
+
+    response = sqlite_client.get("/api/products/search", params={"q": "produto 3"})
+
+    assert [product["id"] for product in response.json()] == [3]
+
+
+def test_fulltext_query_for_mysql():
+    """No MySQL a busca vira MATCH ... AGAINST em modo booleano com o último termo como prefixo."""
+    assert boolean_query(["camiseta", "alg"]) == "+camiseta +alg*"
+    match = mysql.match(Product.name, Product.description, against=boolean_query(["alg"])).in_boolean_mode()
+    sql = str(select(Product.id).where(match).compile(dialect=mysql.dialect()))
+    assert "MATCH (products.name, products.description) AGAINST (%s IN BOOLEAN MODE)" in sql
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect
+
+from app.migrate import migrate
+
+
+def test_import_is_lazy():
+    """Importar o app não cria engine nem carrega a pilha de relatórios/transformação."""
+    code = (
+        "import json, sys; import app.main; from app.database import db; "
+        "print(json.dumps({'engine': db._engine is not None, "
+        "'heavy': [m for m in ('pandas', 'numpy', 'openpyxl') if m in sys.modules]}))"
+    )
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+    assert json.loads(completed.stdout) == {"engine": False, "heavy": []}
+
+
+def test_migrate_creates_schema(tmp_path):
+    """`python -m app.migrate` cria todas as tabelas e pode ser repetido."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+
+    tables = migrate(engine)
+    migrate(engine)
+
+    assert {"products", "etl_runs", "category_summaries"} <= set(tables)
+    assert set(tables) <= set(inspect(engine).get_table_names())
+    engine.dispose()
+
+
+def test_migrate_upgrades_baseline_products_table(tmp_path, make_row):
+    """Um banco com o schema original ganha `content_hash` e volta a aceitar a carga do ETL."""
+    from sqlalchemy.orm import Session
+    from app.database.crud_products import insert_products
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+            "category VARCHAR(100) NOT NULL, price DECIMAL(10,2) NOT NULL, description TEXT, "
+            "image_url VARCHAR(255), timestamp DATETIME)"
+        )
+        connection.exec_driver_sql("CREATE INDEX ix_products_id ON products (id)")
+        connection.exec_driver_sql(
+            "INSERT INTO products VALUES (1, 'Antigo', 'electronics', 10.00, NULL, NULL, '2024-01-01 00:00:00')"
+        )
+
+    migrate(engine)
+    with Session(bind=engine) as db:
+        result = insert_products(db, [make_row(1, price=12.0), make_row(2)])
+
+    assert "content_hash" in {column["name"] for column in inspect(engine).get_columns("products")}
+    assert (result.added, result.changed) == (1, 1)
+    engine.dispose()
@@ -0,0 +1,103 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from app.services.transform import RejectSink, transform_products
+
+
+EXTRACTED_AT = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def payload(product_id, **overrides):
+    return {
+        "id": product_id,
+        "title": f"Produto {product_id}",
+        "category": "electronics",
+        "price": 10.5,
+        "description": "descrição",
+        "image": "https://example.com/img.jpg",
+        **overrides,
+    }
+
+
+def test_transform_maps_columns_and_stamps_run_timestamp():
+    """Renomeia os campos da API e aplica um único timestamp da execução."""
+    result = transform_products([payload(1, price="19.999"), payload(2)], extracted_at=EXTRACTED_AT)
+
+    records = result.records()
+    assert records[0] == {
+        "id": 1,
+        "name": "Produto 1",
+        "category": "electronics",
+        "price": Decimal("20.00"),
+        "description": "descrição",
+        "image_url": "https://example.com/img.jpg",
+        "timestamp": EXTRACTED_AT,
+    }
+    assert {r["timestamp"] for r in records} == {EXTRACTED_AT}
+
+
+def test_transform_rejects_invalid_rows_with_reasons(tmp_path):
+    """Linhas inválidas vão para o reject sink com os motivos."""
+    sink = RejectSink(path=str(tmp_path / "rejects.ndjson"))
+    records = [
+        payload(1),
+        payload(None),
+        payload(3, price="abc"),
+        payload(4, price=-1),
+        payload(5, title=""),
+        payload(6, category=None, price=None),
+    ]
+
+    result = transform_products(records, extracted_at=EXTRACTED_AT, rejects=sink)
+
+    assert result.frame["id"].tolist() == [1]
+    assert result.rejected == sink.count == 5
+    reasons = {entry["record"]["id"]: entry["reasons"] for entry in sink.sample}
+    assert reasons[None] == ["id ausente ou inválido"]
+    assert reasons[3] == ["preço ausente ou inválido"]
+    assert reasons[4] == ["preço negativo"]
+    assert reasons[5] == ["name ausente"]
+    assert set(reasons[6]) == {"preço ausente ou inválido", "category ausente"}
+
+    lines = (tmp_path / "rejects.ndjson").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5
+    assert json.loads(lines[0])["reasons"] == ["id ausente ou inválido"]
+
+
+def test_transform_deduplicates_by_id_keeping_last():
+    result = transform_products([payload(1, price=1), payload(2), payload(1, price=3)], extracted_at=EXTRACTED_AT)
+
+    assert result.duplicates == 1
+    by_id = {r["id"]: r for r in result.records()}
+    assert by_id[1]["price"] == Decimal("3.00")
+    assert len(by_id) == 2
+
+
+def test_transform_truncates_to_column_limits():
+    result = transform_products(
+        [payload(1, title="x" * 300, category="c" * 150, image="i" * 256)], extracted_at=EXTRACTED_AT
+    )
+
+    record = result.records()[0]
+    assert len(record["name"]) == 255
+    assert len(record["category"]) == 100
+    assert len(record["image_url"]) == 255
+    assert result.truncated == 3
+
+
+def test_iter_records_in_chunks():
+    result = transform_products([payload(i) for i in range(1, 8)], extracted_at=EXTRACTED_AT)
+
+    chunks = list(result.iter_records(chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+
+
+def test_records_keep_missing_texts_and_price_text():
+    """Textos ausentes continuam None e o preço sai com duas casas, como entra no content_hash."""
+    result = transform_products([payload(1, description=None, image=None, price=0), payload(2, price=1.1)])
+
+    first, second = result.records()
+    assert (first["description"], first["image_url"]) == (None, None)
+    assert [str(first["price"]), str(second["price"])] == ["0.00", "1.10"]
@@ -0,0 +1,193 @@
+"""
+Benchmark de concorrência das rotas de leitura: sobe a API com uvicorn num
+subprocesso, sobre um catálogo sintético em SQLite, e dispara de 50 a 500
+clientes simultâneos contra `GET /api/products` e `GET /api/stats`, medindo
+requisições/s e latência (p50/p99).
+
+Compara as rotas assíncronas atuais (`async`, sessão aiosqlite/aiomysql) com
+as mesmas consultas em rotas `def` com a sessão síncrona (`sync`, como eram
+antes), que dependem do threadpool do Starlette. Com `--report-clients`, parte
+dos clientes fica chamando um relatório lento (uma chamada bloqueante de
+`--report-ms` no threadpool), o cenário em que a listagem síncrona fica sem
+threads.
+
+Uso:
+    python -m benchmarks.bench_concurrency --size 10000 --clients 50 100 250 500 --duration 10
+    python -m benchmarks.bench_concurrency --modes async --report-clients 0
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.crud_products import insert_products
+from app.migrate import migrate
+from benchmarks.synthetic import synthetic_rows
+
+
+MODES = ("sync", "async")
+PAGE_SIZE = 50
+
+
+def _sync_app(report_ms: float):
+    """A API com as rotas de leitura síncronas, como antes do engine assíncrono."""
+    import orjson
+    from fastapi import Depends, FastAPI, Response
+    from sqlalchemy.orm import Session
+    from app.database.crud_category_summary import get_category_summaries
+    from app.database.crud_products import PRODUCT_FIELDS, get_product_rows
+    from app.database.db import get_db
+    from app.main import lifespan
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/api/products")
+    def list_products(limit: int | None = None, cursor: int | None = None, db: Session = Depends(get_db)):
+        fields = list(PRODUCT_FIELDS)
+        rows = get_product_rows(db, fields, limit=limit, after_id=cursor)
+        return Response(orjson.dumps([dict(zip(fields, row)) for row in rows]), media_type="application/json")
+
+    @app.get("/api/stats")
+    def get_stats(db: Session = Depends(get_db)):
+        return [{"category": summary.category, "count": summary.product_count}
+                for summary in get_category_summaries(db)]
+
+    _add_report_route(app, report_ms)
+    return app
+
+
+def _async_app(report_ms: float):
+    from app.main import app
+
+    _add_report_route(app, report_ms)
+    return app
+
+
+def _add_report_route(app, report_ms: float):
+    # Relatório lento: segura uma thread do pool pelo tempo da "consulta"
+    @app.get("/bench/report")
+    def slow_report():
+        time.sleep(report_ms / 1000)
+        return {"ok": True}
+
+
+def serve(mode: str, port: int, report_ms: float):
+    import uvicorn
+
+    app = _sync_app(report_ms) if mode == "sync" else _async_app(report_ms)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def _start_server(mode: str, database_url: str, port: int, report_ms: float) -> subprocess.Popen:
+    # Sem o snapshot em memória: as duas variantes leem do banco
+    env = dict(os.environ, DATABASE_URL=database_url, CATALOG_SNAPSHOT_MAX_MB="0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_concurrency", "serve", mode, str(port), str(report_ms)], env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/stats", timeout=1).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                raise RuntimeError(f"servidor {mode} terminou com código {process.returncode}")
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"servidor {mode} não respondeu em 30 s")
+
+
+async def _load(base_url: str, clients: int, duration: float, size: int, report_clients: int) -> tuple[int, int, list]:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=clients + report_clients, max_keepalive_connections=clients + report_clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def reader(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                if rng.random() < 0.8:
+                    params = {"limit": PAGE_SIZE, "cursor": rng.randrange(max(size - PAGE_SIZE, 1))}
+                    path = "/api/products"
+                else:
+                    params, path = {}, "/api/stats"
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        async def reporter():
+            while time.perf_counter() < deadline:
+                try:
+                    await client.get("/bench/report")
+                except httpx.HTTPError:
+                    pass
+
+        await asyncio.gather(*(reader(seed) for seed in range(clients)), *(reporter() for _ in range(report_clients)))
+    return len(latencies), errors, latencies
+
+
+def _percentile(samples: list[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos por nível de concorrência")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--report-clients", type=int, default=40, help="clientes no relatório lento")
+    parser.add_argument("--report-ms", type=float, default=200.0, help="duração de cada relatório lento")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(database_url)
+        migrate(engine)
+        with sessionmaker(bind=engine, autoflush=False)() as db:
+            insert_products(db, synthetic_rows(args.size), chunk_size=5000)
+        engine.dispose()
+
+        print(f"📌 {args.size:,} produtos, {args.duration:.0f} s por nível, "
+              f"{args.report_clients} clientes no relatório lento de {args.report_ms:.0f} ms")
+        print(f"  {'modo':<6} {'clientes':>9} {'reqs':>8} {'erros':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for mode in args.modes:
+            server = _start_server(mode, database_url, args.port, args.report_ms)
+            try:
+                for clients in args.clients:
+                    done, errors, latencies = asyncio.run(
+                        _load(f"http://127.0.0.1:{args.port}", clients, args.duration, args.size, args.report_clients)
+                    )
+                    print(f"  {mode:<6} {clients:>9} {done:>8,} {errors:>6} {done / args.duration:>9,.0f} "
+                          f"{_percentile(latencies, 50):>9.1f} {_percentile(latencies, 99):>9.1f}")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2], int(sys.argv[3]), float(sys.argv[4]))
+    else:
+        main()
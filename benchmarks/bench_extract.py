@@ -0,0 +1,117 @@
+"""
+Gerador de carga da extração: sobe o stub da FakeStore API (ou usa um já
+rodando, com `--base-url`), executa o ETL completo contra ele num SQLite em
+arquivo e mede a vazão (produtos/s) e a latência das requisições
+(p50/p95/p99, incluindo as retentativas) sob as falhas injetadas.
+
+Uso:
+    python -m benchmarks.bench_extract --products 100000 --page-size 1000 --concurrency 8 \\
+        --latency-ms 20 --jitter-ms 10 --error-rate 0.02 --truncate-rate 0.01 --drip-rate 0.01
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters import fakestore
+from app.adapters.fakestore import FakeStoreAPI
+from app.migrate import migrate
+from app.services.etl_pipeline import run_etl
+from benchmarks.fakestore_stub import Faults, FakeStoreStub
+from benchmarks.suite import _rss_mb
+
+
+class TimedFakeStoreAPI(FakeStoreAPI):
+    """Adapter que guarda a latência de cada requisição, somando as retentativas."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: list[float] = []
+        self._latency_lock = threading.Lock()
+
+    def _get(self, path: str):
+        start = time.perf_counter()
+        try:
+            return super()._get(path)
+        finally:
+            with self._latency_lock:
+                self.latencies.append((time.perf_counter() - start) * 1000)
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=1000, help="0 busca tudo numa única requisição")
+    parser.add_argument("--concurrency", type=int, default=8, help="requisições simultâneas do adapter")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--base-url", help="stub já rodando (as opções de falha são ignoradas)")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--truncate-rate", type=float, default=0.01)
+    parser.add_argument("--drip-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    stub = None
+    base_url = args.base_url
+    if base_url is None:
+        faults = Faults(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        truncate_rate=args.truncate_rate, drip_rate=args.drip_rate)
+        stub = FakeStoreStub(args.products, faults).start()
+        base_url = stub.url
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        migrate(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        print(f"📌 {args.products:,} produtos em {base_url}, páginas de {args.page_size or 'tudo'}, "
+              f"{args.concurrency} conexões")
+        print(f"  {'execução':<9} {'produtos':>9} {'seg':>7} {'produtos/s':>11} {'reqs':>6} {'retent.':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}  falhas injetadas")
+        try:
+            for run in range(1, args.runs + 1):
+                # Cliente novo a cada execução: sem o cache de ETag, toda página é baixada de novo
+                api = TimedFakeStoreAPI(base_url=base_url, page_size=args.page_size or None,
+                                        max_concurrency=args.concurrency, backoff_factor=0.05, max_backoff=1.0,
+                                        max_retries=5)
+                fakestore._default_api = api
+                before = Counter(stub.stats) if stub is not None else Counter()
+                start = time.perf_counter()
+                with Session() as db:
+                    result = run_etl(db)
+                seconds = time.perf_counter() - start
+                api.close()
+
+                extracted = result["pipeline"]["extract"]["rows"]
+                p50, p95, p99 = _percentiles(api.latencies)
+                injected = Counter(stub.stats) - before if stub is not None else Counter()
+                faults = ", ".join(f"{name}={count}" for name, count in sorted(injected.items()) if name != "ok")
+                print(f"  {run:<9} {extracted:>9,} {seconds:>7.2f} {extracted / seconds:>11,.0f} "
+                      f"{len(api.latencies):>6} {api.retries:>8} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} "
+                      f"{max(api.latencies, default=0.0):>8.1f}  {faults or '-'}")
+        finally:
+            fakestore._default_api = None
+            engine.dispose()
+            if stub is not None:
+                stub.stop()
+        print(f"  pico de RSS {_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark de `GET /api/products`: requisições por segundo em uma tabela
+SQLite com o catálogo sintético, para páginas, sparse fieldsets e a lista
+completa. As respostas saem do snapshot do catálogo em memória (cada uma é
+conferida pelo header `X-Catalog-Version`); com `--no-snapshot`, do banco.
+
+Uso:
+    python -m benchmarks.bench_listing --size 100000 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.crud_products import insert_products
+from app.main import app
+from app.migrate import migrate
+from benchmarks.suite import override_read_sessions
+from benchmarks.synthetic import synthetic_rows
+
+
+SCENARIOS = {
+    "página de 100": {"limit": 100, "cursor": 50_000},
+    "página de 1000": {"limit": 1000, "cursor": 50_000},
+    "página de 1000 (id,price)": {"limit": 1000, "cursor": 50_000, "fields": "id,price"},
+    "lista completa": {},
+    "lista completa (id,price)": {"fields": "id,price"},
+}
+
+
+def requests_per_second(client: TestClient, params: dict, duration: float,
+                        snapshot: bool = True) -> tuple[float, int]:
+    """Repete a requisição por `duration` segundos; retorna (req/s, bytes da resposta)."""
+    count, size = 0, 0
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    while time.perf_counter() < deadline or count == 0:
+        response = client.get("/api/products", params=params)
+        response.raise_for_status()
+        assert ("X-Catalog-Version" in response.headers) == snapshot, "origem da listagem diferente da pedida"
+        size = len(response.content)
+        count += 1
+    return count / (time.perf_counter() - start), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos por cenário")
+    parser.add_argument("--no-snapshot", action="store_true", help="lê do banco, sem o snapshot do catálogo")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        migrate(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            insert_products(db, synthetic_rows(args.size), chunk_size=5000)
+
+        async_engine, catalog = override_read_sessions(app, Session)
+        if args.no_snapshot:
+            catalog.max_bytes = 0
+        source = "banco" if args.no_snapshot else "snapshot"
+        print(f"📌 {args.size:,} produtos, {args.duration:.0f}s por cenário, leitura pelo {source}")
+        with TestClient(app) as client:
+            for name, params in SCENARIOS.items():
+                rps, size = requests_per_second(client, params, args.duration, snapshot=not args.no_snapshot)
+                print(f"  {name:<28} {rps:>9.2f} req/s  {size / 1024:>9.1f} KB")
+        app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark do relatório Excel: `generate_report` (DataFrame + planilha normal)
+contra `generate_report_streaming` (cursor em lotes + planilha write-only).
+
+Cada modo roda em um subprocesso próprio para medir o pico de RSS isolado.
+
+Uso:
+    python -m benchmarks.bench_report --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+from app.database.crud_products import insert_products
+from benchmarks.synthetic import synthetic_rows
+
+
+MODES = ("standard", "streaming")
+
+
+def seed_database(path: str, size: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        insert_products(db, synthetic_rows(size), chunk_size=5000)
+    engine.dispose()
+
+
+def run_worker(mode: str, db_path: str, output: str):
+    """Executado no subprocesso: gera o relatório e imprime as métricas em JSON."""
+    from app.reports.excel_generator import generate_report, generate_report_streaming
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    generator = generate_report_streaming if mode == "streaming" else generate_report
+    with sessionmaker(bind=engine)() as db:
+        start = time.perf_counter()
+        generator(db, output)
+        elapsed = time.perf_counter() - start
+
+    # ru_maxrss é em KiB no Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss_mb, "bytes": os.path.getsize(output)}))
+
+
+def measure(mode: str, db_path: str, output: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_report", "--worker", mode, db_path, output],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "DB", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            seed_database(db_path, size)
+
+            print(f"\n📌 {size:,} produtos")
+            for mode in args.modes:
+                result = measure(mode, db_path, os.path.join(tmp, f"{mode}.xlsx"))
+                print(
+                    f"  {mode:<10} {result['seconds']:.2f}s  "
+                    f"pico RSS {result['peak_rss_mb']:.0f} MB  arquivo {result['bytes'] / 1024 / 1024:.1f} MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
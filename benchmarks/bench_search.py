@@ -0,0 +1,113 @@
+"""
+Benchmark da busca textual: construção e atualização incremental do índice
+em memória e latência de `GET /api/products/search` num catálogo sintético
+em SQLite, comparada com um `LIKE '%termo%'` no banco.
+
+Uso:
+    python -m benchmarks.bench_search --size 1000000 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database.crud_products import insert_products
+from app.database.db import get_read_db
+from app.database.model_product import Product
+from app.main import app
+from app.migrate import migrate
+from app.services.search import ProductSearchIndex, get_search_index
+from benchmarks.suite import _rss_mb
+from benchmarks.synthetic import synthetic_rows
+
+
+QUERIES = {
+    "termo comum": {"q": "premium"},
+    "dois termos": {"q": "couro jaqueta"},
+    "prefixo": {"q": "mochila alg"},
+    "termo raro (id)": {"q": "123457"},
+    "com categoria": {"q": "prata anel", "category": "jewelery"},
+    "página 5": {"q": "slim", "offset": 80},
+}
+
+
+def _latencies(call, repeat: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def _like_count(db, term: str) -> int:
+    pattern = f"%{term}%"
+    return db.scalar(select(func.count()).where(or_(Product.name.like(pattern), Product.description.like(pattern))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50, help="requisições por consulta")
+    parser.add_argument("--changed", type=float, default=0.01, help="fração alterada antes da atualização incremental")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        migrate(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        rows = synthetic_rows(args.size)
+        with Session() as db:
+            insert_products(db, rows, chunk_size=5000)
+        print(f"📌 {args.size:,} produtos")
+
+        index = ProductSearchIndex(version_ttl=float("inf"))
+        with Session() as db:
+            start = time.perf_counter()
+            state = index.refresh(db, version=1)
+            print(f"  índice completo          {time.perf_counter() - start:>8.2f} s  "
+                  f"{state.nbytes / 1024 / 1024:>7.1f} MB  {sum(len(s.terms) for s in state.segments):,} termos")
+
+            changed = rows[:int(args.size * args.changed)]
+            for row in changed:
+                row["description"] += " edição limitada"
+            insert_products(db, changed, chunk_size=5000)
+            start = time.perf_counter()
+            state = index.refresh(db, version=2)
+            print(f"  atualização incremental  {time.perf_counter() - start:>8.2f} s  "
+                  f"({len(changed):,} alterados, {len(state.segments)} segmentos)")
+
+        def override_get_read_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_read_db] = override_get_read_db
+        app.dependency_overrides[get_search_index] = lambda: index
+        with TestClient(app) as client, Session() as db:
+            print(f"  {'consulta':<18} {'resultados':>10} {'p50 ms':>9} {'p95 ms':>9} {'LIKE ms':>9}")
+            for name, params in QUERIES.items():
+                total = client.get("/api/products/search", params=params).headers["X-Total-Count"]
+                p50, p95 = _latencies(lambda: client.get("/api/products/search", params=params).raise_for_status(),
+                                      args.repeat)
+                like_start = time.perf_counter()
+                _like_count(db, params["q"].split()[0])
+                like_ms = (time.perf_counter() - like_start) * 1000
+                print(f"  {name:<18} {int(total):>10,} {p50:>9.2f} {p95:>9.2f} {like_ms:>9.1f}")
+        app.dependency_overrides.clear()
+        engine.dispose()
+        print(f"  pico de RSS {_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark da inicialização da API: tempo de `import app.main` e do lifespan
+(criação do engine, instrumentação, agendador) em processos novos, além do
+pico de RSS e de quais dependências pesadas foram carregadas.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --importtime 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl")
+
+WORKER = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app):
+    started = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "startup_seconds": started - imported,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def _env() -> dict:
+    return {**os.environ, "DATABASE_URL": os.environ.get("DATABASE_URL", "sqlite://")}
+
+
+def measure_once() -> dict:
+    completed = subprocess.run([sys.executable, "-c", WORKER], capture_output=True, text=True, env=_env())
+    completed.check_returncode()
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def top_imports(limit: int) -> list[tuple[int, str]]:
+    """Os `limit` módulos com maior tempo cumulativo de import (µs), via `-X importtime`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True, text=True, env=_env()
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        entries.append((int(cumulative), name.rstrip()))
+    return sorted(entries, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, metavar="N", help="lista os N imports mais caros")
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    print(f"📌 {args.runs} processos novos (mediana)")
+    for key in ("import_seconds", "startup_seconds"):
+        print(f"  {key:<16} {statistics.median(r[key] for r in results):.3f}s")
+    print(f"  {'peak_rss_mb':<16} {statistics.median(r['peak_rss_mb'] for r in results):.0f} MB")
+    print(f"  pesados carregados: {', '.join(results[0]['loaded']) or 'nenhum'}")
+
+    if args.importtime:
+        print(f"\n📌 {args.importtime} imports mais caros (cumulativo)")
+        for cumulative, name in top_imports(args.importtime):
+            print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmark da etapa de transformação (`transform_products`) sobre payloads
+sintéticos no formato da FakeStore API, e da materialização das linhas para
+a carga (`TransformResult.iter_records`, com os preços em Decimal).
+
+Uso:
+    python -m benchmarks.bench_transform --sizes 100000 1000000
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.transform import transform_products
+from benchmarks.synthetic import synthetic_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        payload = synthetic_payload(size)
+        timings, records = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = transform_products(payload)
+            timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            for _chunk in result.iter_records():
+                pass
+            records.append(time.perf_counter() - start)
+        print(f"📌 {size:>9,} registros  melhor {min(timings):.3f}s  registros p/ carga {min(records):.3f}s  "
+              f"({len(result):,} válidos)")
+
+
+if __name__ == "__main__":
+    main()
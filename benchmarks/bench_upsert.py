@@ -0,0 +1,78 @@
+"""
+Benchmark da carga de produtos no SQLite: upsert em lotes (`insert_products`)
+contra o loop antigo de `db.merge()` por linha.
+
+Uso:
+    python -m benchmarks.bench_upsert --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+from app.database.crud_products import DEFAULT_CHUNK_SIZE, _to_row, insert_products
+from app.database.model_product import Product
+from benchmarks.synthetic import synthetic_rows
+
+
+def merge_loop(db, products):
+    """Implementação anterior: um SELECT + escrita por produto."""
+    for product_data in products:
+        db.merge(Product(**_to_row(product_data)))
+    db.commit()
+
+
+def bulk_upsert(db, products, chunk_size):
+    insert_products(db, products, chunk_size=chunk_size)
+
+
+def run_case(loader, products, updated_products, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        timings = {}
+        for label, payload in (("carga inicial", products), ("recarga com alterações", updated_products)):
+            with Session() as db:
+                start = time.perf_counter()
+                loader(db, payload, **kwargs)
+                timings[label] = time.perf_counter() - start
+        engine.dispose()
+        return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--skip-merge", action="store_true", help="não executa o loop de merge (lento em 1M)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        products = synthetic_rows(size)
+        # Metade das linhas muda de preço na segunda carga
+        updated = [
+            {**p, "price": round(p["price"] + 1, 2)} if p["id"] % 2 else p
+            for p in products
+        ]
+
+        print(f"\n📌 {size:,} produtos")
+        cases = [("upsert em lotes", bulk_upsert, {"chunk_size": args.chunk_size})]
+        if not args.skip_merge:
+            cases.append(("merge por linha", merge_loop, {}))
+
+        for name, loader, kwargs in cases:
+            timings = run_case(loader, products, updated, **kwargs)
+            summary = ", ".join(f"{label}: {seconds:.2f}s" for label, seconds in timings.items())
+            print(f"  {name:<16} {summary}")
+
+
+if __name__ == "__main__":
+    main()
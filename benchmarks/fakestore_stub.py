@@ -0,0 +1,278 @@
+"""
+Servidor local que imita a FakeStore API, para testar a extração em escala
+sem acesso à rede.
+
+Serve um catálogo sintético determinístico de qualquer tamanho (gerado sob
+demanda em blocos, sem montar tudo na memória), com paginação por
+`?limit=&offset=` e o total no header `X-Total-Count`; sem `limit`, a lista
+inteira vai em `Transfer-Encoding: chunked`, um bloco por vez. Injeta falhas:
+latência com variação, respostas 429/5xx, corpos cortados no meio (conexão
+fechada antes do fim) e corpos enviados aos poucos (slow drip).
+
+Uso:
+    python -m benchmarks.fakestore_stub --products 100000 --port 8001 --latency-ms 20 --error-rate 0.02
+    FAKESTORE_BASE_URL=http://127.0.0.1:8001 FAKESTORE_PAGE_SIZE=1000 uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.synthetic import CATEGORIES, synthetic_payload
+
+
+BLOCK_SIZE = 1000
+
+
+@dataclass
+class Faults:
+    """Falhas injetadas em cada resposta, sorteadas de forma independente."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Fração das respostas trocadas por um status de `error_statuses`
+    error_rate: float = 0.0
+    error_statuses: tuple[int, ...] = (429, 500, 502, 503)
+    retry_after: float = 0.0
+    # Fração dos corpos cortados na metade, com a conexão fechada
+    truncate_rate: float = 0.0
+    # Fração dos corpos enviados em pedaços de `drip_chunk` bytes a cada `drip_delay_ms`
+    drip_rate: float = 0.0
+    drip_chunk: int = 4096
+    drip_delay_ms: float = 5.0
+
+
+class FakeStoreStub:
+    """`ThreadingHTTPServer` com os endpoints da FakeStore API; `port=0` escolhe uma porta livre."""
+
+    def __init__(self, products: int = 20, faults: Faults | None = None, seed: int = 42,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.products = products
+        self.faults = faults or Faults()
+        self.seed = seed
+        self.stats: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._block = lru_cache(maxsize=256)(self._make_block)
+        stub = self
+
+        class Handler(_Handler):
+            server_stub = stub
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fakestore-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_block(self, block: int) -> list[dict]:
+        start = block * BLOCK_SIZE
+        return synthetic_payload(min(BLOCK_SIZE, self.products - start), seed=self.seed + block, start_id=start + 1)
+
+    def page(self, offset: int, limit: int) -> list[dict]:
+        """Produtos `offset` a `offset + limit`; o conteúdo não depende da paginação usada."""
+        end = min(offset + limit, self.products)
+        products = []
+        if end <= offset:
+            return products
+        for block in range(offset // BLOCK_SIZE, (end - 1) // BLOCK_SIZE + 1):
+            base = block * BLOCK_SIZE
+            products.extend(self._block(block)[max(offset - base, 0):end - base])
+        return products
+
+    def iter_body(self) -> Iterator[bytes]:
+        """A lista inteira em JSON, em pedaços de um bloco, sem passar pelo cache de blocos."""
+        yield b"["
+        for block in range((self.products + BLOCK_SIZE - 1) // BLOCK_SIZE):
+            separator = b"," if block else b""
+            yield separator + json.dumps(self._make_block(block))[1:-1].encode()
+        yield b"]"
+
+    def draw(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def delay(self) -> float:
+        faults = self.faults
+        if faults.jitter_ms <= 0:
+            return faults.latency_ms / 1000
+        with self._lock:
+            jitter = self._random.uniform(-faults.jitter_ms, faults.jitter_ms)
+        return max(faults.latency_ms + jitter, 0.0) / 1000
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_stub: FakeStoreStub
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server_stub
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        time.sleep(stub.delay())
+
+        if stub.draw(stub.faults.error_rate):
+            with stub._lock:
+                status = stub._random.choice(stub.faults.error_statuses)
+            stub.count(f"error_{status}")
+            headers = {"Retry-After": str(stub.faults.retry_after)} if status == 429 else {}
+            self._send(status, b'{"error": "injected"}', headers)
+            return
+
+        try:
+            body, headers = self._route(url.path.rstrip("/"), query)
+        except ValueError:
+            self._send(400, b'{"error": "bad request"}')
+            return
+        if body is None:
+            stub.count("not_found")
+            self._send(404, b'{"error": "not found"}')
+            return
+
+        etag = headers.get("ETag")
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            stub.count("not_modified")
+            self._send(304, b"", headers)
+            return
+
+        if stub.draw(stub.faults.truncate_rate):
+            stub.count("truncated")
+            self._send(200, body, headers, truncate=True)
+        elif stub.draw(stub.faults.drip_rate):
+            stub.count("drip")
+            self._send(200, body, headers, drip=True)
+        else:
+            stub.count("ok")
+            self._send(200, body, headers)
+
+    def _route(self, path: str, query: dict) -> tuple[bytes | Iterator[bytes] | None, dict]:
+        stub = self.server_stub
+        if path == "/products":
+            headers = {"X-Total-Count": str(stub.products)}
+            if "limit" not in query and "offset" not in query:
+                headers["ETag"] = f'"{stub.seed}-{stub.products}"'
+                return stub.iter_body(), headers
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", [str(stub.products)])[0])
+            if offset < 0 or limit < 0:
+                raise ValueError("paginação inválida")
+            headers["ETag"] = f'"{stub.seed}-{stub.products}-{offset}-{limit}"'
+            return json.dumps(stub.page(offset, limit)).encode(), headers
+        if path == "/products/categories":
+            return json.dumps(CATEGORIES).encode(), {}
+        if path.startswith("/products/"):
+            product_id = int(path.rsplit("/", 1)[1])
+            if not 1 <= product_id <= stub.products:
+                return None, {}
+            return json.dumps(stub.page(product_id - 1, 1)[0]).encode(), {}
+        if path in ("/carts", "/users"):
+            return b"[]", {}
+        return None, {}
+
+    def _send(self, status: int, body: bytes | Iterator[bytes], headers: dict | None = None,
+              truncate=False, drip=False):
+        chunked = not isinstance(body, bytes)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if truncate:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        pieces = body if chunked else [body]
+        for piece in pieces:
+            if truncate:
+                # Metade do primeiro pedaço com conteúdo e a conexão é fechada
+                if piece.strip(b"[],"):
+                    self._write(piece[:len(piece) // 2], chunked)
+                    return
+                self._write(piece, chunked)
+            elif drip:
+                faults = self.server_stub.faults
+                for start in range(0, len(piece), faults.drip_chunk):
+                    self._write(piece[start:start + faults.drip_chunk], chunked)
+                    self.wfile.flush()
+                    time.sleep(faults.drip_delay_ms / 1000)
+            else:
+                self._write(piece, chunked)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _write(self, data: bytes, chunked: bool):
+        if not chunked:
+            self.wfile.write(data)
+        elif data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.0, help="segundos no Retry-After das respostas 429")
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--drip-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    faults = Faults(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    retry_after=args.retry_after, truncate_rate=args.truncate_rate, drip_rate=args.drip_rate)
+    stub = FakeStoreStub(args.products, faults, seed=args.seed, host=args.host, port=args.port)
+    print(f"📌 FakeStore simulada com {args.products:,} produtos em {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+        print(f"✅ Respostas: {dict(stub.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Suíte de benchmarks sem Docker: roda contra SQLite (arquivo e memória) com o
+catálogo sintético de `benchmarks.synthetic`, de 1 mil a 1 milhão de produtos.
+
+Cada caso roda em um subprocesso próprio; o banco é populado antes de o
+cronômetro começar. Para cada caso são registrados tempo de parede, pico de
+RSS do processo, crescimento de RSS durante o caso e número de queries.
+
+Uso:
+    python -m benchmarks.suite run --sizes 1000 10000 100000 --output resultados.json
+    python -m benchmarks.suite compare base.json novo.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+CASES = (
+    "insert_products",
+    "get_products",
+    "api_list_products",
+    "api_list_products_ndjson",
+    "generate_report",
+    "generate_report_streaming",
+    "export_csv",
+    "export_ndjson",
+    "export_parquet",
+    "run_etl",
+    "run_etl_http",
+    "run_etl_http_stream",
+)
+DATABASES = ("memory", "file")
+# O engine assíncrono das rotas de leitura abre conexões próprias e não enxerga
+# o SQLite em memória do processo: esses casos só rodam com o banco em arquivo
+FILE_ONLY_CASES = ("api_list_products", "api_list_products_ndjson")
+METRICS = ("seconds", "peak_rss_mb", "queries")
+
+
+def _rss_mb() -> float:
+    # ru_maxrss é em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def override_read_sessions(app, session_factory):
+    """
+    Aponta `get_read_db`, `get_async_read_db` e o snapshot do catálogo
+    (`get_catalog_store`) para o banco de `session_factory` (SQLite em
+    arquivo); devolve o engine assíncrono criado, para contar as queries e
+    fechá-lo ao final, e o `CatalogStore`, já com o snapshot publicado.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.database.db import get_async_read_db, get_read_db, to_async_url
+    from app.services.catalog import CatalogStore, get_catalog_store
+
+    async_engine = create_async_engine(to_async_url(session_factory.kw["bind"].url))
+    async_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_read_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_read_db():
+        async with async_factory() as db:
+            yield db
+
+    # Sem isso a reconstrução em segundo plano abriria a sessão global, que não
+    # enxerga este banco, e a listagem mediria só o caminho pelo banco
+    catalog = CatalogStore(session_factory=session_factory)
+    with session_factory() as db:
+        catalog.refresh(db)
+
+    async def override_get_catalog_store():
+        return catalog
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+    app.dependency_overrides[get_catalog_store] = override_get_catalog_store
+    return async_engine, catalog
+
+
+def _make_engine(database: str, directory: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from app.database.db import Base
+    # Registra todas as tabelas no metadata antes do create_all
+    from app.database import model_category_summary, model_etl_run, model_price_history, model_product  # noqa: F401
+
+    if database == "memory":
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                               connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _prepare(case: str, size: int, session_factory):
+    """Popula o banco (fora da medição) e devolve a função que será medida."""
+    from app.database.crud_products import insert_products, get_products
+    from benchmarks.synthetic import synthetic_payload, synthetic_rows
+
+    if case == "insert_products":
+        rows = synthetic_rows(size)
+        return lambda db, workdir: insert_products(db, rows)
+
+    if case.startswith("run_etl_http"):
+        # ETL completo via HTTP contra o stub local: corpo lido de uma vez ou em fluxo
+        from app.adapters import fakestore
+        from app.adapters.fakestore import FakeStoreAPI
+        from app.services.etl_pipeline import run_etl
+        from benchmarks.fakestore_stub import FakeStoreStub
+
+        stub = FakeStoreStub(size).start()
+        fakestore._default_api = FakeStoreAPI(base_url=stub.url)
+        stream = case.endswith("_stream")
+        return lambda db, workdir: run_etl(db, stream_extract=stream)
+
+    if case == "run_etl":
+        from app.adapters import fakestore
+        from app.services.etl_pipeline import run_etl
+        from benchmarks.synthetic import StubFakeStoreAPI
+
+        fakestore._default_api = StubFakeStoreAPI(synthetic_payload(size))
+        return lambda db, workdir: run_etl(db)
+
+    with session_factory() as db:
+        insert_products(db, synthetic_rows(size), chunk_size=5000)
+
+    if case == "get_products":
+        return lambda db, workdir: get_products(db)
+
+    if case.startswith("generate_report"):
+        from app.reports import excel_generator
+
+        generator = getattr(excel_generator, case)
+        return lambda db, workdir: generator(db, os.path.join(workdir, "report.xlsx"))
+
+    if case.startswith("export_"):
+        from app.reports.exports import EXPORTERS
+
+        exporter = EXPORTERS[case.removeprefix("export_")]
+        return lambda db, workdir: sum(len(chunk) for chunk in exporter(db))
+
+    if case.startswith("api_list_products"):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        async_engine, _ = override_read_sessions(app, session_factory)
+        client = TestClient(app)
+        ndjson = case.endswith("ndjson")
+        params = {"format": "ndjson"} if ndjson else {}
+
+        def request(db, workdir):
+            response = client.get("/api/products", params=params)
+            response.raise_for_status()
+            # O JSON sai do snapshot; o NDJSON sempre lê em fluxo do banco
+            assert ndjson or "X-Catalog-Version" in response.headers, "listagem não usou o snapshot"
+            return len(response.content)
+
+        # As queries da rota passam pelo engine assíncrono, não pelo da suíte
+        request.engines = (async_engine.sync_engine,)
+        return request
+
+    raise ValueError(f"Caso desconhecido: {case}")
+
+
+def run_case(case: str, size: int, database: str) -> dict:
+    """Executado no subprocesso: prepara, mede e devolve o resultado de um caso."""
+    import contextlib
+    import io
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = _make_engine(database, workdir)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        # Os geradores imprimem mensagens de progresso; não devem poluir o JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            target = _prepare(case, size, session_factory)
+
+            queries = 0
+
+            def count_query(*args):
+                nonlocal queries
+                queries += 1
+
+            for counted in (engine, *getattr(target, "engines", ())):
+                event.listen(counted, "before_cursor_execute", count_query)
+            rss_before = _rss_mb()
+            with session_factory() as db:
+                start = time.perf_counter()
+                target(db, workdir)
+                seconds = time.perf_counter() - start
+            peak = _rss_mb()
+        engine.dispose()
+
+    return {
+        "case": case,
+        "size": size,
+        "database": database,
+        "seconds": round(seconds, 4),
+        "peak_rss_mb": round(peak, 1),
+        "rss_growth_mb": round(peak - rss_before, 1),
+        "queries": queries,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(cases, sizes, databases, output: str | None):
+    results = []
+    for size in sizes:
+        for database in databases:
+            for case in cases:
+                if case in FILE_ONLY_CASES and database != "file":
+                    continue
+                completed = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.suite", "_case", case, str(size), database],
+                    capture_output=True, text=True,
+                )
+                if completed.returncode != 0:
+                    print(f"❌ {case} ({size:,}, {database}) falhou:\n{completed.stderr[-2000:]}")
+                    continue
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                results.append(result)
+                print(
+                    f"  {case:<28} {size:>9,} {database:<6} {result['seconds']:>9.3f}s "
+                    f"{result['peak_rss_mb']:>8.1f} MB  {result['queries']:>7} queries"
+                )
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Resultados salvos em {output}")
+    return report
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    """Compara dois arquivos de resultado; retorna 1 se alguma métrica piorou além de `threshold`."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["size"], r["database"]): r for r in json.load(f)["results"]}
+    with open(candidate_path, encoding="utf-8") as f:
+        candidate = {(r["case"], r["size"], r["database"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        for metric in METRICS:
+            old, new = baseline[key][metric], candidate[key][metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  ⚠️ regressão"
+                regressions += 1
+            print(f"  {key[0]:<28} {key[1]:>9,} {key[2]:<6} {metric:<12} {old:>10} → {new:<10} {change:+.1%}{flag}")
+
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="executa a suíte")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    run_parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    run_parser.add_argument("--databases", nargs="+", choices=DATABASES, default=list(DATABASES))
+    run_parser.add_argument("--output", help="arquivo JSON de saída")
+
+    compare_parser = subparsers.add_parser("compare", help="compara dois resultados")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="piora relativa tolerada (0.2 = 20%%)")
+
+    case_parser = subparsers.add_parser("_case")
+    case_parser.add_argument("case", choices=CASES)
+    case_parser.add_argument("size", type=int)
+    case_parser.add_argument("database", choices=DATABASES)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_suite(args.cases, args.sizes, args.databases, args.output)
+    elif args.command == "compare":
+        sys.exit(compare(args.baseline, args.candidate, args.threshold))
+    else:
+        print(json.dumps(run_case(args.case, args.size, args.database)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Gerador determinístico de catálogos sintéticos, no formato da FakeStore API,
+para benchmarks de 1 mil a 1 milhão de produtos sem acesso à rede.
+"""
+import random
+from datetime import datetime
+
+
+CATEGORIES = ["electronics", "jewelery", "men's clothing", "women's clothing"]
+WORDS = [
+    "mochila", "camiseta", "jaqueta", "anel", "pulseira", "monitor", "ssd", "notebook",
+    "algodão", "couro", "prata", "ouro", "slim", "casual", "premium", "básico",
+]
+EXTRACTED_AT = datetime(2025, 1, 1)
+
+
+def synthetic_payload(count: int, seed: int = 42, start_id: int = 1) -> list[dict]:
+    """Lista de produtos como a retornada por `GET /products`. Mesma semente, mesmo catálogo."""
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(start_id, start_id + count):
+        words = rng.choices(WORDS, k=rng.randint(2, 6))
+        products.append({
+            "id": product_id,
+            "title": " ".join(words).capitalize() + f" {product_id}",
+            "price": round(rng.uniform(1, 1000), 2),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+            "category": rng.choice(CATEGORIES),
+            "image": f"https://fakestoreapi.com/img/{product_id}.jpg",
+            "rating": {"rate": round(rng.uniform(1, 5), 1), "count": rng.randint(0, 500)},
+        })
+    return products
+
+
+def synthetic_rows(count: int, seed: int = 42, start_id: int = 1) -> list[dict]:
+    """Mesmo catálogo já no formato de `insert_products` (colunas de Product)."""
+    return [
+        {
+            "id": product["id"],
+            "name": product["title"],
+            "category": product["category"],
+            "price": product["price"],
+            "description": product["description"],
+            "image_url": product["image"],
+            "timestamp": EXTRACTED_AT,
+        }
+        for product in synthetic_payload(count, seed, start_id)
+    ]
+
+
+class StubFakeStoreAPI:
+    """Substitui o adapter no `run_etl`, devolvendo um catálogo sintético."""
+
+    def __init__(self, products: list[dict]):
+        self.products = products
+        self.timings = {}
+
+    def fetch_products(self):
+        self.timings["products"] = 0.0
+        return self.products